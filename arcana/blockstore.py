@@ -0,0 +1,226 @@
+import os
+import lzma
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+# File layout: MAGIC, codec byte, compressed blocks back to back, the block
+# table (array of uint64 triples: first entry id, file offset, length) and a
+# trailer holding the table offset, the entry count and MAGIC again.
+MAGIC = b"FBK1"
+_TRAILER = struct.Struct("<QQ4s")
+_CODECS = {"zlib": 0, "lzma": 1}
+_CODEC_NAMES = {v: k for k, v in _CODECS.items()}
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+def _compress(codec: str, payload: bytes) -> bytes:
+    if codec == "lzma":
+        return lzma.compress(payload, preset=6)
+    return zlib.compress(payload, 6)
+
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "lzma":
+        return lzma.decompress(payload)
+    return zlib.decompress(payload)
+
+
+def _pack_block(texts: List[str]) -> bytes:
+    """Serializes a block as: count, end offsets (uint32), utf-8 text bytes."""
+    encoded = [t.encode("utf-8") for t in texts]
+    ends = array("I")
+    pos = 0
+    for data in encoded:
+        pos += len(data)
+        ends.append(pos)
+    return struct.pack("<I", len(encoded)) + ends.tobytes() + b"".join(encoded)
+
+
+def _unpack_block(payload: bytes) -> List[str]:
+    (count,) = struct.unpack_from("<I", payload, 0)
+    ends = array("I")
+    ends.frombytes(payload[4:4 + 4 * count])
+    data = memoryview(payload)[4 + 4 * count:]
+    texts = []
+    start = 0
+    for end in ends:
+        texts.append(bytes(data[start:end]).decode("utf-8"))
+        start = end
+    return texts
+
+
+class BlockStore:
+    """
+    Append-only text store that keeps entries in compressed blocks of roughly
+    ``block_size`` bytes. A block offset table maps an entry id to its block,
+    so reading one entry decompresses only that block. Recently decompressed
+    blocks are kept in a small LRU cache.
+
+    A store is either purely in memory (compressed blocks held as bytes) or
+    backed by a file written with :meth:`save` and opened with :meth:`open`,
+    in which case sealed blocks are read from disk on demand. The file stays
+    open, so another process replacing it does not change what is read.
+    """
+    def __init__(self, codec: str = "zlib", block_size: int = DEFAULT_BLOCK_SIZE, cache_blocks: int = 16):
+        if codec not in _CODECS:
+            raise ValueError(f"Unsupported codec '{codec}'. Use one of {sorted(_CODECS)}.")
+        self.codec = codec
+        self.block_size = block_size
+        self.cache_blocks = max(1, cache_blocks)
+        # Sealed blocks: first entry id per block, and either the compressed
+        # bytes (in memory) or a (offset, length) pair into self._path.
+        self._block_starts: List[int] = []
+        self._blocks: List[bytes] = []
+        self._extents: List[Tuple[int, int]] = []
+        self._path: Optional[str] = None
+        self._file = None
+        self._count = 0
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._cache: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def block_count(self) -> int:
+        return len(self._block_starts)
+
+    def append(self, text: str) -> int:
+        """Appends a text and returns its entry id."""
+        self._pending.append(text)
+        self._pending_bytes += len(text.encode("utf-8"))
+        entry_id = self._count
+        self._count += 1
+        if self._pending_bytes >= self.block_size:
+            self._seal_pending()
+        return entry_id
+
+    def get(self, entry_id: int) -> str:
+        """Returns the text for an entry, decompressing at most one block."""
+        if entry_id < 0 or entry_id >= self._count:
+            raise IndexError(f"entry {entry_id} out of range")
+        pending_start = self._count - len(self._pending)
+        if entry_id >= pending_start:
+            return self._pending[entry_id - pending_start]
+        block_no = bisect_right(self._block_starts, entry_id) - 1
+        texts = self._cached_block(block_no)
+        return texts[entry_id - self._block_starts[block_no]]
+
+    def __iter__(self) -> Iterator[str]:
+        """Yields every entry in order without touching the block cache."""
+        for block_no in range(len(self._block_starts)):
+            yield from _unpack_block(_decompress(self.codec, self._read_block(block_no)))
+        yield from list(self._pending)
+
+    def clear(self) -> None:
+        self.close()
+        self._block_starts.clear()
+        self._blocks.clear()
+        self._extents.clear()
+        self._path = None
+        self._count = 0
+        self._pending = []
+        self._pending_bytes = 0
+        self._cache.clear()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def compressed_size(self) -> int:
+        """Bytes used by sealed, compressed blocks."""
+        return sum(length for _, length in self._extents) + sum(len(b) for b in self._blocks)
+
+    def save(self, path: str) -> None:
+        """Writes all entries (including unsealed ones) to ``path``."""
+        tmp_path = path + ".tmp"
+        table = array("Q")
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC + bytes([_CODECS[self.codec]]))
+            for block_no, first in enumerate(self._block_starts):
+                data = self._read_block(block_no)
+                table.extend((first, out.tell(), len(data)))
+                out.write(data)
+            if self._pending:
+                data = _compress(self.codec, _pack_block(self._pending))
+                table.extend((self._count - len(self._pending), out.tell(), len(data)))
+                out.write(data)
+            table_offset = out.tell()
+            out.write(table.tobytes())
+            out.write(_TRAILER.pack(table_offset, self._count, MAGIC))
+        reopen = self._path is not None and os.path.abspath(path) == os.path.abspath(self._path)
+        if reopen:
+            self.close()
+        os.replace(tmp_path, path)
+        if reopen:
+            # Existing blocks keep their offsets in the rewritten file.
+            self._file = open(path, "rb")
+
+    @classmethod
+    def open(cls, path: str, cache_blocks: int = 16) -> "BlockStore":
+        """Opens a file written by :meth:`save`; blocks are read lazily."""
+        f = open(path, "rb")
+        try:
+            header = f.read(len(MAGIC) + 1)
+            if header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a FiberDBMS block file")
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            table_offset, count, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} has a corrupt trailer")
+            end = f.seek(0, os.SEEK_END) - _TRAILER.size
+            f.seek(table_offset)
+            table = array("Q")
+            table.frombytes(f.read(end - table_offset))
+        except BaseException:
+            f.close()
+            raise
+        store = cls(codec=_CODEC_NAMES[header[len(MAGIC)]], cache_blocks=cache_blocks)
+        store._path = path
+        store._file = f
+        store._count = count
+        for i in range(0, len(table), 3):
+            store._block_starts.append(table[i])
+            store._extents.append((table[i + 1], table[i + 2]))
+        return store
+
+    def _seal_pending(self) -> None:
+        data = _compress(self.codec, _pack_block(self._pending))
+        first = self._count - len(self._pending)
+        if self._path is not None:
+            # A file-backed store keeps new blocks in memory until saved.
+            self._blocks.extend([b""] * (len(self._extents) - len(self._blocks)))
+        self._block_starts.append(first)
+        self._blocks.append(data)
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _read_block(self, block_no: int) -> bytes:
+        if block_no < len(self._extents):
+            offset, length = self._extents[block_no]
+            with self._lock:
+                self._file.seek(offset)
+                return self._file.read(length)
+        return self._blocks[block_no]
+
+    def _cached_block(self, block_no: int) -> List[str]:
+        with self._lock:
+            texts = self._cache.get(block_no)
+            if texts is not None:
+                self._cache.move_to_end(block_no)
+                return texts
+        texts = _unpack_block(_decompress(self.codec, self._read_block(block_no)))
+        with self._lock:
+            self._cache[block_no] = texts
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return texts
@@ -0,0 +1,105 @@
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Passage size and overlap, in tokens (words, or single Chinese characters).
+DEFAULT_CHUNK_TOKENS = 200
+DEFAULT_OVERLAP_TOKENS = 40
+
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fff]|\w+')
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+class Passage(NamedTuple):
+    """A chunk of a document with the 1-based line range it came from."""
+    text: str
+    unit: Optional[str]
+    first_line: int
+    last_line: int
+
+    def metadata(self) -> Dict[str, str]:
+        """Citation fields stored with the passage's index entry."""
+        lines = str(self.first_line) if self.first_line == self.last_line else f"{self.first_line}-{self.last_line}"
+        return {"unit": self.unit, "lines": lines} if self.unit else {"lines": lines}
+
+
+class _Line(NamedTuple):
+    number: int
+    text: str
+    tokens: int
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    """Cuts a line longer than ``max_tokens`` at token boundaries."""
+    starts = [m.start() for m in _TOKEN_RE.finditer(text)]
+    bounds = [0] + starts[max_tokens::max_tokens] + [len(text)]
+    return [text[a:b].strip() for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+def chunk_units(units: Iterable[Tuple[Optional[str], str]], max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                overlap: int = DEFAULT_OVERLAP_TOKENS) -> Iterator[Passage]:
+    """
+    Groups the lines of a document into passages of about ``max_tokens``
+    tokens. ``units`` are (label, text) pairs such as ("page 3", text) in
+    document order; a passage never spans two units. Within a unit passages
+    end at a paragraph break (blank line) once they are half full, and
+    otherwise carry their last ``overlap`` tokens of lines into the next
+    passage. Line numbers count across the whole document, as if the units
+    were joined with newlines.
+    """
+    line_no = 0
+    for unit, text in units:
+        lines: List[Optional[_Line]] = []
+        for raw in text.split('\n'):
+            line_no += 1
+            raw = raw.strip()
+            if not raw:
+                lines.append(None)  # Paragraph break.
+                continue
+            tokens = count_tokens(raw)
+            if tokens > max_tokens:
+                lines.extend(_Line(line_no, piece, count_tokens(piece)) for piece in _split_long(raw, max_tokens))
+            else:
+                lines.append(_Line(line_no, raw, tokens))
+        yield from _chunk_lines(unit, lines, max_tokens, overlap)
+
+
+def _chunk_lines(unit: Optional[str], lines: List[Optional[_Line]], max_tokens: int,
+                 overlap: int) -> Iterator[Passage]:
+    window: List[_Line] = []
+    size = 0
+    fresh = 0  # Lines in the window not already emitted as overlap.
+
+    def emit() -> Passage:
+        return Passage("\n".join(line.text for line in window), unit, window[0].number, window[-1].number)
+
+    for line in lines:
+        if line is None:
+            if fresh and size >= max_tokens // 2:
+                yield emit()
+                window, size, fresh = [], 0, 0
+            continue
+        if window and size + line.tokens > max_tokens:
+            if fresh:
+                yield emit()
+            tail: List[_Line] = []
+            kept = 0
+            for prev in reversed(window):
+                if kept + prev.tokens > min(overlap, max_tokens - line.tokens):
+                    break
+                tail.insert(0, prev)
+                kept += prev.tokens
+            window, size, fresh = tail, kept, 0
+        window.append(line)
+        size += line.tokens
+        fresh += 1
+    if fresh:
+        yield emit()
+
+
+def describe_location(result: Dict[str, str]) -> str:
+    """Citation suffix such as " (page 3, lines 12-30)" for a search result, or ""."""
+    parts = [result[key] if key == "unit" else f"lines {result[key]}" for key in ("unit", "lines") if result.get(key)]
+    return f" ({', '.join(parts)})" if parts else ""
@@ -0,0 +1,59 @@
+from hashlib import blake2b
+from typing import Iterable, Set, Tuple
+
+import numpy as np
+
+# New digests are merged into the sorted array once the pending set reaches
+# this size (or an eighth of the array, whichever is larger).
+MIN_MERGE = 4096
+
+
+def content_digest(name: str, content: str) -> int:
+    """64-bit blake2b digest of an entry's name and content."""
+    h = blake2b(digest_size=8)
+    h.update(name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(content.encode("utf-8"))
+    return int.from_bytes(h.digest(), "little")
+
+
+class ContentHashSet:
+    """
+    Set of (name, content) pairs that only stores a 64-bit digest per pair,
+    in a sorted uint64 array searched with binary search, so duplicate checks
+    cost 8 bytes per entry instead of a copy of the text.
+
+    It is a drop-in for the ``set`` of tuples indexing used before: it
+    supports ``in``, ``add`` and ``len`` on ``(name, content)`` tuples.
+    """
+    def __init__(self, items: Iterable[Tuple[str, str]] = ()):
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._pending: Set[int] = set()
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        return self._contains_digest(content_digest(*item))
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self._sorted)
+
+    def add(self, item: Tuple[str, str]) -> None:
+        digest = content_digest(*item)
+        if not self._contains_digest(digest):
+            self._pending.add(digest)
+            if len(self._pending) >= max(MIN_MERGE, len(self._sorted) // 8):
+                self._merge()
+
+    def _contains_digest(self, digest: int) -> bool:
+        if digest in self._pending:
+            return True
+        pos = np.searchsorted(self._sorted, np.uint64(digest))
+        return bool(pos < len(self._sorted) and self._sorted[pos] == digest)
+
+    def _merge(self) -> None:
+        if self._pending:
+            added = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+            self._sorted = np.union1d(self._sorted, added)
+            self._pending.clear()
@@ -0,0 +1,128 @@
+import io
+import os
+import codecs
+from typing import Iterator, Optional
+
+from chardet.universaldetector import UniversalDetector
+
+# chardet sees at most this many bytes, fed in chunks until it is confident.
+DETECT_SAMPLE_BYTES = 1024 * 1024
+_DETECT_CHUNK = 64 * 1024
+
+
+def detect_encoding(f, sample_bytes: int = DETECT_SAMPLE_BYTES) -> Optional[str]:
+    """
+    Guesses the encoding of a binary file object from its current position
+    with chardet's incremental detector, stopping as soon as it is
+    confident or after ``sample_bytes``. The position is restored.
+    """
+    start = f.tell()
+    detector = UniversalDetector()
+    read = 0
+    try:
+        while read < sample_bytes and not detector.done:
+            chunk = f.read(min(_DETECT_CHUNK, sample_bytes - read))
+            if not chunk:
+                break
+            detector.feed(chunk)
+            read += len(chunk)
+        detector.close()
+    finally:
+        f.seek(start)
+    return detector.result.get("encoding")
+
+
+def _ascii_compatible(encoding: str) -> bool:
+    try:
+        return "a\n".encode(encoding) == b"a\n"
+    except (LookupError, UnicodeError):
+        return False
+
+
+def _lines(f, encoding: str, errors: str) -> Iterator[str]:
+    # newline="" keeps line endings untranslated, so encoding a line again
+    # gives back exactly the bytes it was decoded from.
+    text = io.TextIOWrapper(f, encoding=encoding, errors=errors, newline="")
+    try:
+        yield from text
+    finally:
+        text.detach()  # Leave the caller's file object open.
+
+
+def decode_lines(f, encoding: Optional[str] = None, on_detect=None) -> Iterator[str]:
+    """
+    Yields the lines of a binary file object without their line endings,
+    decoding it in one streamed pass.
+
+    Without a known ``encoding`` the file is decoded as (strict) UTF-8,
+    which is what nearly all files are. Only if that fails is chardet
+    consulted, on the bytes from the first line that is not UTF-8 onwards;
+    as long as everything before was ASCII, decoding resumes there with the
+    detected encoding, otherwise the rest is decoded as UTF-8 with
+    replacement characters. ``on_detect`` is called with the encoding
+    chardet chose, so it can be remembered for the same bytes.
+    """
+    if encoding is not None:
+        for line in _lines(f, encoding, "replace"):
+            yield line.rstrip("\r\n")
+        return
+    start = f.tell()
+    # A UTF-8 BOM is skipped, and makes the file UTF-8 whatever follows.
+    bom = f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8
+    if not bom:
+        f.seek(start)
+    consumed = 0
+    ascii_only = not bom
+    lines = _lines(f, "utf-8", "strict")
+    try:
+        for line in lines:
+            consumed += len(line.encode("utf-8"))  # Bytes, not characters.
+            ascii_only = ascii_only and line.isascii()
+            yield line.rstrip("\r\n")
+        return
+    except UnicodeDecodeError:
+        pass
+    finally:
+        lines.close()
+    resume = start + len(codecs.BOM_UTF8) * bom + consumed
+    f.seek(resume)
+    detected = None  # Mostly UTF-8 with a few bad bytes: keep UTF-8.
+    if ascii_only:
+        detected = detect_encoding(f)
+        if detected is not None and consumed and not _ascii_compatible(detected):
+            detected = None
+        if detected is not None and on_detect is not None:
+            on_detect(detected)
+    for line in _lines(f, detected or "utf-8", "replace"):
+        yield line.rstrip("\r\n")
+
+
+class EncodingCache:
+    """
+    Encodings chardet detected, keyed by file content hash, so a file that
+    is not UTF-8 is only sampled once. Each is a tiny file under
+    ``directory``; UTF-8 files never need an entry.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._path(digest), "r", encoding="ascii") as f:
+                return f.read().strip() or None
+        except (OSError, UnicodeError):
+            return None
+
+    def set(self, digest: str, encoding: str) -> None:
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="ascii") as f:
+                f.write(encoding)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"[!] Could not cache the encoding of {digest}: {exc}")
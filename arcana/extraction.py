@@ -0,0 +1,222 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process memory limits
+    resource = None
+
+DEFAULT_TIMEOUT = 120.0
+# Workers never fork the app process itself: the pool is started from
+# background threads (indexing jobs, the watcher), and a forked child can
+# inherit locks held by other threads.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Values (pages) read ahead of the caller from workers on later items.
+DEFAULT_MAX_BUFFERED = 64
+_POLL_INTERVAL = 0.5
+
+# Worker messages: (seq, kind, payload). _READY (seq None) is sent once a
+# started worker has imported its function, so startup is not timed.
+_VALUE, _DONE, _FAILED, _READY = range(4)
+
+
+class ExtractionError(RuntimeError):
+    """An item failed in its worker: it raised, timed out or crashed the process."""
+
+
+def _limit_memory(memory_limit: int) -> None:
+    """Caps the address space of this process at its current size plus ``memory_limit`` bytes."""
+    current = 0
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    limit = current + memory_limit
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker(conn, function: Callable[[Any], Iterable[Any]], memory_limit: Optional[int]) -> None:
+    if memory_limit and resource is not None:
+        _limit_memory(memory_limit)
+    conn.send((None, _READY, None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        seq, item = task
+        try:
+            for value in function(item):
+                conn.send((seq, _VALUE, value))
+            conn.send((seq, _DONE, None))
+        except Exception as exc:  # MemoryError included
+            conn.send((seq, _FAILED, f"{type(exc).__name__}: {exc}"))
+
+
+class _Worker:
+    def __init__(self, context, function, memory_limit):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child, function, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+        self.task: Optional[Tuple[int, Any]] = None
+        self.started = 0.0
+        self.ready = False
+
+    def submit(self, seq: int, item: Any) -> None:
+        self.task = (seq, item)
+        self.started = time.monotonic()
+        self.conn.send(self.task)
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Runs a generator function on items in worker processes and streams
+    what it yields back to the caller. A worker may spend at most
+    ``timeout`` seconds without yielding (for a document: on one page) and
+    at most ``memory_limit`` extra bytes of address space (POSIX only). A
+    worker that times out, runs out of memory or crashes is replaced and its
+    item reported as failed, so one pathological file cannot stall or kill
+    the run. Workers are started with START_METHOD, so ``function`` must be
+    a module-level function and the items picklable.
+
+    :meth:`map` yields items in input order, whatever order the workers
+    finish in. Workers on later items are only read from until
+    ``max_buffered`` values wait for the caller; after that they block on
+    their pipe until the caller catches up, so memory stays bounded by
+    that many values however far ahead the workers are.
+    """
+    def __init__(self, function: Callable[[Any], Iterable[Any]], workers: Optional[int] = None,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, memory_limit: Optional[int] = None,
+                 max_buffered: int = DEFAULT_MAX_BUFFERED):
+        self.function = function
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_buffered = max(1, max_buffered)
+        if memory_limit and resource is None:
+            print("[!] Memory limits for extraction workers are not supported on this platform.")
+        self._context = multiprocessing.get_context(START_METHOD)
+        self._pool: List[_Worker] = []
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for worker in self._pool:
+            worker.stop(kill=worker.task is not None)
+        self._pool = []
+
+    def map(self, items: Iterable[Any]) -> Iterator[Tuple[Any, Iterator[Any]]]:
+        """
+        Yields (item, values) per item in input order. ``values`` iterates
+        over what the function yields for the item as the worker produces
+        it, and raises ExtractionError if the item fails; it should be
+        consumed before moving on to the next item.
+        """
+        items = list(items)
+        if not self._pool:
+            self._pool = [_Worker(self._context, self.function, self.memory_limit) for _ in range(self.workers)]
+        buffers: Dict[int, Deque[Any]] = {}
+        finished: Dict[int, Optional[str]] = {}
+        window = 2 * self.workers  # Bounds the items started ahead of the caller.
+        next_task = 0
+
+        def pump(head: int) -> None:
+            nonlocal next_task
+            for worker in self._pool:
+                if worker.task is None and next_task < min(len(items), head + window):
+                    worker.submit(next_task, items[next_task])
+                    buffers[next_task] = deque()
+                    next_task += 1
+            ahead = sum(len(buffer) for seq, buffer in buffers.items() if seq != head)
+            # Past the limit only the worker on the caller's item is read.
+            busy = {worker.conn: worker for worker in self._pool
+                    if worker.task is not None and (worker.task[0] == head or ahead < self.max_buffered)}
+            for conn in wait(list(busy), timeout=_POLL_INTERVAL):
+                worker = busy[conn]
+                try:
+                    # Drain what was already sent, up to the buffer limit, before waiting again.
+                    while True:
+                        seq, kind, payload = conn.recv()
+                        if kind == _READY:
+                            worker.ready = True
+                            worker.started = time.monotonic()
+                        elif kind == _VALUE:
+                            buffers[seq].append(payload)
+                            worker.started = time.monotonic()
+                            ahead += seq != head
+                            if len(buffers[seq]) >= self.max_buffered if seq == head else ahead >= self.max_buffered:
+                                break
+                        else:
+                            finished[seq] = payload if kind == _FAILED else None
+                            worker.task = None
+                            break
+                        if not conn.poll():
+                            break
+                except (EOFError, OSError):
+                    seq = worker.task[0]
+                    self._replace(worker)
+                    finished[seq] = f"worker exited with code {worker.process.exitcode}"
+            if self.timeout is not None:
+                now = time.monotonic()
+                for worker in self._pool:
+                    if worker.task is not None and (worker.conn not in busy or not worker.ready):
+                        worker.started = now  # Held back or starting up: not stuck.
+                    elif worker.task is not None and now - worker.started > self.timeout:
+                        finished[worker.task[0]] = f"timed out after {self.timeout:g}s"
+                        self._replace(worker)
+
+        def values(seq: int) -> Iterator[Any]:
+            while True:
+                buffer = buffers.get(seq)
+                while buffer:
+                    yield buffer.popleft()
+                if seq in finished:
+                    buffers.pop(seq, None)
+                    error = finished.pop(seq)
+                    if error is not None:
+                        raise ExtractionError(error)
+                    return
+                pump(seq)
+
+        for seq, item in enumerate(items):
+            stream = values(seq)
+            yield item, stream
+            try:
+                for _ in stream:  # Whatever the caller left unread.
+                    pass
+            except ExtractionError:
+                pass
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.stop(kill=True)
+        worker.task = None
+        self._pool[self._pool.index(worker)] = _Worker(self._context, self.function, self.memory_limit)
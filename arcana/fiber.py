@@ -1,10 +1,77 @@
+import os
 import re
-from typing import List, Dict
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional, Set, Tuple
 from datetime import datetime
 from collections import Counter
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import jieba  # For Chinese word segmentation
 import csv
 import ast  # For safely evaluating string representations of Python literals
+from arcana.blockstore import BlockStore, DEFAULT_BLOCK_SIZE
+from arcana.postings import DiskPostings, read_header, read_postings, write_postings
+from arcana.contenthash import ContentHashSet
+from arcana.profiling import QueryProfiler, QueryStats
+from arcana.positions import PositionIndex, read_header as read_positions_header
+
+# Sidecar file holding compressed entry content next to the CSV index.
+BLOCK_SUFFIX = ".blk"
+# Sidecar file holding the on-disk posting lists of a memory-budgeted index.
+POSTINGS_SUFFIX = ".post"
+# Sidecar file holding the sorted (name, content) digests used for dedupe.
+HASH_SUFFIX = ".hash"
+# Sidecar file holding token positions for phrase and proximity queries.
+POSITIONS_SUFFIX = ".pos"
+
+# Columnar formats, by file extension. save() and load_from_file() switch to
+# them for these extensions; CSV stays the default.
+TABLE_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns every entry has. Any other key of an entry is optional metadata
+# (e.g. an occurrence ``count``) saved in extra columns after these.
+ENTRY_FIELDS = ['name', 'timestamp', 'content', 'tags']
+
+# Terms found in more than this share of entries only contribute to scoring;
+# they are not used to generate candidates.
+DEFAULT_MAX_DF_RATIO = 0.5
+
+# Quoted phrases in a query: "cell membrane" must occur verbatim, while
+# "cell energy"~5 needs both words within a window of five tokens.
+PHRASE_RE = re.compile(r'"([^"]+)"(?:~(\d+))?')
+
+# query_many only fans out to threads for batches of at least this many queries.
+PARALLEL_QUERY_BATCH = 16
+
+
+@dataclass
+class QueryPlan:
+    """How a query was executed: deduplicated terms ordered by document
+    frequency, the selective terms that generated candidates, and the
+    high-frequency terms that were pruned from candidate generation."""
+    terms: List[str] = field(default_factory=list)
+    selective: List[str] = field(default_factory=list)
+    pruned: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    document_frequency: Dict[str, int] = field(default_factory=dict)
+    phrases: List[Tuple[List[str], Optional[int]]] = field(default_factory=list)
+
+
+# Additive parts of an entry's score; their sum is multiplied by the length penalty.
+SCORE_COMPONENTS = ('content_score', 'name_score', 'phrase_score', 'unique_match_score', 'tag_score')
+
+
+class _DocFeatures(NamedTuple):
+    """Tokenized view of one entry, shared by every scoring path."""
+    content_counts: Counter
+    name_tokens: Set[str]
+    tag_tokens: List[Set[str]]
+    length: int
+
 
 class FiberDBMS:
     """
@@ -12,32 +79,163 @@ class FiberDBMS:
     It builds an inverted index for fast keyword-based retrieval and supports
     ranking, snippets, and dynamic tag updates.
     The database is persisted to a CSV file.
+
+    With ``compression`` set to ``"zlib"`` or ``"lzma"`` entry content is kept
+    in compressed blocks (see :class:`arcana.blockstore.BlockStore`) instead
+    of the ``database`` dicts, and persisted to a ``.blk`` file next to the CSV.
+
+    With ``memory_budget`` (bytes) set, posting lists are written to a
+    ``.post`` file on save/load and served through an LRU cache that holds
+    hot terms up to the budget (see :class:`arcana.postings.DiskPostings`).
+
+    :meth:`has_entry` checks for duplicates against 64-bit (name, content)
+    digests, built on first use and kept in memory only.
+
+    With ``positions=True`` token positions are recorded as well (see
+    :class:`arcana.positions.PositionIndex`) and saved to a ``.pos`` file,
+    so quoted phrases and ``"..."~N`` proximity windows in queries are
+    matched exactly. Without positions they only act as plain terms.
     """
-    def __init__(self):
+    def __init__(self, compression: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE, block_cache: int = 16,
+                 max_df_ratio: float = DEFAULT_MAX_DF_RATIO, memory_budget: Optional[int] = None,
+                 positions: bool = False):
         self.database: List[Dict[str, str]] = []
         self.content_index: Dict[str, List[int]] = {}
+        self.memory_budget = memory_budget
+        self.positions: Optional[PositionIndex] = PositionIndex() if positions else None
+        self._skip_indexing = False
+        self._skip_positions = False
+        self.max_df_ratio = max_df_ratio
+        self.last_plan: Optional[QueryPlan] = None
+        self.last_stats: Optional[QueryStats] = None
+        self.profiler: Optional[QueryProfiler] = None
+        self.compression = compression
+        self.block_size = block_size
+        self.block_cache = block_cache
+        self.content_store: Optional[BlockStore] = (
+            BlockStore(compression, block_size, block_cache) if compression else None
+        )
+        self._hashes: Optional[ContentHashSet] = None
 
     def is_empty(self) -> bool:
         """Checks if the database has any entries."""
         return not self.database
 
-    def add_entry(self, name: str, content: str, tags: List[str]) -> None:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def add_entry(self, name: str, content: str, tags: List[str], **metadata) -> None:
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
         entry = {
             "name": name,
             "timestamp": timestamp,
             "content": content,
             "tags": ','.join(tags) if isinstance(tags, list) else tags
         }
+        entry.update(_metadata_strings(metadata))
+        self._append_entry(entry)
+
+    def set_metadata(self, index: int, **metadata) -> None:
+        """Sets optional metadata fields of an existing entry."""
+        self.database[index].update(_metadata_strings(metadata))
+
+    def metadata_fields(self) -> List[str]:
+        """Optional metadata fields used by any entry, in first-seen order."""
+        fields = {}
+        for entry in self.database:
+            fields.update(dict.fromkeys(k for k in entry if k not in ENTRY_FIELDS))
+        return list(fields)
+
+    def entries_with(self, field: str, values: Iterable[str]) -> List[int]:
+        """Indexes of the entries whose metadata ``field`` is one of ``values``."""
+        wanted = set(values)
+        return [idx for idx, entry in enumerate(self.database) if entry.get(field) in wanted]
+
+    def remove_entries(self, indices: Iterable[int]) -> int:
+        """
+        Deletes entries and renumbers the remaining ones. Posting lists and
+        positions are remapped rather than rebuilt, so nothing is tokenized
+        again. Returns the number of entries removed.
+        """
+        doomed = set(indices) & set(range(len(self.database)))
+        if not doomed:
+            return 0
+        remap: Dict[int, int] = {}
+        for old in range(len(self.database)):
+            if old not in doomed:
+                remap[old] = len(remap)
+        if self.content_store is not None:
+            store = BlockStore(self.compression, self.block_size, self.block_cache)
+            for old, content in enumerate(self.content_store):
+                if old in remap:
+                    store.append(content)
+            self.content_store.close()
+            self.content_store = store
+        self.database[:] = [entry for old, entry in enumerate(self.database) if old in remap]
+        # A memory-budgeted index keeps the remapped postings in memory until the next save.
+        index = {}
+        for term, postings in self.content_index.items():
+            kept = [remap[old] for old in postings if old in remap]
+            if kept:
+                index[term] = kept
+        self._reset_index()
+        self.content_index = index
+        if self.positions is not None:
+            self._set_positions(self.positions.remap(remap))
+        self._hashes = None
+        return len(doomed)
+
+    def iter_entries(self) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Yields (index, entry) pairs in index order, each entry with its full content."""
+        for idx, entry in enumerate(self.database):
+            yield idx, dict(entry, content=self.get_content(idx))
+
+    def get_content(self, index: int) -> str:
+        """Returns the full content of an entry, wherever it is stored."""
+        if self.content_store is not None:
+            return self.content_store.get(index)
+        return self.database[index]['content']
+
+    def has_entry(self, name: str, content: str) -> bool:
+        """Checks whether an entry with exactly this name and content exists."""
+        return (name, content) in self.content_hashes()
+
+    def content_hashes(self) -> ContentHashSet:
+        """
+        Digest set of every (name, content) pair, built from the entries the
+        first time it is needed and kept up to date as entries are added.
+        """
+        if self._hashes is None:
+            self._hashes = ContentHashSet((e['name'], e['content']) for _, e in self.iter_entries())
+        return self._hashes
+
+    def _append_entry(self, entry: Dict[str, str]) -> None:
+        content = entry['content']
+        if self._hashes is not None:
+            self._hashes.add((entry['name'], content))
+        if self.content_store is not None:
+            self.content_store.append(content)
+            del entry['content']
         self.database.append(entry)
         self._index_content(len(self.database) - 1, content)
 
     def _index_content(self, entry_index: int, content: str) -> None:
-        words = self._tokenize(content)
-        for word in words:
-            if word not in self.content_index:
-                self.content_index[word] = []
-            self.content_index[word].append(entry_index)
+        if self._skip_indexing:
+            return  # Postings are read from an up-to-date .post file instead.
+        # Posting lists hold each entry once, so their length is the document frequency.
+        tokens = self._tokenize(content)
+        for word in dict.fromkeys(tokens):
+            self.content_index.setdefault(word, []).append(entry_index)
+        if self.positions is not None and not self._skip_positions:
+            self.positions.add(entry_index, [t for t in tokens if t.strip()])
+
+    def _document_frequency(self, word: str) -> int:
+        if isinstance(self.content_index, DiskPostings):
+            return self.content_index.document_frequency(word)
+        return len(self.content_index[word])
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Posting cache hit/miss/eviction counters of a memory-budgeted index."""
+        if isinstance(self.content_index, DiskPostings):
+            return self.content_index.stats()
+        return {}
 
     def load_or_create(self, filename: str) -> None:
         try:
@@ -46,50 +244,412 @@ class FiberDBMS:
         except FileNotFoundError:
             print(f"{filename} not found. Creating a new database.")
 
+    def plan_query(self, query: str) -> QueryPlan:
+        """
+        Deduplicates the query terms and orders them by document frequency.
+        Terms present in more than ``max_df_ratio`` of all entries are pruned
+        from candidate generation but still count towards the score. If every
+        term is that common, the rarest one still generates candidates.
+        """
+        query, phrases = self._parse_phrases(query)
+        words = [w for w in dict.fromkeys(self._tokenize(query)) if w.strip()]
+        plan = QueryPlan(phrases=phrases)
+        df = {w: self._document_frequency(w) for w in words if w in self.content_index}
+        plan.missing = [w for w in words if w not in df]
+        plan.terms = sorted(df, key=lambda w: df[w])
+        plan.document_frequency = df
+        limit = self.max_df_ratio * len(self.database)
+        for word in plan.terms:
+            if df[word] > limit and plan.selective:
+                plan.pruned.append(word)
+            else:
+                plan.selective.append(word)
+        return plan
+
+    def _parse_phrases(self, query: str) -> Tuple[str, List[Tuple[List[str], Optional[int]]]]:
+        """Splits quoted phrases off a query; returns the unquoted text and (terms, window) pairs."""
+        phrases = []
+        for match in PHRASE_RE.finditer(query):
+            terms = [w for w in self._tokenize(match.group(1)) if w.strip()]
+            if len(terms) > 1:
+                phrases.append((terms, int(match.group(2)) if match.group(2) else None))
+        return PHRASE_RE.sub(lambda m: f" {m.group(1)} ", query), phrases
+
+    def _phrase_matches(self, plan: QueryPlan) -> Optional[Dict[int, int]]:
+        """
+        Entries satisfying every phrase of the plan, mapped to the phrase
+        bonus added to their ``phrase_score``, or None when nothing restricts
+        them. An exact phrase earns 5 per occurrence; a ``~N`` window earns
+        up to 5, less the wider the smallest span holding its terms.
+        """
+        if not plan.phrases or self.positions is None:
+            return None
+        allowed: Optional[Dict[int, int]] = None
+        for terms, window in plan.phrases:
+            found = self.positions.match(terms, window)
+            if window is None:
+                bonus = {entry: 5 * count for entry, count in found.items()}
+            else:
+                distinct = len(set(terms))
+                bonus = {entry: max(1, 5 * distinct // span) for entry, span in found.items()}
+            if allowed is None:
+                allowed = bonus
+            else:
+                allowed = {entry: allowed[entry] + bonus[entry] for entry in allowed.keys() & bonus.keys()}
+        return allowed
+
     def query(self, query: str, top_n: int) -> List[Dict[str, str]]:
-        query_words = self._tokenize(query)
+        return list(self.iter_query(query, top_n))
+
+    def query_with_stats(self, query: str, top_n: int) -> Tuple[List[Dict[str, str]], QueryStats]:
+        """Like :meth:`query`, also returning the per-stage timings of the query."""
+        results = self.query(query, top_n)
+        return results, self.last_stats  # type: ignore[return-value]
+
+    def enable_profiling(self, window: int = 1000) -> QueryProfiler:
+        """Starts recording the QueryStats of every query in a rolling window."""
+        if self.profiler is None:
+            self.profiler = QueryProfiler(window)
+        return self.profiler
+
+    def iter_query(self, query: str, top_n: Optional[int] = None, with_snippets: bool = True) -> Iterator[Dict[str, str]]:
+        """
+        Yields results in rank order. Ranking happens up front, but the
+        snippet and updated tags of each result are only computed when it is
+        reached, so callers can render the first hit right away or stop early.
+        With ``with_snippets=False`` only ``name`` and ``index`` are yielded.
+
+        Stage timings are collected in ``last_stats`` as results are
+        produced, and handed to ``profiler`` (if enabled) once the iteration
+        ends.
+        """
+        stats = QueryStats(query)
+        self.last_stats = stats
+        started = time.perf_counter()
+        plan = self.plan_query(query)
+        self.last_plan = plan
+        query_words = plan.terms + plan.missing
+        stats.add("tokenize", started)
+        stats.posting_sizes = dict(plan.document_frequency)
+        try:
+            for idx, score in self._rank(plan, query_words, top_n, stats):
+                stats.results += 1
+                if with_snippets:
+                    yield self._make_result(idx, query_words, score, stats)
+                else:
+                    yield {'name': self.database[idx]['name'], 'index': idx, 'score': score}
+        finally:
+            if self.profiler is not None:
+                self.profiler.record(stats)
+
+    def _rank(self, plan: QueryPlan, query_words: List[str], top_n: Optional[int],
+              stats: QueryStats) -> List[Tuple[int, float]]:
+        """Returns (index, score) pairs of the best candidates, best first."""
+        started = time.perf_counter()
         matching_indices = set()
-        for word in query_words:
-            if word in self.content_index:
-                matching_indices.update(self.content_index[word])
-        sorted_results = sorted(
-            matching_indices,
-            key=lambda idx: self._rate_result(self.database[idx], query_words),
-            reverse=True
-        )
-        results = []
-        for idx in sorted_results[:top_n]:
-            entry = self.database[idx]
-            snippet = self._get_snippet(entry['content'], query_words)
-            updated_tags = self._update_tags(entry['tags'], entry['content'], query_words)
-            results.append({
-                'name': entry['name'],
-                'content': snippet,
-                'tags': updated_tags,
-                'index': idx
-            })
-        return results
+        for word in plan.selective:
+            matching_indices.update(self.content_index[word])
+        allowed = self._phrase_matches(plan)
+        if allowed is not None:
+            matching_indices &= allowed.keys()
+        stats.candidates = len(matching_indices)
+        started = stats.add("candidates", started)
+        bonus = allowed or {}
+        scored = [(idx, float(self._rate_result(idx, query_words, bonus.get(idx, 0)))) for idx in matching_indices]
+        started = stats.add("score", started)
+        # Equal scores go to the lower index, as in _rank_batch.
+        if top_n is None:
+            ranked = sorted(scored, key=_rank_key)
+        else:
+            ranked = heapq.nsmallest(top_n, scored, key=_rank_key)
+        stats.add("sort", started)
+        return ranked
+
+    def query_many(self, queries: List[str], top_n: int, workers: int = 1) -> List[List[Dict[str, str]]]:
+        """
+        Runs several queries at once and returns one result list per query,
+        in the same order as ``queries``.
+
+        Each distinct query is tokenized and planned once, posting lists of
+        shared terms are fetched once, every candidate entry is tokenized once
+        for the whole batch and all queries are scored in a single matrix
+        pass. With ``workers > 1`` large batches are split across threads.
+        """
+        plans = {q: self.plan_query(q) for q in dict.fromkeys(queries)}
+        distinct = list(plans)
+        if workers > 1 and len(distinct) >= PARALLEL_QUERY_BATCH:
+            size = -(-len(distinct) // workers)
+            chunks = [distinct[i:i + size] for i in range(0, len(distinct), size)]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                parts = executor.map(lambda chunk: self._rank_batch([plans[q] for q in chunk], top_n), chunks)
+                ranked = [indices for part in parts for indices in part]
+        else:
+            ranked = self._rank_batch([plans[q] for q in distinct], top_n)
+
+        results = {}
+        for q, hits in zip(distinct, ranked):
+            query_words = plans[q].terms + plans[q].missing
+            results[q] = [self._make_result(idx, query_words, score) for idx, score in hits]
+        return [[dict(r) for r in results[q]] for q in queries]
+
+    def _rank_batch(self, plans: List[QueryPlan], top_n: int) -> List[List[Tuple[int, float]]]:
+        """Vectorized equivalent of ranking each plan with ``_rate_result``."""
+        # Words in no entry's content (plan.missing) still score on names and tags.
+        terms = list(dict.fromkeys(w for plan in plans for w in plan.terms + plan.missing))
+        column = {w: i for i, w in enumerate(terms)}
+        postings = {w: self.content_index[w] for plan in plans for w in plan.selective}
+        candidate_sets = [set().union(*(postings[w] for w in plan.selective)) for plan in plans]
+        phrase_bonus = [self._phrase_matches(plan) for plan in plans]
+        for candidate_set, allowed in zip(candidate_sets, phrase_bonus):
+            if allowed is not None:
+                candidate_set.intersection_update(allowed)
+        candidates = sorted(set().union(*candidate_sets))
+        if not candidates:
+            return [[] for _ in plans]
+
+        rows, cols = len(candidates), len(terms)
+        term_freq = np.zeros((rows, cols))
+        in_name = np.zeros((rows, cols))
+        length_penalty = np.empty(rows)
+        tag_hits: List[List[int]] = []
+        tag_owner: List[int] = []
+        for r, idx in enumerate(candidates):
+            features = self._doc_features(idx)
+            for w in features.content_counts.keys() & column.keys():
+                term_freq[r, column[w]] = features.content_counts[w]
+            for w in features.name_tokens & column.keys():
+                in_name[r, column[w]] = 1
+            for tokens in features.tag_tokens:
+                hits = [column[w] for w in tokens & column.keys()]
+                if hits:
+                    tag_hits.append(hits)
+                    tag_owner.append(r)
+            length_penalty[r] = min(1, features.length / 100)
+
+        selector = np.zeros((cols, len(plans)))
+        query_length = np.empty(len(plans))
+        member = np.zeros((rows, len(plans)), dtype=bool)
+        position = {idx: r for r, idx in enumerate(candidates)}
+        for j, plan in enumerate(plans):
+            selector[[column[w] for w in plan.terms + plan.missing], j] = 1
+            query_length[j] = len(plan.terms) + len(plan.missing)
+            member[[position[idx] for idx in candidate_sets[j]], j] = True
+
+        present = (term_freq > 0) @ selector
+        scores = term_freq @ selector + 10 * present + 3 * (in_name @ selector)
+        scores += 5 * (present == query_length)
+        for j, allowed in enumerate(phrase_bonus):
+            if allowed:
+                for idx in candidate_sets[j]:
+                    scores[position[idx], j] += allowed[idx]
+        if tag_hits:
+            tag_matrix = np.zeros((len(tag_hits), cols))
+            for t, hits in enumerate(tag_hits):
+                tag_matrix[t, hits] = 1
+            tag_scores = np.zeros_like(scores)
+            np.add.at(tag_scores, tag_owner, 2 * ((tag_matrix @ selector) > 0))
+            scores += tag_scores
+        scores *= length_penalty[:, None]
+
+        order_key = np.asarray(candidates)
+        ranked = []
+        for j in range(len(plans)):
+            hit_rows = np.flatnonzero(member[:, j])
+            best = hit_rows[np.lexsort((order_key[hit_rows], -scores[hit_rows, j]))][:top_n]
+            ranked.append([(candidates[r], float(scores[r, j])) for r in best])
+        return ranked
+
+    def _make_result(self, idx: int, query_words: List[str], score: float,
+                     stats: Optional[QueryStats] = None) -> Dict[str, str]:
+        entry = self.database[idx]
+        started = time.perf_counter()
+        content = self.get_content(idx)
+        snippet = self._get_snippet(content, query_words)
+        if stats is not None:
+            started = stats.add("snippet", started)
+        tags = self._update_tags(entry['tags'], content, query_words)
+        if stats is not None:
+            stats.add("tags", started)
+        result = {
+            'name': entry['name'],
+            'content': snippet,
+            'tags': tags,
+            'index': idx,
+            'score': score
+        }
+        result.update((k, v) for k, v in entry.items() if k not in ENTRY_FIELDS)
+        return result
 
     def save(self, filename: str) -> None:
+        if _table_format(filename):
+            self.save_table(filename)
+            self._save_sidecars(filename)
+            return
+        block_file = filename + BLOCK_SUFFIX
+        extra_fields = self.metadata_fields()
         with open(filename, 'w', encoding='utf-8', newline='') as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(['name', 'timestamp', 'content', 'tags'])
+            writer.writerow(ENTRY_FIELDS + extra_fields)
             for entry in self.database:
-                writer.writerow([entry['name'], entry['timestamp'], entry['content'], entry['tags']])
+                # Compressed content lives in the block file, not the CSV.
+                writer.writerow([entry['name'], entry['timestamp'], entry.get('content', ''), entry['tags']]
+                                + [entry.get(f, '') for f in extra_fields])
+        if self.content_store is not None:
+            self.content_store.save(block_file)
+        elif os.path.exists(block_file):
+            # A stale block file would shadow the plain-text content on load.
+            os.remove(block_file)
+        self._save_sidecars(filename)
         print(f"Updated database saved to {filename}.")
 
-    def _rate_result(self, entry: Dict[str, str], query_words: List[str]) -> float:
-        content_tokens = self._tokenize(entry['content'])
-        name_tokens = self._tokenize(entry['name'])
-        tags = entry['tags'].split(',')
-        unique_matches = sum(1 for word in set(query_words) if word in content_tokens)
-        content_score = sum(content_tokens.count(word) for word in query_words)
-        name_score = sum(3 for word in query_words if word in name_tokens)
-        phrase_score = 5 if all(word in content_tokens for word in query_words) else 0
-        unique_match_score = unique_matches * 10
-        tag_score = sum(2 for tag in tags if any(word in self._tokenize(tag) for word in query_words))
-        length_penalty = min(1, len(content_tokens) / 100)
-        return (content_score + name_score + phrase_score + unique_match_score + tag_score) * length_penalty
+    def save_table(self, filename: str) -> None:
+        """
+        Exports all entries as Parquet (``.parquet``) or Arrow IPC
+        (``.arrow``/``.feather``) with typed columns: ``name`` dictionary
+        encoded, ``timestamp`` as int64 seconds, ``content`` as string and
+        ``tags`` as list<string>. Needs pandas with pyarrow. Files are read
+        back with :meth:`load_from_file`.
+        """
+        import pandas as pd
+        epoch = pd.Timestamp(0)
+        stamps = pd.to_datetime([e['timestamp'] for e in self.database], format=TIMESTAMP_FORMAT,
+                                errors="coerce").fillna(epoch)
+        frame = pd.DataFrame({
+            "name": pd.Categorical([e['name'] for e in self.database]),
+            "timestamp": ((stamps - epoch) // pd.Timedelta(seconds=1)).astype("int64"),
+            "content": [self.get_content(i) for i in range(len(self.database))],
+            "tags": [e['tags'].split(',') if e['tags'] else [] for e in self.database],
+        })
+        for extra in self.metadata_fields():
+            frame[extra] = [e.get(extra) for e in self.database]
+        if _table_format(filename) == "parquet":
+            frame.to_parquet(filename, index=False)
+        else:
+            frame.to_feather(filename)
+        print(f"Updated database saved to {filename}.")
+
+    def _read_table(self, filename: str) -> None:
+        """
+        Builds ``database`` straight from the table's columns. Postings come
+        from the ``.post`` file saved with the table when it is up to date;
+        otherwise every entry is tokenized, as when loading a CSV.
+        """
+        import pandas as pd
+        if _table_format(filename) == "parquet":
+            frame = pd.read_parquet(filename)
+        else:
+            frame = pd.read_feather(filename)
+        contents = frame["content"].tolist()
+        columns = {
+            "name": frame["name"].astype(str).tolist(),
+            "timestamp": pd.to_datetime(frame["timestamp"], unit="s").dt.strftime(TIMESTAMP_FORMAT).tolist(),
+            "tags": [','.join(t) if t is not None else '' for t in frame["tags"]],
+        }
+        if self.content_store is not None:
+            self.content_store.clear()
+            for content in contents:
+                self.content_store.append(content)
+        else:
+            columns["content"] = contents
+        self.database.extend(dict(zip(columns, row)) for row in zip(*columns.values()))
+        extras = [c for c in frame.columns if c not in ENTRY_FIELDS]
+        if extras:
+            for entry, meta in zip(self.database, frame[extras].to_dict("records")):
+                entry.update((k, v) for k, v in meta.items() if isinstance(v, str))
+        if not self._skip_indexing:
+            for idx, content in enumerate(contents):
+                self._index_content(idx, content)
+
+    def _save_sidecars(self, filename: str) -> None:
+        if os.path.exists(filename + HASH_SUFFIX):
+            # Digest files of earlier versions; has_entry builds its digests in memory.
+            os.remove(filename + HASH_SUFFIX)
+        postings_file = filename + POSTINGS_SUFFIX
+        if self.memory_budget is not None or _table_format(filename):
+            # Loading a table reads these postings instead of tokenizing every entry again.
+            write_postings(postings_file, self.content_index, len(self.database), _source_stamp(filename))
+            if self.memory_budget is not None:
+                self._open_disk_postings(postings_file)
+        elif os.path.exists(postings_file):
+            os.remove(postings_file)
+        positions_file = filename + POSITIONS_SUFFIX
+        if self.positions is not None:
+            self.positions.save(positions_file, len(self.database), _source_stamp(filename))
+            # Serve positions from the file from now on instead of keeping them in memory.
+            self._set_positions(PositionIndex.open(positions_file))
+        elif os.path.exists(positions_file):
+            os.remove(positions_file)
+
+    def _open_disk_postings(self, postings_file: str) -> None:
+        previous = self.content_index
+        self.content_index = DiskPostings(postings_file, self.memory_budget)  # type: ignore[arg-type]
+        if isinstance(previous, DiskPostings):
+            # Keep the counters running across saves.
+            self.content_index.hits = previous.hits
+            self.content_index.misses = previous.misses
+            self.content_index.evictions = previous.evictions
+            previous.close()
+
+    def _set_positions(self, positions: PositionIndex) -> None:
+        if self.positions is not None:
+            self.positions.close()  # Its file handle; an in-memory index has none.
+        self.positions = positions
+
+    def _reset_index(self) -> None:
+        if isinstance(self.content_index, DiskPostings):
+            self.content_index.close()
+        self.content_index = {}
+
+    def _rate_result(self, index: int, query_words: List[str], phrase_bonus: int = 0) -> float:
+        parts = self._score_components(self._doc_features(index), query_words, phrase_bonus)
+        return sum(parts[name] for name in SCORE_COMPONENTS) * parts['length_penalty']
+
+    def _score_components(self, features: _DocFeatures, query_words: List[str],
+                          phrase_bonus: int = 0) -> Dict[str, float]:
+        """``phrase_bonus`` rewards positional phrase matches (see :meth:`_phrase_matches`)."""
+        counts = features.content_counts
+        unique_matches = sum(1 for word in set(query_words) if word in counts)
+        return {
+            'content_score': sum(counts[word] for word in query_words),
+            'name_score': sum(3 for word in query_words if word in features.name_tokens),
+            'phrase_score': (5 if all(word in counts for word in query_words) else 0) + phrase_bonus,
+            'unique_match_score': unique_matches * 10,
+            'tag_score': sum(2 for tokens in features.tag_tokens if any(word in tokens for word in query_words)),
+            'length_penalty': min(1, features.length / 100),
+        }
+
+    def explain(self, query: str, index: int) -> Dict[str, object]:
+        """
+        Breaks down how entry ``index`` scores for ``query``: each additive
+        component of the score, the length penalty they are multiplied by,
+        the final ``score``, per-term content counts and whether the entry
+        is a ``candidate`` at all (it contains a selective query term and,
+        with positions, matches every quoted phrase).
+        Costs the same as scoring that one entry.
+        """
+        plan = self.plan_query(query)
+        query_words = plan.terms + plan.missing
+        features = self._doc_features(index)
+        allowed = self._phrase_matches(plan)
+        parts = self._score_components(features, query_words, allowed.get(index, 0) if allowed else 0)
+        explanation: Dict[str, object] = {'query_words': query_words}
+        explanation.update(parts)
+        explanation['length'] = features.length
+        explanation['term_counts'] = {word: features.content_counts[word] for word in query_words}
+        explanation['candidate'] = (any(features.content_counts[word] for word in plan.selective)
+                                    and (allowed is None or index in allowed))
+        explanation['score'] = sum(parts[name] for name in SCORE_COMPONENTS) * parts['length_penalty']
+        return explanation
+
+    def _doc_features(self, index: int) -> _DocFeatures:
+        entry = self.database[index]
+        content_tokens = self._tokenize(self.get_content(index))
+        return _DocFeatures(
+            content_counts=Counter(content_tokens),
+            name_tokens=set(self._tokenize(entry['name'])),
+            tag_tokens=[set(self._tokenize(tag)) for tag in entry['tags'].split(',')],
+            length=len(content_tokens),
+        )
 
     def _tokenize(self, text: str) -> List[str]:
         if re.search(r'[\u4e00-\u9fff]', text):
@@ -122,7 +682,63 @@ class FiberDBMS:
 
     def load_from_file(self, filename: str) -> None:
         self.database.clear()
-        self.content_index.clear()
+        self._reset_index()
+        self._hashes = None
+        stamp = _source_stamp(filename)
+        positions_file = filename + POSITIONS_SUFFIX
+        reuse_positions = _sidecar_current(positions_file, read_positions_header, stamp)
+        if reuse_positions:
+            # An index saved with positions keeps them, like a compressed one stays compressed.
+            self._set_positions(PositionIndex.open(positions_file))
+        elif self.positions is not None:
+            self._set_positions(PositionIndex())
+        postings_file = filename + POSTINGS_SUFFIX
+        # Tables keep their postings even without a memory budget (see _save_sidecars).
+        reuse_postings = (
+            (self.memory_budget is not None or bool(_table_format(filename)))
+            and _sidecar_current(postings_file, read_header, stamp)
+            and (self.positions is None or reuse_positions)
+        )
+        # With up-to-date postings on disk, loading skips tokenizing every entry.
+        self._skip_indexing = reuse_postings
+        self._skip_positions = reuse_positions
+        try:
+            if _table_format(filename):
+                self._read_table(filename)
+            else:
+                self._read_rows(filename)
+        finally:
+            self._skip_indexing = False
+            self._skip_positions = False
+        if reuse_positions and read_positions_header(positions_file)[0] != len(self.database):
+            # Skipped rows shift the entry ids, so positions are rebuilt.
+            self._set_positions(PositionIndex())
+            for idx in range(len(self.database)):
+                self.positions.add(idx, [t for t in self._tokenize(self.get_content(idx)) if t.strip()])
+        if reuse_postings and read_header(postings_file)[0] != len(self.database):
+            # Some rows were skipped, so the stored entry ids no longer line up.
+            reuse_postings = False
+            for idx in range(len(self.database)):
+                self._index_content(idx, self.get_content(idx))
+        if self.memory_budget is None:
+            if reuse_postings:
+                self.content_index = read_postings(postings_file)
+            return
+        if not reuse_postings:
+            write_postings(postings_file, self.content_index, len(self.database), stamp)
+        self._open_disk_postings(postings_file)
+
+    def _read_rows(self, filename: str) -> None:
+        block_file = filename + BLOCK_SUFFIX
+        stored = BlockStore.open(block_file, self.block_cache) if os.path.exists(block_file) else None
+        if stored is not None and self.compression is None:
+            # A compressed index stays compressed when it is saved again.
+            self.compression = stored.codec
+        if self.content_store is not None:
+            self.content_store.clear()
+        if self.compression:
+            self.content_store = BlockStore(self.compression, self.block_size, self.block_cache)
+        kept_rows = []
         with open(filename, 'r', encoding='utf-8', newline='') as csvfile:
             reader = csv.DictReader(csvfile)
             for idx, row in enumerate(reader):
@@ -145,14 +761,88 @@ class FiberDBMS:
                     entry = {
                         "name": row['name'],
                         "timestamp": row['timestamp'],
-                        "content": row['content'],
                         "tags": tags
                     }
-                    self.database.append(entry)
-                    self._index_content(idx, entry['content'])
+                    # Optional metadata columns; empty cells mean the entry has no such field.
+                    entry.update((k, v) for k, v in row.items() if k and k not in ENTRY_FIELDS and isinstance(v, str) and v)
+                    if stored is None:
+                        entry["content"] = row['content']
+                        self._append_entry(entry)
+                    else:
+                        self.database.append(entry)
+                        kept_rows.append(idx)
                 except Exception as e:
                     print(f"[X] Skipped unreadable row: {row} (error: {e})")
+        if stored is not None:
+            self._attach_block_store(stored, kept_rows)
+
+    def _attach_block_store(self, stored: BlockStore, kept_rows: List[int]) -> None:
+        """Indexes content read block by block from a loaded ``.blk`` file."""
+        aligned = kept_rows == list(range(len(stored)))
+        if aligned and self.content_store is not None and stored.codec == self.compression:
+            # Rows map 1:1 onto the file, so serve content lazily from disk.
+            self.content_store = stored
+            for idx, content in enumerate(stored):
+                self._index_content(idx, content)
+            return
+        wanted = set(kept_rows)
+        position = 0
+        for row, content in enumerate(stored):
+            if row not in wanted:
+                continue
+            if self.content_store is not None:
+                self.content_store.append(content)
+            else:
+                self.database[position]['content'] = content
+            self._index_content(position, content)
+            position += 1
+        stored.close()
 
+def _metadata_strings(metadata: Dict[str, object]) -> Dict[str, str]:
+    reserved = set(metadata) & set(ENTRY_FIELDS)
+    if reserved:
+        raise ValueError(f"Metadata cannot override entry fields: {sorted(reserved)}")
+    return {k: str(v) for k, v in metadata.items() if v is not None}
+
+def _rank_key(hit: Tuple[int, float]) -> Tuple[float, int]:
+    return -hit[1], hit[0]
+
+def _table_format(filename: str) -> Optional[str]:
+    return TABLE_FORMATS.get(os.path.splitext(filename)[1].lower())
+
+def _source_stamp(filename: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of an index file, recorded in its .post and .pos files."""
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+def _sidecar_current(path: str, read_header, stamp: Tuple[int, int]) -> bool:
+    """
+    Whether a .post or .pos file was written for the index file as it is
+    now: an edit that keeps the file size still changes its mtime.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        return read_header(path)[1] == stamp
+    except (OSError, ValueError) as exc:
+        print(f"Ignoring outdated or unreadable {path}: {exc}")
+        return False
+
+# Options only the in-memory backend understands; other backends ignore them.
+_MEMORY_OPTIONS = ("compression", "block_size", "block_cache", "memory_budget", "positions")
+
+def create_dbms(backend: str = "memory", **options) -> FiberDBMS:
+    """
+    Creates a FiberDBMS for the named storage backend:
+    ``"memory"`` (this module) or ``"sqlite"`` (SQLite FTS5, see
+    :mod:`arcana.fiber_sqlite`). Every backend exposes the same interface.
+    """
+    if backend == "memory":
+        return FiberDBMS(**options)
+    if backend == "sqlite":
+        from arcana.fiber_sqlite import SQLiteFiberDBMS
+        return SQLiteFiberDBMS(**{k: v for k, v in options.items() if k not in _MEMORY_OPTIONS})
+    raise ValueError(f"Unknown FiberDBMS backend '{backend}'. Use 'memory' or 'sqlite'.")
 
 def main():
     """
@@ -0,0 +1,358 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from arcana.fiber import ENTRY_FIELDS, FiberDBMS, QueryPlan, _metadata_strings
+from arcana.profiling import QueryStats
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+# Column weights for bm25(): name, terms, tags. They mirror the in-memory
+# ranking, where name matches count 3x and tag matches 2x a content match.
+BM25_WEIGHTS = (3.0, 1.0, 2.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(name, terms, tags, tokenize='unicode61');
+"""
+
+
+def is_sqlite_file(filename: str) -> bool:
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+class _EntryView:
+    """Read-only stand-in for ``FiberDBMS.database`` backed by the entries table."""
+    def __init__(self, dbms: "SQLiteFiberDBMS"):
+        self._dbms = dbms
+
+    def __len__(self) -> int:
+        return self._dbms._scalar("SELECT COUNT(*) FROM entries")
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index: int) -> Dict[str, str]:
+        row = self._dbms._fetchone("SELECT name, timestamp, tags, metadata FROM entries WHERE id = ?", (index,))
+        if row is None:
+            raise IndexError(f"entry {index} does not exist")
+        return dict(json.loads(row[3]), name=row[0], timestamp=row[1], tags=row[2])
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for _, entry in self._dbms.iter_entries():
+            yield entry
+
+
+class SQLiteFiberDBMS(FiberDBMS):
+    """
+    FiberDBMS backed by a SQLite database with an FTS5 full-text index
+    (stdlib ``sqlite3``, no server). Entries are inserted in batched
+    transactions, queries map to FTS5 ``MATCH`` ranked with ``bm25()`` and
+    snippets come from FTS5 ``snippet()``. Entries can be deleted or updated
+    in place, and memory use does not grow with the corpus.
+
+    Content is segmented with the same tokenizer as the in-memory index
+    (jieba for Chinese) before it is handed to FTS5, so both backends agree
+    on what a term is. ``index`` in results is the entry's row id.
+    """
+    def __init__(self, path: str = ":memory:", batch_size: int = 1000, max_df_ratio: float = 1.0):
+        super().__init__(max_df_ratio=max_df_ratio)
+        self.path = path
+        self.batch_size = batch_size
+        self._pending: List[Tuple[str, str, str, str, str]] = []
+        self._lock = threading.RLock()
+        self._conn = self._connect(path)
+        self.database = _EntryView(self)  # type: ignore[assignment]
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+        if "metadata" not in columns:
+            # Databases created before entries carried metadata.
+            conn.execute("ALTER TABLE entries ADD COLUMN metadata TEXT NOT NULL DEFAULT '{}'")
+        return conn
+
+    # --- Writes ---
+
+    def add_entry(self, name: str, content: str, tags: List[str], **metadata) -> None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        tags = ','.join(tags) if isinstance(tags, list) else tags
+        extra = json.dumps(_metadata_strings(metadata), ensure_ascii=False)
+        with self._lock:
+            if self._hashes is not None:
+                self._hashes.add((name, content))
+            self._pending.append((name, timestamp, content, tags, extra))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered entries in a single transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            next_id = self._scalar("SELECT COALESCE(MAX(id) + 1, 0) FROM entries", flush=False)
+            rows = [(next_id + i,) + row for i, row in enumerate(pending)]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO entries (id, name, timestamp, content, tags, metadata) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self._conn.executemany(
+                    "INSERT INTO entries_fts (rowid, name, terms, tags) VALUES (?, ?, ?, ?)",
+                    [(row[0], self._terms(row[1]), self._terms(row[3]), self._terms(row[4])) for row in rows],
+                )
+
+    def set_metadata(self, index: int, **metadata) -> None:
+        with self._lock:
+            current = {k: v for k, v in self.database[index].items() if k not in ENTRY_FIELDS}
+            current.update(_metadata_strings(metadata))
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE entries SET metadata = ? WHERE id = ?", (json.dumps(current, ensure_ascii=False), index)
+                )
+
+    def metadata_fields(self) -> List[str]:
+        fields = {}
+        for _, entry in self.iter_entries():
+            fields.update(dict.fromkeys(k for k in entry if k not in ENTRY_FIELDS))
+        return list(fields)
+
+    def delete_entry(self, index: int) -> None:
+        with self._lock:
+            self.flush()
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE id = ?", (index,))
+                self._conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (index,))
+            self._hashes = None
+
+    def entries_with(self, field: str, values: Iterable[str]) -> List[int]:
+        wanted = set(values)
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute("SELECT id, name, timestamp, tags, metadata FROM entries ORDER BY id").fetchall()
+        return [
+            row[0] for row in rows
+            if dict(json.loads(row[4]), name=row[1], timestamp=row[2], tags=row[3]).get(field) in wanted
+        ]
+
+    def remove_entries(self, indices: Iterable[int]) -> int:
+        """Deletes entries in one transaction. Ids of the remaining entries do not change."""
+        ids = [(index,) for index in indices]
+        with self._lock:
+            self.flush()
+            with self._conn:
+                removed = self._conn.executemany("DELETE FROM entries WHERE id = ?", ids).rowcount
+                self._conn.executemany("DELETE FROM entries_fts WHERE rowid = ?", ids)
+            self._hashes = None
+        return removed
+
+    def update_entry(self, index: int, name: Optional[str] = None, content: Optional[str] = None,
+                     tags: Optional[List[str]] = None) -> None:
+        with self._lock:
+            self.flush()
+            current = self.database[index]
+            name = current["name"] if name is None else name
+            content = self.get_content(index) if content is None else content
+            tag_text = current["tags"] if tags is None else (','.join(tags) if isinstance(tags, list) else tags)
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE entries SET name = ?, content = ?, tags = ? WHERE id = ?", (name, content, tag_text, index)
+                )
+                self._conn.execute(
+                    "UPDATE entries_fts SET name = ?, terms = ?, tags = ? WHERE rowid = ?",
+                    (self._terms(name), self._terms(content), self._terms(tag_text), index),
+                )
+            self._hashes = None
+
+    # --- Reads ---
+
+    def is_empty(self) -> bool:
+        return len(self.database) == 0
+
+    def get_content(self, index: int) -> str:
+        row = self._fetchone("SELECT content FROM entries WHERE id = ?", (index,))
+        if row is None:
+            raise IndexError(f"entry {index} does not exist")
+        return row[0]
+
+    def iter_entries(self) -> Iterator[Tuple[int, Dict[str, str]]]:
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                "SELECT id, name, timestamp, content, tags, metadata FROM entries ORDER BY id"
+            ).fetchall()
+        for row in rows:
+            yield row[0], dict({"name": row[1], "timestamp": row[2], "content": row[3], "tags": row[4]},
+                               **json.loads(row[5]))
+
+    def plan_query(self, query: str) -> QueryPlan:
+        query, phrases = self._parse_phrases(query)
+        words = [w for w in dict.fromkeys(self._tokenize(query)) if w.strip()]
+        return QueryPlan(terms=words, selective=words, phrases=phrases)
+
+    def _match_expression(self, plan: QueryPlan) -> str:
+        """FTS5 query: every phrase (or NEAR group) is required, any term ranks."""
+        def quote(word: str) -> str:
+            return '"' + word.replace('"', '""') + '"'
+
+        required = []
+        for terms, window in plan.phrases:
+            if window is None:
+                required.append(quote(" ".join(terms)))
+            else:
+                # NEAR counts the tokens between the terms; windows count the terms too.
+                gap = max(0, window - len(terms))
+                required.append(f"NEAR({' '.join(quote(w) for w in terms)}, {gap})")
+        return " AND ".join(required + ["(" + " OR ".join(quote(w) for w in plan.terms) + ")"])
+
+    def iter_query(self, query: str, top_n: Optional[int] = None, with_snippets: bool = True) -> Iterator[Dict[str, str]]:
+        stats = QueryStats(query)
+        self.last_stats = stats
+        started = time.perf_counter()
+        plan = self.plan_query(query)
+        self.last_plan = plan
+        started = stats.add("tokenize", started)
+        if not plan.terms:
+            return
+        match = self._match_expression(plan)
+        columns = "e.id, e.name, -bm25(entries_fts, ?, ?, ?) AS score"
+        if with_snippets:
+            columns += ", e.content, e.tags, e.metadata, snippet(entries_fts, 1, '', '', '...', 32)"
+        sql = (
+            f"SELECT {columns} FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+            "WHERE entries_fts MATCH ? ORDER BY score DESC, e.id"
+        )
+        params: tuple = BM25_WEIGHTS + (match,)
+        if top_n is not None:
+            sql += " LIMIT ?"
+            params += (top_n,)
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5 matches, ranks and builds snippets in one statement.
+        stats.add("score", started)
+        stats.candidates = stats.results = len(rows)
+        try:
+            for row in rows:
+                idx, name, score = row[:3]
+                if not with_snippets:
+                    yield {'name': name, 'index': idx, 'score': score}
+                    continue
+                content, tags, metadata, snippet = row[3:]
+                started = time.perf_counter()
+                result = {
+                    'name': name,
+                    'content': snippet,
+                    'tags': self._update_tags(tags, content, plan.terms),
+                    'index': idx,
+                    'score': score
+                }
+                stats.add("tags", started)
+                result.update(json.loads(metadata))
+                yield result
+        finally:
+            if self.profiler is not None:
+                self.profiler.record(stats)
+
+    def explain(self, query: str, index: int) -> Dict[str, object]:
+        """The FTS5 ``bm25()`` score of entry ``index`` and the column weights behind it."""
+        plan = self.plan_query(query)
+        score = None
+        if plan.terms:
+            row = self._fetchone(
+                "SELECT -bm25(entries_fts, ?, ?, ?) FROM entries_fts WHERE entries_fts MATCH ? AND rowid = ?",
+                BM25_WEIGHTS + (self._match_expression(plan), index),
+            )
+            score = row[0] if row else None
+        return {
+            'query_words': plan.terms,
+            'bm25_weights': dict(zip(("name", "terms", "tags"), BM25_WEIGHTS)),
+            'candidate': score is not None,
+            'score': score if score is not None else 0.0,
+        }
+
+    def query_many(self, queries: List[str], top_n: int, workers: int = 1) -> List[List[Dict[str, str]]]:
+        results = {q: self.query(q, top_n) for q in dict.fromkeys(queries)}
+        return [[dict(r) for r in results[q]] for q in queries]
+
+    # --- Persistence ---
+
+    def save(self, filename: str) -> None:
+        """Commits pending entries; saving to another file copies the database there."""
+        with self._lock:
+            self.flush()
+            if os.path.abspath(filename) != os.path.abspath(self.path):
+                target = sqlite3.connect(filename)
+                with target:
+                    self._conn.backup(target)
+                target.close()
+                if self.path == ":memory:":
+                    # Keep working on the saved file from now on.
+                    self._conn.close()
+                    self.path = filename
+                    self._conn = self._connect(filename)
+        print(f"Updated database saved to {filename}.")
+
+    def load_from_file(self, filename: str) -> None:
+        """
+        Opens a SQLite index, or imports a CSV index written by the in-memory
+        backend into the current database.
+        """
+        with self._lock:
+            self._pending = []
+            self._hashes = None
+            if is_sqlite_file(filename):
+                self._conn.close()
+                self.path = filename
+                self._conn = self._connect(filename)
+                return
+            if not os.path.exists(filename):
+                raise FileNotFoundError(filename)
+            legacy = FiberDBMS()
+            legacy.load_from_file(filename)
+            with self._conn:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("DELETE FROM entries_fts")
+            for _, entry in legacy.iter_entries():
+                extra = {k: v for k, v in entry.items() if k not in ENTRY_FIELDS}
+                self._pending.append((entry['name'], entry['timestamp'], entry['content'], entry['tags'],
+                                      json.dumps(extra, ensure_ascii=False)))
+                if len(self._pending) >= self.batch_size:
+                    self.flush()
+            self.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # --- Helpers ---
+
+    def _terms(self, text: str) -> str:
+        return " ".join(w for w in self._tokenize(text) if w.strip())
+
+    def _scalar(self, sql: str, params: tuple = (), flush: bool = True):
+        row = self._fetchone(sql, params, flush)
+        return row[0] if row else None
+
+    def _fetchone(self, sql: str, params: tuple = (), flush: bool = True):
+        with self._lock:
+            if flush:
+                self.flush()
+            return self._conn.execute(sql, params).fetchone()
@@ -1,15 +1,27 @@
 import os
 import streamlit as st
+import time
 import shutil
 # Defer heavy imports to runtime to avoid import-time failures
 try:
     from scripts.config import CACHE_DIR, INDEX_FILE  # type: ignore
+    from scripts.config import INDEX_COMPRESSION, INDEX_PARTITIONED, INDEX_PARTITION_DIR  # type: ignore
+    from scripts.config import INDEX_POSITIONS  # type: ignore
+    from scripts.config import INDEX_WATCH, INDEX_WATCH_DEBOUNCE, INDEX_WATCH_POLL_INTERVAL  # type: ignore
 except Exception:
     # Fallback: derive cache dir relative to repository if scripts.config isn't importable
     BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
     CACHE_DIR = os.path.join(BASE_DIR, "cache")
     INDEX_FILE = os.path.join(BASE_DIR, "data", "arcana_index.csv")
+    INDEX_COMPRESSION = None
+    INDEX_PARTITIONED = False
+    INDEX_PARTITION_DIR = os.path.join(BASE_DIR, "data", "arcana_partitions")
+    INDEX_POSITIONS = False
+    INDEX_WATCH = False
+    INDEX_WATCH_DEBOUNCE = 2.0
+    INDEX_WATCH_POLL_INTERVAL = 5.0
 from arcana.fiber import FiberDBMS
+from arcana.partitions import PartitionedFiberDBMS
 
 def move_file(current_path, item, selected_folder, new_folder_name=""):
     """
@@ -149,6 +161,101 @@ def _display_item(col, item: str, current_path: str, directories: list):
                 if delete_item(full_path):
                     st.rerun()
 
+def _top_level_folder(path: str):
+    """Returns the top-level CACHE_DIR folder containing ``path``, or None at the base."""
+    relative_path = os.path.relpath(path, CACHE_DIR)
+    if relative_path == "." or relative_path.startswith(os.pardir):
+        return None
+    return relative_path.split(os.sep)[0]
+
+def get_partitions() -> PartitionedFiberDBMS:
+    """Returns the per-folder index partitions kept in session_state, loading them once."""
+    if not isinstance(st.session_state.get("partitions"), PartitionedFiberDBMS):
+        partitions = PartitionedFiberDBMS(INDEX_PARTITION_DIR, compression=INDEX_COMPRESSION, positions=INDEX_POSITIONS)
+        partitions.load()
+        st.session_state.partitions = partitions
+    return st.session_state.partitions
+
+def watch_index():
+    """
+    Starts the background watcher that keeps the index in sync with
+    CACHE_DIR (once per process), and reloads this session's index after
+    the watcher has changed it. Does nothing unless INDEX_WATCH is set.
+    """
+    if not INDEX_WATCH:
+        return None
+    try:
+        from arcana.indexing import index_updater, partition_updater  # type: ignore
+        from arcana.watcher import get_index_watcher, start_index_watcher
+    except Exception as e:
+        print(f"[!] Index watcher is unavailable: {e}")
+        return None
+    watcher = get_index_watcher()
+    if watcher is None:
+        if INDEX_PARTITIONED:
+            # The watcher's own partitions, shared by no session.
+            partitions = PartitionedFiberDBMS(INDEX_PARTITION_DIR, compression=INDEX_COMPRESSION, positions=INDEX_POSITIONS)
+            partitions.load()
+            update = partition_updater(CACHE_DIR, partitions)
+        else:
+            update = index_updater(CACHE_DIR)
+        watcher = start_index_watcher(CACHE_DIR, update, debounce=INDEX_WATCH_DEBOUNCE,
+                                      poll_interval=INDEX_WATCH_POLL_INTERVAL)
+    seen = st.session_state.setdefault("index_generation", watcher.generation)
+    if watcher.generation != seen:
+        st.session_state.index_generation = watcher.generation
+        if INDEX_PARTITIONED and isinstance(st.session_state.get("partitions"), PartitionedFiberDBMS):
+            st.session_state.partitions.load()
+        elif isinstance(st.session_state.get("dbms"), FiberDBMS) and os.path.exists(INDEX_FILE):
+            st.session_state.dbms.load_from_file(INDEX_FILE)
+    return watcher
+
+def show_index_job(job):
+    """
+    Renders the progress of a background indexing job with a Cancel button,
+    rerunning the page until it finishes; then reloads the index.
+    """
+    progress = job.progress
+    if job.running:
+        st.progress(progress.fraction, text=progress.summary())
+        if progress.current_file:
+            st.caption(f"Processing {progress.current_file}")
+        cols = st.columns(4)
+        cols[0].metric("Files", f"{progress.files_done}/{progress.files_total}")
+        cols[1].metric("Failed", progress.files_failed)
+        cols[2].metric("Entries/s", f"{progress.entries_per_second:.0f}")
+        eta = progress.eta
+        cols[3].metric("ETA", "-" if eta is None else f"{eta:.0f}s")
+        if st.button("Cancel Indexing", disabled=job.cancel_token.cancelled,
+                     help="Stop after the current page; files finished so far are kept."):
+            job.cancel()
+        time.sleep(0.5)
+        st.rerun()
+        return
+
+    del st.session_state["index_job"]
+    if job.error is not None:
+        st.error(f"Indexing failed: {job.error}")
+        return
+
+    # Use the existing dbms instance from session_state to reload the data
+    if INDEX_PARTITIONED:
+        pass  # Partitions were rebuilt in place
+    elif 'dbms' in st.session_state and isinstance(st.session_state.dbms, FiberDBMS):
+        st.session_state.dbms.load_from_file(INDEX_FILE)
+    else:
+        # Fallback for safety, though it shouldn't be needed
+        dbms = FiberDBMS()
+        dbms.load_from_file(INDEX_FILE)
+        st.session_state.dbms = dbms
+
+    if progress.phase == "cancelled":
+        st.warning(f"Indexing cancelled after {progress.files_done} of {progress.files_total} files; "
+                   "the rest will be indexed on the next run.")
+    else:
+        st.success(f"Indexing complete! 🎉 {job.result} entries were processed.")
+        st.toast("Database updated successfully!")
+
 def display_cached_files():
     """
     Displays the file browser UI, allowing users to navigate directories,
@@ -216,28 +323,40 @@ def files_page():
 
     st.markdown("---")
     st.header("Database Indexing")
-    st.info("Re-indexing is required after moving, renaming, or uploading files to ensure the chatbot can find them.")
-    if st.button("Re-Index All Files", help="Click here to process all files in the Finder and update the search database. This can take a moment."):
-        with st.spinner("Indexing in progress... Please wait."):
-            # Import indexing lazily to avoid module import errors at app startup
-            try:
-                from arcana.indexing import indexing  # type: ignore
-            except Exception as e:
-                st.error(f"Indexing is unavailable: {e}. Ensure dependencies are installed and PYTHONPATH includes project root.")
-                return
-            entry_count = indexing(CACHE_DIR)
-            
-            # Use the existing dbms instance from session_state to reload the data
-            if 'dbms' in st.session_state and isinstance(st.session_state.dbms, FiberDBMS):
-                st.session_state.dbms.load_from_file(INDEX_FILE)
-            else:
-                # Fallback for safety, though it shouldn't be needed
-                dbms = FiberDBMS()
-                dbms.load_from_file(INDEX_FILE)
-                st.session_state.dbms = dbms
-
-            st.success(f"Indexing complete! 🎉 {entry_count} entries were processed.")
-            st.toast("Database updated successfully!")
+    watcher = watch_index()
+    if watcher is not None:
+        st.info(f"New, changed and removed files are indexed automatically ({watcher.backend}).")
+        if watcher.last_error:
+            st.warning(f"The last automatic index update failed: {watcher.last_error}")
+    else:
+        st.info("Re-indexing is required after moving, renaming, or uploading files to ensure the chatbot can find them.")
+    job = st.session_state.get("index_job")
+    if job is None and st.button("Re-Index All Files", help="Click here to update the search database. Only new and changed files are processed; entries of deleted files are removed."):
+        # Import indexing lazily to avoid module import errors at app startup
+        try:
+            from arcana.indexing import indexing, indexing_partitioned  # type: ignore
+            from arcana.progress import IndexingJob
+        except Exception as e:
+            st.error(f"Indexing is unavailable: {e}. Ensure dependencies are installed and PYTHONPATH includes project root.")
+            return
+        if INDEX_PARTITIONED:
+            job = IndexingJob(indexing_partitioned, CACHE_DIR, get_partitions())
+        else:
+            job = IndexingJob(indexing, CACHE_DIR)
+        st.session_state.index_job = job.start()
+    if job is not None:
+        show_index_job(job)
+
+    current_folder = _top_level_folder(st.session_state.get("current_path", CACHE_DIR))
+    if INDEX_PARTITIONED and current_folder and st.button(f"Re-Index '{current_folder}' Only", help="Rebuild only this folder's index partition; other folders are left untouched."):
+        with st.spinner(f"Indexing '{current_folder}'... Please wait."):
+            try:
+                from arcana.indexing import index_folder  # type: ignore
+            except Exception as e:
+                st.error(f"Indexing is unavailable: {e}. Ensure dependencies are installed and PYTHONPATH includes project root.")
+                return
+            entry_count = index_folder(CACHE_DIR, current_folder, get_partitions())
+            st.success(f"Indexing complete! 🎉 {entry_count} entries are in '{current_folder}'.")
 
 if __name__ == "__main__":
     files_page()
@@ -1,9 +1,19 @@
 import os
+import threading
+from functools import wraps
 import pandas as pd
 from docx import Document
 from pptx import Presentation
-import chardet
-from arcana.fiber import FiberDBMS
+from arcana.fiber import create_dbms
+from arcana.contenthash import ContentHashSet
+from arcana.simhash import NearDuplicateIndex, simhash
+from arcana.chunking import chunk_units
+from arcana.manifest import FileManifest, MANIFEST_SUFFIX, file_digest, relative_source
+from arcana.extraction import ExtractionPool
+from arcana.textcache import TextCache, cache_key
+from arcana.encoding import EncodingCache, decode_lines
+from arcana.progress import IndexingCancelled, IndexingProgress
+from arcana.partitions import PartitionedFiberDBMS, ROOT_PARTITION
 import nltk
 
 # Ensure NLTK data is available before importing NLTK functions
@@ -12,12 +22,47 @@ from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from PyPDF2 import PdfReader
 import csv
+try:
+    from openpyxl import load_workbook
+except ImportError:  # Optional: .xlsx is then read through pandas
+    load_workbook = None
 import re
 import ast
-from scripts.config import INDEX_FILE
+from scripts.config import INDEX_FILE, INDEX_COMPRESSION, INDEX_MEMORY_BUDGET, INDEX_BACKEND
+from scripts.config import INDEX_NEAR_DUPLICATES, INDEX_CHUNK_TOKENS, INDEX_CHUNK_OVERLAP, INDEX_POSITIONS
+from scripts.config import INDEX_EXTRACT_WORKERS, INDEX_EXTRACT_TIMEOUT, INDEX_EXTRACT_MEMORY_MB
+from scripts.config import INDEX_TEXT_CACHE_DIR, INDEX_TEXT_CACHE_MB
 
 # NLTK data is now downloaded once in Arcanalte.py at startup.
 
+# File types extract_units can read; other files are skipped without being opened.
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pptx", ".xls", ".xlsx", ".csv", ".pdf")
+SPREADSHEET_EXTENSIONS = (".xls", ".xlsx", ".csv")
+
+# Joins the paths of identical files in an entry's "sources" metadata.
+SOURCES_SEPARATOR = "|"
+
+# Formats without pages are extracted in units of about this many characters
+# (spreadsheets: rows), so that no whole document has to be held as one string.
+TEXT_UNIT_CHARS = 1024 * 1024
+SHEET_UNIT_ROWS = 10000
+
+# Bump when extract_units changes its output, so cached extractions are redone.
+EXTRACTOR_VERSION = 2
+
+_text_cache = None
+_encoding_cache = None
+
+# Indexing runs from the Finder and from the background watcher; one at a time.
+_index_lock = threading.RLock()
+
+def _serialized(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _index_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
 def extract_keywords(text, lang='en'):
     # Handles both English and Chinese, and ignores emojis/symbols
     stop_words = set(stopwords.words('english')) if lang == 'en' else set()
@@ -33,91 +78,701 @@ def detect_language(text):
         return 'zh'
     return 'en'
 
-def indexing(cache_dir: str):
+def get_encoding_cache():
+    """The shared cache of detected text encodings, or None without INDEX_TEXT_CACHE_DIR."""
+    global _encoding_cache
+    if _encoding_cache is None and INDEX_TEXT_CACHE_DIR:
+        _encoding_cache = EncodingCache(os.path.join(INDEX_TEXT_CACHE_DIR, "encodings"))
+    return _encoding_cache
+
+def _text_lines(source, digest=None):
+    """
+    Yields the lines of a text file (a path or a binary file object) in one
+    streamed pass: as UTF-8, or in the encoding chardet detects otherwise,
+    which is remembered for the file's content hash ``digest``.
+    """
+    cache = get_encoding_cache() if digest else None
+    encoding = cache.get(digest) if cache is not None else None
+    on_detect = (lambda detected: cache.set(digest, detected)) if cache is not None else None
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield from decode_lines(f, encoding, on_detect)
+        return
+    source.seek(0)
+    yield from decode_lines(source, encoding, on_detect)
+
+def _blocks(lines):
+    """Joins lines into blocks of about TEXT_UNIT_CHARS characters."""
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line) + 1
+        if size >= TEXT_UNIT_CHARS:
+            yield "\n".join(block)
+            block, size = [], 0
+    if block:
+        yield "\n".join(block)
+
+def _cell(value) -> str:
+    """A spreadsheet cell as one line of text ("" when empty)."""
+    if value is None or value != value:  # Empty, or NaN from pandas
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split())
+
+def format_row(header: list, values) -> str:
+    """The non-empty cells of a spreadsheet row as "header: value" pairs joined by " | "."""
+    pairs = []
+    for i, value in enumerate(values):
+        value = _cell(value)
+        if value:
+            name = header[i] if i < len(header) and header[i] else f"column {i + 1}"
+            pairs.append(f"{name}: {value}")
+    return " | ".join(pairs)
+
+def _sheet_rows(source, file_extension: str, digest=None):
+    """
+    Yields (sheet name, rows) for each sheet of a spreadsheet (one unnamed
+    sheet for CSV), where rows iterates the cell values of every row,
+    header row first, without loading the sheet.
+    """
+    if file_extension == ".csv":
+        yield None, csv.reader(line + "\n" for line in _text_lines(source, digest))
+    elif file_extension == ".xlsx" and load_workbook is not None:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield sheet.title, sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        # .xls files are capped at 65536 rows, so a sheet fits in memory.
+        with pd.ExcelFile(source) as workbook:
+            for sheet in workbook.sheet_names:
+                frame = workbook.parse(sheet, header=None, dtype=object)
+                yield sheet, frame.itertuples(index=False, name=None)
+
+def _row_blocks(header: list, rows):
+    """Formats rows in blocks of SHEET_UNIT_ROWS lines, keeping empty rows as empty lines."""
+    block = []
+    for row in rows:
+        block.append(format_row(header, row))
+        if len(block) >= SHEET_UNIT_ROWS:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+def is_spreadsheet(file: str) -> bool:
+    return os.path.splitext(file)[1].lower() in SPREADSHEET_EXTENSIONS
+
+def extract_units(source, file_extension=None, digest=None):
+    """
+    Yields (unit, text) pairs for a supported file, one page, slide or sheet
+    at a time, so memory is bounded by the largest unit rather than the
+    whole document. Unit labels a page ("page 3"), slide ("slide 2") or
+    sheet ("sheet Q1"); it is None for formats without pages, whose text
+    comes in blocks of about TEXT_UNIT_CHARS characters. Spreadsheets are
+    streamed row by row: one line of "header: value" pairs per row below
+    the header row, in blocks of SHEET_UNIT_ROWS rows. Unsupported formats
+    yield nothing.
+
+    Args:
+        source: A file path, or a binary file object such as a Streamlit upload.
+        file_extension (str): Overrides the extension taken from the path
+            (or from ``source.name``).
+        digest (str): The file's content hash, if known; text files whose
+            encoding was detected before are not sampled again.
+    """
+    if file_extension is None:
+        file_extension = os.path.splitext(source if isinstance(source, str) else source.name)[1]
+    file_extension = file_extension.lower()
+    if file_extension == ".txt":
+        for block in _blocks(_text_lines(source, digest)):
+            yield None, block
+    elif file_extension == ".docx":
+        doc = Document(source)
+        for block in _blocks(para.text for para in doc.paragraphs):
+            yield None, block
+    elif file_extension == ".pptx":
+        presentation = Presentation(source)
+        for number, slide in enumerate(presentation.slides, start=1):
+            slide_texts = []
+            if slide.shapes.title:
+                slide_texts.append(slide.shapes.title.text)
+            for shape in slide.shapes:
+                if shape.has_text_frame:
+                    slide_texts.append(shape.text_frame.text)  # type: ignore
+            yield f"slide {number}", "\n".join(slide_texts)
+    elif file_extension in SPREADSHEET_EXTENSIONS:
+        for sheet, rows in _sheet_rows(source, file_extension, digest):
+            rows = iter(rows)
+            header = [_cell(value) for value in next(rows, ())]
+            for block in _row_blocks(header, rows):
+                yield (f"sheet {sheet}" if sheet is not None else None), block
+    elif file_extension == ".pdf":
+        reader = PdfReader(source)
+        for number, page in enumerate(reader.pages, start=1):
+            yield f"page {number}", page.extract_text() or ''
+
+def extract_content(file_path: str):
+    """
+    Extracts the text of a supported file.
+
+    Args:
+        file_path (str): Path to a .txt, .docx, .pptx, .xls/.xlsx/.csv or .pdf file.
+
+    Returns:
+        str | None: The extracted text, or None for unsupported formats.
+    """
+    texts = [text for _, text in extract_units(file_path)]
+    return "\n".join(texts) if texts else None  # Ignore unsupported formats
+
+def get_text_cache():
+    """The shared extracted-text cache, or None if INDEX_TEXT_CACHE_MB disables it."""
+    global _text_cache
+    if _text_cache is None and INDEX_TEXT_CACHE_MB:
+        _text_cache = TextCache(INDEX_TEXT_CACHE_DIR, INDEX_TEXT_CACHE_MB * 1024 * 1024)
+    return _text_cache
+
+def cached_units(source, digest: str, file_extension=None):
+    """
+    extract_units for a file whose content hash is ``digest``, served from
+    the text cache when the same bytes were extracted before.
+    """
+    if file_extension is None:
+        file_extension = os.path.splitext(source if isinstance(source, str) else source.name)[1]
+    cache = get_text_cache()
+    if cache is None:
+        return extract_units(source, file_extension, digest)
+    return cache.units(cache_key(digest, file_extension, EXTRACTOR_VERSION),
+                       extract_units(source, file_extension, digest))
+
+def _extract_file(item):
+    """extract_units for a (path, digest) pair, as run by the extraction pool."""
+    file_path, digest = item
+    return extract_units(file_path, digest=digest)
+
+def extract_files(file_paths: list, digests=None):
+    """
+    Yields (file_path, units) for each file in the given order, where units
+    iterates the file's (unit, text) pairs as they are extracted and raises
+    if extraction fails; it must be consumed before the next file. Files
+    found in the text cache are not parsed again (``digests`` maps paths to
+    content hashes already known). The rest are extracted by a pool of
+    INDEX_EXTRACT_WORKERS processes, each allowed INDEX_EXTRACT_TIMEOUT
+    seconds per unit and INDEX_EXTRACT_MEMORY_MB of memory; the order of the
+    results does not depend on the workers.
+    """
+    supported = [p for p in file_paths if os.path.splitext(p)[1].lower() in SUPPORTED_EXTENSIONS]
+    cache = get_text_cache()
+    digests = dict(digests or {})
+    keys = {}
+    if cache is not None:
+        for file_path in supported:
+            try:
+                digests[file_path] = digests.get(file_path) or file_digest(file_path)
+            except OSError:
+                continue  # Extraction reports the error.
+            keys[file_path] = cache_key(digests[file_path], os.path.splitext(file_path)[1], EXTRACTOR_VERSION)
+
+    def units_of(file_path, extracted):
+        return cache.units(keys[file_path], extracted) if file_path in keys else extracted
+
+    misses = [p for p in supported if p not in keys or keys[p] not in cache]
+    workers = min(INDEX_EXTRACT_WORKERS or os.cpu_count() or 1, len(misses))
+    if workers <= 1:
+        for file_path in file_paths:
+            yield file_path, units_of(file_path, extract_units(file_path, digest=digests.get(file_path)))
+        return
+    memory_limit = INDEX_EXTRACT_MEMORY_MB * 1024 * 1024 if INDEX_EXTRACT_MEMORY_MB else None
+    with ExtractionPool(_extract_file, workers, INDEX_EXTRACT_TIMEOUT, memory_limit) as pool:
+        extracted = pool.map((p, digests.get(p)) for p in misses)
+        current = next(extracted, None)
+        for file_path in file_paths:
+            if current is not None and current[0][0] == file_path:
+                yield file_path, units_of(file_path, current[1])
+                current = next(extracted, None)
+            else:
+                # Cached (extracted here only if evicted meanwhile), or unsupported.
+                yield file_path, units_of(file_path, extract_units(file_path, digest=digests.get(file_path)))
+
+def line_entries(file: str, content: str, existing_entries: ContentHashSet):
+    """Yields [name, line, keywords] for each new, non-empty line of a file."""
+    for i in content.split('\n'):
+        i = i.strip()
+        if i and (file, i) not in existing_entries:
+            lang = detect_language(i)
+            keywords = extract_keywords(i, lang)
+            existing_entries.add((file, i))  # avoid duplicates within same run
+            yield [file, i, ','.join(keywords)]
+
+def row_entries(file: str, units, existing_entries: ContentHashSet):
+    """
+    Yields [name, row, keywords, metadata] for each new, non-empty row of a
+    spreadsheet. The metadata holds the sheet (for workbooks), the row
+    number as spreadsheet programs show it and the columns with values.
+    """
+    last_rows = {}  # Sheet -> last row number, as a sheet spans several units
+    for unit, text in units:
+        number = last_rows.get(unit, 1)  # Row 1 is the header.
+        for number, line in enumerate(text.split('\n'), start=number + 1):
+            line = line.strip()
+            if not line or (file, line) in existing_entries:
+                continue
+            existing_entries.add((file, line))
+            keywords = extract_keywords(line, detect_language(line))
+            metadata = {"row": str(number),
+                        "columns": ",".join(pair.partition(": ")[0] for pair in line.split(" | "))}
+            if unit:
+                metadata["sheet"] = unit[len("sheet "):]
+            yield [file, line, ','.join(keywords), metadata]
+        last_rows[unit] = number
+
+def passage_entries(file: str, units, existing_entries: ContentHashSet):
+    """
+    Yields [name, passage, keywords, metadata] for each new passage of a
+    file, chunked to INDEX_CHUNK_TOKENS with INDEX_CHUNK_OVERLAP tokens of
+    overlap. The metadata holds the passage's line range and page or slide.
+    """
+    for passage in chunk_units(units, INDEX_CHUNK_TOKENS, INDEX_CHUNK_OVERLAP):
+        if (file, passage.text) in existing_entries:
+            continue
+        existing_entries.add((file, passage.text))
+        keywords = dict.fromkeys(extract_keywords(passage.text, detect_language(passage.text)))
+        yield [file, passage.text, ','.join(keywords), passage.metadata()]
+
+def file_entries(file: str, units):
+    """
+    Yields the entries of one file unit by unit as they are extracted: one
+    entry per row for spreadsheets; otherwise passages when
+    INDEX_CHUNK_TOKENS is set, or else one entry per line. Repeated lines
+    or passages within the file are yielded once; the file's entries in the
+    index were removed beforehand, so nothing else is checked. When
+    INDEX_NEAR_DUPLICATES is "document", the whole file is read first so
+    its near-duplicates can be collapsed.
+    """
+    seen = ContentHashSet()
+    if is_spreadsheet(file):
+        # Rows of one table look alike to SimHash, so they are never collapsed.
+        return row_entries(file, units, seen)
+    if INDEX_CHUNK_TOKENS:
+        entries = passage_entries(file, units, seen)
+    else:
+        entries = (entry for _, text in units for entry in line_entries(file, text, seen))
+    if INDEX_NEAR_DUPLICATES == "document":
+        return iter(collapse_near_duplicates(list(entries)))
+    return entries
+
+def collapse_near_duplicates(entries: list) -> list:
+    """
+    Collapses near-identical lines (SimHash within a few bits, e.g. a
+    header repeated with different punctuation) into their first
+    occurrence. Only lines with the same numbers are compared, so figures,
+    dates and phone numbers are never merged away. Takes [name, text,
+    keywords] or [name, text, keywords, metadata] entries and returns the
+    latter, with the number of collapsed occurrences as the "count" metadata.
+    """
+    detectors = {}  # Numbers in the line -> NearDuplicateIndex
+    kept = []
+    for entry in entries:
+        metadata = dict(entry[3]) if len(entry) > 3 else {}
+        fingerprint = simhash(entry[1])
+        detector = detectors.setdefault(tuple(re.findall(r'\d+', entry[1])), NearDuplicateIndex())
+        match = detector.find(fingerprint)
+        if match is not None:
+            first = kept[match][3]
+            first["count"] = first.get("count", 1) + metadata.get("count", 1)
+            continue
+        detector.add(fingerprint, len(kept))
+        kept.append(list(entry[:3]) + [metadata])
+    return kept
+
+def _entry_metadata(entry: list) -> dict:
+    """Metadata for add_entry; a count of 1 is implied and not stored."""
+    metadata = dict(entry[3]) if len(entry) > 3 else {}
+    if metadata.get("count") == 1:
+        del metadata["count"]
+    return metadata
+
+def _add_entries(dbms, entries: list) -> int:
+    for entry in entries:
+        name, content, tags = entry[:3]
+        dbms.add_entry(name=name, content=content, tags=tags.split(','), **_entry_metadata(entry))
+    return len(entries)
+
+def _add_file_entries(dbms, file: str, units, metadata: dict, pending: list) -> int:
+    """
+    Adds the entries of one file to ``dbms`` as its units are extracted, so
+    only one page or slide is held at a time, or collects them in
+    ``pending`` when near-duplicates are collapsed across the corpus.
+    ``metadata`` (see :func:`source_metadata`) is added to every entry. If
+    extraction fails or is cancelled halfway, the file's entries are taken
+    out again before the exception propagates, so a file is indexed
+    completely or not at all.
+
+    Returns:
+        int: The number of entries of the file.
+    """
+    collect = INDEX_NEAR_DUPLICATES == "corpus" and not is_spreadsheet(file)
+    start = len(pending)
+    count = 0
+    try:
+        for entry in file_entries(file, units):
+            entry = entry[:3] + [dict(_entry_metadata(entry), **metadata)]
+            if collect:
+                pending.append(entry)
+            else:
+                _add_entries(dbms, [entry])
+            count += 1
+    except BaseException:
+        del pending[start:]
+        if count and not collect:
+            dbms.remove_entries(dbms.entries_with("digest", [metadata["digest"]]))
+        raise
+    return count
+
+def content_groups(hashes: dict) -> dict:
+    """Groups sources by content hash: digest -> its sources, sorted."""
+    groups = {}
+    for source in sorted(hashes):
+        groups.setdefault(hashes[source], []).append(source)
+    return groups
+
+def source_metadata(digest: str, sources: list, clear: bool = False) -> dict:
     """
-    Traverses a directory, processes all supported files, extracts content and
-    keywords, and builds a search index using FiberDBMS.
+    The metadata tying entries to their file content: its "digest", the
+    first file with it as "source" and, for content found in several
+    files, all of them as "sources" separated by SOURCES_SEPARATOR
+    (``clear`` empties "sources" again for a single file).
+    """
+    metadata = {"source": sources[0], "digest": digest}
+    if len(sources) > 1:
+        metadata["sources"] = SOURCES_SEPARATOR.join(sources)
+    elif clear:
+        metadata["sources"] = ""
+    return metadata
+
+@_serialized
+def indexing(cache_dir: str, full: bool = False, dbms=None, progress=None, cancel=None):
+    """
+    Indexes the supported files of a directory incrementally. A manifest
+    next to INDEX_FILE records the size, mtime and content hash of every
+    indexed file, and every entry records the content hash of its file as
+    "digest" metadata: unchanged files are skipped without being opened,
+    new and changed files are extracted, and the entries of contents no
+    file has any more are removed. Identical files (e.g. one handout
+    uploaded into several folders) are extracted and indexed once; their
+    entries list every copy (see :func:`source_metadata`). Files that fail
+    to extract are recorded as "failed" with their hash, and are only tried
+    again once their content changes (or with ``full``).
 
     Args:
         cache_dir (str): The path to the directory containing files to be indexed.
+        full (bool): Ignore the manifest and extract every file again. Entries
+            not indexed from ``cache_dir`` (e.g. chat uploads) are kept.
+        dbms: A FiberDBMS already holding the contents of INDEX_FILE, updated
+            in place instead of loading the index from disk.
+        progress (IndexingProgress): Updated as files are processed.
+        cancel (CancellationToken): Checked between files and pages; once
+            cancelled, the files finished so far are saved and the rest are
+            left for the next run.
 
     Returns:
-        int: The total number of entries indexed.
+        int: The number of entries added.
     """
-    dbms = FiberDBMS()
-    # Load existing database if present to avoid duplicates
-    existing_entries = set()
+    progress = progress or IndexingProgress()
+    progress.update(phase="scanning")
+    manifest_file = INDEX_FILE + MANIFEST_SUFFIX
+    manifest = None if full or not os.path.exists(INDEX_FILE) else FileManifest.load(manifest_file)
+    rebuilding = manifest is None
+    if rebuilding:
+        manifest = FileManifest()
+    before = content_groups({source: state["hash"] for source, state in manifest.files.items()})
+    diff = manifest.scan(cache_dir, SUPPORTED_EXTENSIONS)
+    print(f"{len(diff.new)} new, {len(diff.changed)} changed, {len(diff.vanished)} vanished "
+          f"and {diff.unchanged} unchanged files in {cache_dir}")
+    progress.update(files_unchanged=diff.unchanged)
+    progress.discover(len(diff.to_index), sum(diff.states[source]["size"] for source in diff.to_index))
+    if not (rebuilding or diff.to_index or diff.vanished):
+        manifest.save(manifest_file)
+        progress.update(phase="done")
+        return 0
+
+    # Entries belong to a file content (its "digest"), shared by every copy of it.
+    replaced = set(diff.changed) | set(diff.vanished)
+    kept_states = {source: state for source, state in manifest.files.items() if source not in replaced}
+    kept = {source: state["hash"] for source, state in kept_states.items()}
+    groups = content_groups(dict(kept, **{source: diff.states[source]["hash"] for source in diff.to_index}))
+    indexed = set(kept.values())
+    failed = {state["hash"] for state in kept_states.values() if state.get("failed")}
+    for digest in list(indexed - failed):
+        if os.path.basename(groups[digest][0]) != os.path.basename(before[digest][0]):
+            indexed.discard(digest)  # Entries are named after the first copy: index it again.
+    relocated = [digest for digest in indexed if groups[digest] != before[digest]]
+
+    if dbms is None:
+        dbms = _load_index()
+    stale = dbms.entries_with("digest", (set(before) - indexed) | (set(groups) - indexed))
+    # Entries indexed before they carried a digest are found by their source.
+    legacy = replaced | set(diff.new) if rebuilding else replaced
+    stale += [idx for idx in dbms.entries_with("source", legacy) if not dbms.database[idx].get("digest")]
+    if rebuilding:
+        # Without a manifest, replace whatever came from these files before,
+        # including entries indexed before they carried their source.
+        names = {os.path.basename(source) for source in diff.new}
+        stale += [idx for idx in dbms.entries_with("name", names) if not dbms.database[idx].get("source")]
+        # Files gone since the index was built (e.g. renamed) are in no
+        # manifest diff: their entries are found by a source not walked.
+        sources = {entry.get("source") for entry in dbms.database}
+        stale += dbms.entries_with("source", sources - set(diff.states) - {None, ""})
+    removed = dbms.remove_entries(stale)
+    if removed:
+        print(f"Removed {removed} entries of changed or vanished files.")
+    for digest in relocated:
+        for idx in dbms.entries_with("digest", [digest]):
+            dbms.set_metadata(idx, **source_metadata(digest, groups[digest], clear=True))
+    for source in diff.vanished:
+        manifest.forget(source)
+    for source in diff.to_index:
+        if diff.states[source]["hash"] in indexed:
+            # A copy of indexed content, or of content that failed before.
+            manifest.record(source, dict(diff.states[source], failed=True)
+                            if diff.states[source]["hash"] in failed else diff.states[source])
+            progress.file_done(diff.states[source]["size"], 0)
+
+    added = 0
+    pending = []  # Collapsing near-duplicates across the corpus needs every entry first.
+    # One copy of each content is extracted; the others are recorded with it.
+    digests = [digest for digest in groups if digest not in indexed]
+    for digest in digests:
+        for source in groups[digest]:
+            manifest.forget(source)  # Recorded again once indexed.
+    paths = [os.path.join(cache_dir, groups[digest][0]) for digest in digests]
+    progress.update(phase="extracting")
+    try:
+        for digest, (file_path, units) in zip(digests, extract_files(paths, dict(zip(paths, digests)))):
+            sources = groups[digest]
+            file = os.path.basename(sources[0])
+            progress.update(current_file=sources[0])
+            try:
+                count = _add_file_entries(dbms, file, _cancellable(units, cancel),
+                                          source_metadata(digest, sources), pending)
+            except IndexingCancelled:
+                raise
+            except Exception as e:
+                # Recorded as failed, so it is not extracted again until its content changes.
+                print(f"Failed to process {file}: {e}")
+                for source in sources:
+                    manifest.record(source, dict(diff.states.get(source) or kept_states[source], failed=True))
+                    if source in diff.states:
+                        progress.file_done(diff.states[source]["size"], 0, failed=True)
+                continue
+            for source in sources:
+                manifest.record(source, diff.states.get(source) or kept_states[source])
+            if not (INDEX_NEAR_DUPLICATES == "corpus" and not is_spreadsheet(file)):
+                added += count
+            for n, source in enumerate(source for source in sources if source in diff.states):
+                progress.file_done(diff.states[source]["size"], count if n == 0 else 0)
+            copies = f" (also at {len(sources) - 1} other paths)" if len(sources) > 1 else ""
+            print(f"Processed {file}: {count} entries indexed{copies}.")
+    except IndexingCancelled:
+        print(f"Indexing cancelled after {progress.files_done} of {progress.files_total} files.")
+    if pending:
+        added += _add_entries(dbms, collapse_near_duplicates(pending))
+    print(f"Indexed {added} entries from {cache_dir}")
+
+    # Save the database using the dbms's save method to the configured file
+    progress.update(phase="saving", current_file="")
+    dbms.save(INDEX_FILE)
+    manifest.save(manifest_file)
+    print(f"Database saved to {INDEX_FILE}")
+    progress.update(phase="cancelled" if cancel is not None and cancel.cancelled else "done")
+    return added
+
+def _cancellable(units, cancel):
+    """Passes units through, stopping with IndexingCancelled once ``cancel`` is cancelled."""
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    for unit in units:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        yield unit
+
+def _load_index():
+    dbms = create_dbms(INDEX_BACKEND, compression=INDEX_COMPRESSION, memory_budget=INDEX_MEMORY_BUDGET,
+                       positions=INDEX_POSITIONS)
     if os.path.exists(INDEX_FILE):
         try:
             dbms.load_from_file(INDEX_FILE)
-            existing_entries = {(e['name'], e['content']) for e in dbms.database}
-            print(f"Loaded existing index with {len(existing_entries)} entries. New indexing will skip duplicates.")
         except Exception as exc:
             print(f"Could not load existing index for duplicate checking: {exc}")
+    return dbms
+
+def _index_stamp():
+    try:
+        stat = os.stat(INDEX_FILE)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def index_updater(cache_dir: str):
+    """
+    Returns an ``update(paths)`` function for arcana.watcher.IndexWatcher
+    that applies changes in ``cache_dir`` incrementally to a FiberDBMS kept
+    loaded between calls (reloaded only if INDEX_FILE was written by
+    someone else meanwhile). It returns whether the index changed.
+    """
+    live = {"dbms": None, "stamp": None}
+
+    def update(paths) -> bool:
+        with _index_lock:
+            if live["dbms"] is None or live["stamp"] != _index_stamp():
+                live["dbms"] = _load_index()
+            before = _index_stamp()
+            indexing(cache_dir, dbms=live["dbms"])
+            live["stamp"] = _index_stamp()
+            return live["stamp"] != before
+    return update
+
+def partition_updater(cache_dir: str, partitions: PartitionedFiberDBMS):
+    """
+    Like index_updater, for partitioned indexes: rebuilds the partitions of
+    the top-level folders the changed paths belong to, and drops those of
+    removed folders.
+    """
+    def update(paths) -> bool:
+        folders = set()
+        for path in paths:
+            parts = os.path.relpath(path, cache_dir).split(os.sep)
+            if parts[0] == os.pardir:
+                continue
+            top = os.path.join(cache_dir, parts[0])
+            nested = len(parts) > 1 or os.path.isdir(top) or parts[0] in partitions.names()
+            folders.add(parts[0] if nested else ROOT_PARTITION)
+        for folder in sorted(folders):
+            if folder == ROOT_PARTITION or os.path.isdir(os.path.join(cache_dir, folder)):
+                index_folder(cache_dir, folder, partitions)
+            else:
+                partitions.drop(folder)
+        return bool(folders)
+    return update
+
+def _partition_files(cache_dir: str, folder: str):
+    """
+    Yields (file name, path) for every supported file belonging to one
+    partition; other files (e.g. videos) are never hashed or opened.
+    """
+    def supported(file):
+        return os.path.splitext(file)[1].lower() in SUPPORTED_EXTENSIONS
+    if folder == ROOT_PARTITION:
+        for item in sorted(os.scandir(cache_dir), key=lambda e: e.name):
+            if item.is_file() and supported(item.name):
+                yield item.name, item.path
+        return
+    for root, dirs, files in os.walk(os.path.join(cache_dir, folder)):
+        dirs.sort()
+        for file in sorted(files):
+            if supported(file):
+                yield file, os.path.join(root, file)
 
-    entries = []
+def _file_sizes(files: list) -> int:
+    size = 0
+    for _, path in files:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
 
-    # Traverse the cache directory for all supported file types
-    for root, _, files in os.walk(cache_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_extension = os.path.splitext(file)[1].lower()
+@_serialized
+def index_folder(cache_dir: str, folder: str, partitions: PartitionedFiberDBMS, progress=None, cancel=None) -> int:
+    """
+    Rebuilds the index partition of one top-level folder of ``cache_dir``
+    (or of the files directly inside it for ``ROOT_PARTITION``), leaving
+    every other partition untouched. A cancelled rebuild keeps the old
+    partition.
 
+    Returns:
+        int: The number of entries in the rebuilt partition.
+    """
+    progress = progress or IndexingProgress()
+    files = list(_partition_files(cache_dir, folder))
+    progress.discover(len(files), _file_sizes(files))
+    added = _index_folder(cache_dir, folder, partitions, files, progress, cancel)
+    progress.update(phase="cancelled" if cancel is not None and cancel.cancelled else "done")
+    return added
+
+def _index_folder(cache_dir: str, folder: str, partitions: PartitionedFiberDBMS, files: list, progress, cancel) -> int:
+    dbms = partitions.new_partition()
+    pending = []
+    hashes, sizes = {}, {}
+    for _, path in files:
+        source = relative_source(path, cache_dir)
+        try:
+            sizes[source] = os.path.getsize(path)
+            hashes[source] = file_digest(path)
+        except OSError as e:
+            print(f"Failed to process {os.path.basename(path)}: {e}")
+            progress.file_done(sizes.pop(source, 0), 0, failed=True)
+    # Identical files in the partition are extracted once and share their entries.
+    groups = content_groups(hashes)
+    paths = [os.path.join(cache_dir, sources[0]) for sources in groups.values()]
+    progress.update(phase="extracting")
+    try:
+        for (digest, sources), (file_path, units) in zip(groups.items(), extract_files(paths, dict(zip(paths, groups)))):
+            file = os.path.basename(sources[0])
+            progress.update(current_file=sources[0])
             try:
-                # Process different file types and extract content
-                if file_extension == ".txt":
-                    with open(file_path, 'rb') as f:
-                        raw_data = f.read()
-                        encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
-                    with open(file_path, 'r', encoding=encoding, errors='replace') as f:
-                        content = f.read()
-                elif file_extension == ".docx":
-                    doc = Document(file_path)
-                    content = "\n".join([para.text for para in doc.paragraphs])
-                elif file_extension == ".pptx":
-                    presentation = Presentation(file_path)
-                    all_texts = []
-                    for slide in presentation.slides:
-                        slide_texts = []
-                        if slide.shapes.title:
-                            slide_texts.append(slide.shapes.title.text)
-                        for shape in slide.shapes:
-                            if shape.has_text_frame:
-                                slide_texts.append(shape.text_frame.text)  # type: ignore
-                        all_texts.append("\n".join(slide_texts))
-                    content = "\n".join(all_texts)
-                elif file_extension in [".xls", ".xlsx", ".csv"]:
-                    df = pd.read_excel(file_path) if "xls" in file_extension else pd.read_csv(file_path)
-                    content = df.to_csv(index=False)
-                elif file_extension == ".pdf":
-                    reader = PdfReader(file_path)
-                    content = "\n".join([page.extract_text() or '' for page in reader.pages])
-                else:
-                    content = None  # Ignore unsupported formats
-
-                # Add the file content to the database
-                if content:  # Ensure content is not None
-                    for i in content.split('\n'):
-                        i = i.strip()
-                        if i and (file, i) not in existing_entries:
-                            lang = detect_language(i)
-                            keywords = extract_keywords(i, lang)
-                            entries.append([file, i, ','.join(keywords)])
-                            existing_entries.add((file, i))  # avoid duplicates within same run
-                #print('The database has been indexed')
-                print(f"Processed {file}: {len(entries)} entries indexed.")
+                count = _add_file_entries(dbms, file, _cancellable(units, cancel),
+                                          source_metadata(digest, sources), pending)
+            except IndexingCancelled:
+                raise
             except Exception as e:
                 print(f"Failed to process {file}: {e}")
-    print(f"Indexed {len(entries)} entries from {cache_dir}")
+                for source in sources:
+                    progress.file_done(sizes[source], 0, failed=True)
+                continue
+            for n, source in enumerate(sources):
+                progress.file_done(sizes[source], count if n == 0 else 0)
+    except IndexingCancelled:
+        print(f"Indexing of partition '{folder or 'root'}' cancelled; keeping the previous one.")
+        return 0
+    if pending:
+        _add_entries(dbms, collapse_near_duplicates(pending))
+    progress.update(phase="saving", current_file="")
+    partitions.replace(folder, dbms)
+    print(f"Indexed {len(dbms.database)} entries into partition '{folder or 'root'}'")
+    return len(dbms.database)
 
-    # Add all new entries to dbms in one go
-    for name, content, tags in entries:
-        dbms.add_entry(name=name, content=content, tags=tags.split(','))
+@_serialized
+def indexing_partitioned(cache_dir: str, partitions: PartitionedFiberDBMS, progress=None, cancel=None) -> int:
+    """
+    Rebuilds one partition per top-level folder of ``cache_dir`` and drops
+    partitions whose folder no longer exists. Once ``cancel`` is cancelled,
+    the partition being rebuilt and the remaining ones are left as they were.
 
-    # Save the database using the dbms's save method to the configured file
-    dbms.save(INDEX_FILE)
-    print(f"Database saved to {INDEX_FILE}")
-    return len(entries)
+    Returns:
+        int: The total number of entries across all rebuilt partitions.
+    """
+    progress = progress or IndexingProgress()
+    progress.update(phase="scanning")
+    folders = [ROOT_PARTITION] + sorted(
+        item.name for item in os.scandir(cache_dir) if item.is_dir()
+    )
+    for stale in set(partitions.names()) - set(folders):
+        partitions.drop(stale)
+    folder_files = [(folder, list(_partition_files(cache_dir, folder))) for folder in folders]
+    for _, files in folder_files:
+        progress.discover(len(files), _file_sizes(files))
+    total = 0
+    for folder, files in folder_files:
+        if cancel is not None and cancel.cancelled:
+            break
+        total += _index_folder(cache_dir, folder, partitions, files, progress, cancel)
+    progress.update(phase="cancelled" if cancel is not None and cancel.cancelled else "done", current_file="")
+    return total
 
 def correct_malformed_row(row):
     # If row is a dict with a single key, try to split it
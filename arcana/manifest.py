@@ -0,0 +1,116 @@
+import os
+import json
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional
+
+# Sidecar file listing every indexed file with its size, mtime and hash.
+MANIFEST_SUFFIX = ".manifest.json"
+
+_READ_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """128-bit blake2b hex digest of a file's bytes, read in chunks."""
+    h = blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def data_digest(data: bytes) -> str:
+    """The :func:`file_digest` of a file whose bytes are already in memory."""
+    return blake2b(data, digest_size=16).hexdigest()
+
+
+def relative_source(path: str, root: str) -> str:
+    """The path of a file relative to the indexed folder, with forward slashes."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+@dataclass
+class ManifestDiff:
+    """What changed in a folder since the manifest was written."""
+    new: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    vanished: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    states: Dict[str, Dict[str, object]] = field(default_factory=dict)
+
+    @property
+    def to_index(self) -> List[str]:
+        return self.new + self.changed
+
+
+class FileManifest:
+    """
+    Record of the files an index was built from: relative path -> size,
+    mtime (ns) and content hash. A file whose size and mtime are unchanged
+    is skipped without being opened; otherwise its hash decides whether the
+    content really changed.
+    """
+    def __init__(self, files: Optional[Dict[str, Dict[str, object]]] = None):
+        self.files: Dict[str, Dict[str, object]] = files or {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["FileManifest"]:
+        """Reads a saved manifest, or returns None if there is none (or it is unreadable)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f)["files"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"[!] Ignoring unreadable manifest {path}: {exc}")
+            return None
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def scan(self, root: str, extensions: Optional[Iterable[str]] = None) -> ManifestDiff:
+        """
+        Compares every file under ``root`` with the manifest. With
+        ``extensions`` (lower case, e.g. ".pdf"), other files are ignored
+        before they are stat'ed or hashed, so large media never gets read.
+        """
+        extensions = None if extensions is None else tuple(extensions)
+        diff = ManifestDiff()
+        seen = set()
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            for file in sorted(files):
+                if extensions is not None and os.path.splitext(file)[1].lower() not in extensions:
+                    continue
+                path = os.path.join(folder, file)
+                source = relative_source(path, root)
+                seen.add(source)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                known = self.files.get(source)
+                if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                    diff.unchanged += 1
+                    continue
+                state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_digest(path)}
+                diff.states[source] = state
+                if known is None:
+                    diff.new.append(source)
+                elif known["hash"] != state["hash"]:
+                    diff.changed.append(source)
+                else:
+                    # Touched but identical: refresh the stat info, no re-indexing.
+                    self.files[source] = state
+                    diff.unchanged += 1
+        diff.vanished = sorted(set(self.files) - seen)
+        return diff
+
+    def record(self, source: str, state: Dict[str, object]) -> None:
+        self.files[source] = state
+
+    def forget(self, source: str) -> None:
+        self.files.pop(source, None)
@@ -14,6 +14,7 @@ from nltk.corpus import stopwords
 
 from response import openai_api_call
 from arcana.fiber import FiberDBMS
+from arcana.chunking import describe_location
 from scripts.config import GENERATED_FILES_DIR
 from openai.types.chat import ChatCompletionMessageParam
 from pptx import Presentation
@@ -415,27 +416,39 @@ def init_study_guide_state(force_reset=False):
 
 # --- Helper Functions ---
 
-def get_context_for_topic(dbms, topic):
-    """Extracts keywords from a topic and queries the database for relevant context."""
+def _topic_keywords(topic):
     stop_words = set(stopwords.words('english'))
     words = word_tokenize(topic)
-    keywords = [word for word in words if word.lower() not in stop_words and word.isalpha()]
-    
-    if not keywords:
-        return "" # Return empty string if no keywords are found
+    return [word for word in words if word.lower() not in stop_words and word.isalpha()]
 
-    results = dbms.query(" ".join(keywords), top_n=10)
-    
+def _format_context(results):
     if not results:
         return "" # Return empty string if no context is found
 
     context = "Here is some relevant information from your documents:\n\n"
     for result in results:
-        context += f"--- Start of content from {result['name']} ---\n"
+        context += f"--- Start of content from {result['name']}{describe_location(result)} ---\n"
         context += f"{result['content']}\n"
         context += f"--- End of content from {result['name']} ---\n\n"
     return context
 
+def get_context_for_topic(dbms, topic):
+    """Extracts keywords from a topic and queries the database for relevant context."""
+    keywords = _topic_keywords(topic)
+    
+    if not keywords:
+        return "" # Return empty string if no keywords are found
+
+    results = dbms.query(" ".join(keywords), top_n=10)
+    return _format_context(results)
+
+def get_contexts_for_topics(dbms, topics):
+    """Like get_context_for_topic, but retrieves context for many topics in one batched query."""
+    keyword_queries = [" ".join(_topic_keywords(topic)) for topic in topics]
+    searchable = [q for q in keyword_queries if q]
+    batched = dict(zip(searchable, dbms.query_many(searchable, top_n=10, workers=4))) if searchable else {}
+    return [_format_context(batched.get(q)) if q else "" for q in keyword_queries]
+
 def parse_outline_to_slides(outline_text):
     """Parses a markdown-formatted outline into a list of slide dictionaries."""
     slides = []
@@ -1091,6 +1104,10 @@ def render_study_guide_mode(dbms):
         
         with st.spinner(f"Generating detailed study guide content using {mode_display}..."):
             context = get_context_for_topic(dbms, st.session_state.study_guide_topic)
+            section_contexts = get_contexts_for_topics(dbms, [
+                f"{st.session_state.study_guide_topic} {section_info['title']} {' '.join(section_info['subsections'])}"
+                for section_info in parsed
+            ])
             style_instruction = get_study_guide_style_prompt(st.session_state.study_guide_style)
             page_count = st.session_state.get('study_guide_page_count', -1)
             page_count_instruction = get_page_count_instructions(page_count, len(parsed))
@@ -1107,7 +1124,7 @@ def render_study_guide_mode(dbms):
                     f"Include definitions, explanations, examples, and key points. "
                     f"Add practice questions or review items where appropriate. "
                     f"Structure your response with clear headers and organized sections. "
-                    f"Base your content on this context: {context[:2000]}..."  # Limit context to avoid token limits
+                    f"Base your content on this context: {(section_contexts[i] or context)[:2000]}..."  # Limit context to avoid token limits
                 )
                 
                 messages = [
@@ -0,0 +1,100 @@
+import os
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote, unquote
+
+from arcana.fiber import FiberDBMS, BLOCK_SUFFIX, HASH_SUFFIX, POSITIONS_SUFFIX, POSTINGS_SUFFIX
+
+# Partition holding the files that sit directly in CACHE_DIR.
+ROOT_PARTITION = ""
+
+_ROOT_FILE = "root.csv"
+_PREFIX = "part-"
+
+
+class PartitionedFiberDBMS:
+    """
+    A set of FiberDBMS indexes, one per top-level folder of the Finder's
+    ``CACHE_DIR``, stored as separate CSV files in ``directory``.
+
+    Queries can be scoped to selected partitions or fanned out across all of
+    them on a thread pool; per-partition hits are merged into one global
+    top-k by score. A single folder can be re-indexed by replacing only its
+    partition (see :func:`arcana.indexing.index_folder`).
+    """
+    def __init__(self, directory: str, workers: int = 4, **dbms_options):
+        self.directory = directory
+        self.workers = workers
+        self.dbms_options = dbms_options
+        self.partitions: Dict[str, FiberDBMS] = {}
+
+    def names(self) -> List[str]:
+        return sorted(self.partitions)
+
+    def is_empty(self) -> bool:
+        return all(p.is_empty() for p in self.partitions.values())
+
+    def partition_file(self, name: str) -> str:
+        file_name = _ROOT_FILE if name == ROOT_PARTITION else _PREFIX + quote(name, safe="") + ".csv"
+        return os.path.join(self.directory, file_name)
+
+    def new_partition(self) -> FiberDBMS:
+        """Returns an empty FiberDBMS configured like every other partition."""
+        return FiberDBMS(**self.dbms_options)
+
+    def load(self) -> None:
+        """Loads every partition file found in ``directory``."""
+        self.partitions.clear()
+        if not os.path.isdir(self.directory):
+            print(f"{self.directory} not found. Starting without partitions.")
+            return
+        for file_name in sorted(os.listdir(self.directory)):
+            if file_name == _ROOT_FILE:
+                name = ROOT_PARTITION
+            elif file_name.startswith(_PREFIX) and file_name.endswith(".csv"):
+                name = unquote(file_name[len(_PREFIX):-len(".csv")])
+            else:
+                continue
+            dbms = self.new_partition()
+            dbms.load_from_file(os.path.join(self.directory, file_name))
+            self.partitions[name] = dbms
+        print(f"Loaded {len(self.partitions)} index partitions from {self.directory}.")
+
+    def replace(self, name: str, dbms: FiberDBMS) -> None:
+        """Swaps in a rebuilt partition and saves it."""
+        os.makedirs(self.directory, exist_ok=True)
+        dbms.save(self.partition_file(name))
+        self.partitions[name] = dbms
+
+    def drop(self, name: str) -> None:
+        """Removes a partition and its files."""
+        self.partitions.pop(name, None)
+        path = self.partition_file(name)
+        for file_path in (path, path + BLOCK_SUFFIX, path + POSTINGS_SUFFIX, path + HASH_SUFFIX, path + POSITIONS_SUFFIX):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def query(self, query: str, top_n: int, partitions: Optional[Iterable[str]] = None) -> List[Dict[str, str]]:
+        """
+        Queries the selected partitions (all of them by default) in parallel
+        and returns the global top ``top_n``. Each result carries the name of
+        its ``partition``; ``index`` is local to that partition.
+        """
+        selected = self.names() if partitions is None else [p for p in partitions if p in self.partitions]
+        if not selected:
+            return []
+
+        def search(name: str) -> List[Dict[str, str]]:
+            hits = self.partitions[name].query(query, top_n)
+            for hit in hits:
+                hit['partition'] = name
+            return hits
+
+        if self.workers > 1 and len(selected) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(selected))) as executor:
+                per_partition = list(executor.map(search, selected))
+        else:
+            per_partition = [search(name) for name in selected]
+        return heapq.nlargest(top_n, (hit for hits in per_partition for hit in hits), key=itemgetter('score'))
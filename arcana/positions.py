@@ -0,0 +1,261 @@
+import os
+import json
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# File layout: header (MAGIC, entry count, size and mtime in ns of the index
+# file the positions belong to), one block per term, then a zlib-compressed
+# JSON term table of [term, offset, length] and a trailer with the table
+# offset. A term block is a run of varints: entry id delta, byte length of the
+# entry's positions, then the positions themselves as delta-encoded varints.
+MAGIC = b"FPO2"
+_HEADER = struct.Struct("<4sQQQ")
+_TRAILER = struct.Struct("<Q4s")
+
+# Decoded term blocks kept in memory when reading from a file.
+DEFAULT_CACHED_TERMS = 256
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def _encode_positions(positions: Sequence[int]) -> bytes:
+    return encode_varints(b - a for a, b in zip((0,) + tuple(positions), positions))
+
+
+def _decode_positions(data: bytes) -> List[int]:
+    return list(accumulate(decode_varints(data)))
+
+
+def _encode_block(entries: Dict[int, bytes]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for entry in sorted(entries):
+        data = entries[entry]
+        out += encode_varints((entry - previous, len(data)))
+        out += data
+        previous = entry
+    return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _decode_block(data: bytes) -> Dict[int, bytes]:
+    entries = {}
+    entry = pos = 0
+    while pos < len(data):
+        delta, pos = _read_varint(data, pos)
+        length, pos = _read_varint(data, pos)
+        entry += delta
+        entries[entry] = data[pos:pos + length]
+        pos += length
+    return entries
+
+
+def read_header(path: str) -> Tuple[int, Tuple[int, int]]:
+    """Returns (entry count, source index (size, mtime_ns)) recorded in a position file."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or header[:4] != MAGIC:
+        raise ValueError(f"{path} is not a current FiberDBMS position file")
+    _, entry_count, source_size, source_mtime = _HEADER.unpack(header)
+    return entry_count, (source_size, source_mtime)
+
+
+class PositionIndex:
+    """
+    Token positions of every term in every entry, for phrase and proximity
+    matching by intersecting positional postings. Positions are stored per
+    (term, entry) as delta-encoded varints.
+
+    A new index is kept in memory; one opened from a file written by
+    :meth:`save` only loads its term table and reads term blocks on demand
+    from the file, which stays open until :meth:`close`, so queries without
+    phrases never touch it. Entries added after opening go to an in-memory
+    overlay.
+    """
+    def __init__(self):
+        self._terms: Dict[str, Dict[int, bytes]] = {}
+        self._path: Optional[str] = None
+        self._file = None
+        self._table: Dict[str, Tuple[int, int]] = {}
+        self._cache: "OrderedDict[str, Dict[int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, entry: int, tokens: List[str]) -> None:
+        """Records the positions of ``tokens`` (whitespace already removed) for an entry."""
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        for token, token_positions in positions.items():
+            self._terms.setdefault(token, {})[entry] = _encode_positions(token_positions)
+
+    def entries(self, term: str) -> Dict[int, bytes]:
+        """Encoded positions of ``term`` per entry id."""
+        stored = self._read(term) if term in self._table else {}
+        extra = self._terms.get(term)
+        if extra:
+            stored = {**stored, **extra} if stored else extra
+        return stored
+
+    def positions(self, term: str, entry: int) -> List[int]:
+        data = self.entries(term).get(entry)
+        return _decode_positions(data) if data else []
+
+    def match(self, terms: List[str], window: Optional[int] = None) -> Dict[int, int]:
+        """
+        Entries where ``terms`` occur as an exact phrase (``window`` None),
+        or all within a span of ``window`` tokens in any order. Returns
+        entry id -> number of phrase occurrences, or the smallest span.
+        """
+        distinct = list(dict.fromkeys(terms))
+        postings = sorted((self.entries(t) for t in distinct), key=len)
+        if not distinct or not postings[0]:
+            return {}
+        candidates = set(postings[0])
+        for entries in postings[1:]:
+            candidates.intersection_update(entries)
+            if not candidates:
+                return {}
+        matches = {}
+        for entry in candidates:
+            decoded = {t: _decode_positions(self.entries(t)[entry]) for t in distinct}
+            if window is None:
+                following = [set(decoded[t]) for t in terms[1:]]
+                found = sum(
+                    1 for start in decoded[terms[0]]
+                    if all(start + offset in positions for offset, positions in enumerate(following, 1))
+                )
+            else:
+                span = _smallest_span(decoded)
+                found = span if span <= window else 0
+            if found:
+                matches[entry] = found
+        return matches
+
+    def remap(self, mapping: Dict[int, int]) -> "PositionIndex":
+        """
+        A new in-memory index with entry ids renumbered through ``mapping``
+        (old id -> new id); entries missing from the mapping are dropped.
+        """
+        index = PositionIndex()
+        for term in self._table.keys() | self._terms.keys():
+            entries = {mapping[entry]: data for entry, data in self.entries(term).items() if entry in mapping}
+            if entries:
+                index._terms[term] = entries
+        return index
+
+    def clear(self) -> None:
+        self.close()
+        self._terms.clear()
+        self._table.clear()
+        self._cache.clear()
+        self._path = None
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def save(self, path: str, entry_count: int, source_stamp: Tuple[int, int]) -> None:
+        """Writes the positions; ``source_stamp`` is the (size, mtime_ns) of the index file."""
+        tmp_path = path + ".tmp"
+        table = []
+        with open(tmp_path, "wb") as out:
+            out.write(_HEADER.pack(MAGIC, entry_count, *source_stamp))
+            for term in sorted(self._table.keys() | self._terms.keys()):
+                data = _encode_block(self.entries(term))
+                table.append([term, out.tell(), len(data)])
+                out.write(data)
+            table_offset = out.tell()
+            out.write(zlib.compress(json.dumps(table, ensure_ascii=False).encode("utf-8")))
+            out.write(_TRAILER.pack(table_offset, MAGIC))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path: str) -> "PositionIndex":
+        index = cls()
+        index._file = f = open(path, "rb")
+        try:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            end = f.tell()
+            table_offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} has a corrupt trailer")
+            f.seek(table_offset)
+            table = json.loads(zlib.decompress(f.read(end - table_offset)).decode("utf-8"))
+        except BaseException:
+            index.close()
+            raise
+        index._path = path
+        index._table = {term: (offset, length) for term, offset, length in table}
+        return index
+
+    def _read(self, term: str) -> Dict[int, bytes]:
+        with self._lock:
+            entries = self._cache.get(term)
+            if entries is not None:
+                self._cache.move_to_end(term)
+                return entries
+        offset, length = self._table[term]
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        entries = _decode_block(data)
+        with self._lock:
+            self._cache[term] = entries
+            while len(self._cache) > DEFAULT_CACHED_TERMS:
+                self._cache.popitem(last=False)
+        return entries
+
+
+def _smallest_span(positions: Dict[str, List[int]]) -> int:
+    """Length in tokens of the shortest window holding every term at least once."""
+    events = sorted((p, t) for t, plist in positions.items() for p in plist)
+    needed = len(positions)
+    counts: Dict[str, int] = {}
+    best = float("inf")
+    left = 0
+    for right, (position, term) in enumerate(events):
+        counts[term] = counts.get(term, 0) + 1
+        while len(counts) == needed:
+            start, first = events[left]
+            best = min(best, position - start + 1)
+            counts[first] -= 1
+            if not counts[first]:
+                del counts[first]
+            left += 1
+    return int(best) if best != float("inf") else 0
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# File layout: header (MAGIC, entry count, size and mtime in ns of the CSV the
+# postings belong to), one block per term holding its zlib-compressed,
+# delta-encoded uint32 entry ids, then a zlib-compressed JSON term table of
+# [term, offset, length, df] and a trailer with the table offset.
+MAGIC = b"FPS2"
+_HEADER = struct.Struct("<4sQQQ")
+_TRAILER = struct.Struct("<Q4s")
+
+
+def _encode(postings: Iterable[int]) -> bytes:
+    ids = sorted(postings)
+    deltas = array("I", (b - a for a, b in zip([0] + ids, ids)))
+    return zlib.compress(deltas.tobytes(), 6)
+
+
+def _decode(data: bytes) -> List[int]:
+    deltas = array("I")
+    deltas.frombytes(zlib.decompress(data))
+    return list(accumulate(deltas))
+
+
+def _list_size(postings: List[int]) -> int:
+    """Approximate memory held by a posting list of Python ints."""
+    return sys.getsizeof(postings) + 28 * len(postings)
+
+
+def write_postings(path: str, index: Dict[str, List[int]], entry_count: int,
+                   source_stamp: Tuple[int, int]) -> None:
+    """
+    Writes an inverted index to ``path`` in the on-disk posting format.
+    ``source_stamp`` is the (size, mtime_ns) of the CSV it belongs to.
+    """
+    tmp_path = path + ".tmp"
+    table = []
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, entry_count, *source_stamp))
+        for term in sorted(index):
+            postings = index[term]
+            if not postings:
+                continue
+            data = _encode(postings)
+            table.append([term, out.tell(), len(data), len(postings)])
+            out.write(data)
+        table_offset = out.tell()
+        out.write(zlib.compress(json.dumps(table, ensure_ascii=False).encode("utf-8")))
+        out.write(_TRAILER.pack(table_offset, MAGIC))
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> Tuple[int, Tuple[int, int]]:
+    """Returns (entry count, source CSV (size, mtime_ns)) recorded in a posting file."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or header[:4] != MAGIC:
+        raise ValueError(f"{path} is not a current FiberDBMS posting file")
+    _, entry_count, source_size, source_mtime = _HEADER.unpack(header)
+    return entry_count, (source_size, source_mtime)
+
+
+def read_postings(path: str) -> Dict[str, List[int]]:
+    """Reads every posting list of a posting file into an in-memory index."""
+    with open(path, "rb") as f:
+        data = f.read()
+    table_offset, magic = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+    if magic != MAGIC:
+        raise ValueError(f"{path} has a corrupt trailer")
+    table = json.loads(zlib.decompress(data[table_offset:len(data) - _TRAILER.size]).decode("utf-8"))
+    return {term: _decode(data[offset:offset + length]) for term, offset, length, _ in table}
+
+
+class DiskPostings:
+    """
+    Inverted index whose posting lists live on disk. Only the term table
+    (term -> offset, length, document frequency) stays in memory; posting
+    lists are decoded on demand and kept in an LRU cache bounded by
+    ``memory_budget`` bytes.
+
+    The file is opened once and kept open, so an index saved over it by
+    another instance does not change what this one reads.
+
+    Entries added after the file was written go to an in-memory overlay, so
+    it supports the dict operations FiberDBMS uses on ``content_index``:
+    ``in``, ``[]``, ``setdefault`` and ``clear``.
+    """
+    def __init__(self, path: str, memory_budget: int):
+        self.path = path
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cached_bytes = 0
+        self._cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._overlay: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self._file = f = open(path, "rb")
+        try:
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            end = f.tell()
+            table_offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} has a corrupt trailer")
+            f.seek(table_offset)
+            table = json.loads(zlib.decompress(f.read(end - table_offset)).decode("utf-8"))
+        except BaseException:
+            self.close()
+            raise
+        self._terms: Dict[str, Tuple[int, int, int]] = {t: (o, n, df) for t, o, n, df in table}
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms or term in self._overlay
+
+    def __len__(self) -> int:
+        return len(self._terms.keys() | self._overlay.keys())
+
+    def __iter__(self):
+        return iter(self._terms.keys() | self._overlay.keys())
+
+    def document_frequency(self, term: str) -> int:
+        stored = self._terms.get(term)
+        return (stored[2] if stored else 0) + len(self._overlay.get(term, ()))
+
+    def __getitem__(self, term: str) -> List[int]:
+        stored = self._terms.get(term)
+        if stored is None:
+            if term in self._overlay:
+                return list(self._overlay[term])
+            raise KeyError(term)
+        postings = self._load(term, stored)
+        extra = self._overlay.get(term)
+        return postings + extra if extra else postings
+
+    def get(self, term: str, default=None):
+        return self[term] if term in self else default
+
+    def setdefault(self, term: str, default: List[int]) -> List[int]:
+        """Returns the overlay list for ``term``; appends to it are kept in memory."""
+        return self._overlay.setdefault(term, default)
+
+    def clear(self) -> None:
+        self.close()
+        self._terms.clear()
+        self._overlay.clear()
+        self._cache.clear()
+        self.cached_bytes = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def items(self):
+        for term in self:
+            yield term, self[term]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "cached_terms": len(self._cache),
+            "cached_bytes": self.cached_bytes,
+            "memory_budget": self.memory_budget,
+        }
+
+    def _load(self, term: str, stored: Tuple[int, int, int]) -> List[int]:
+        with self._lock:
+            postings = self._cache.get(term)
+            if postings is not None:
+                self._cache.move_to_end(term)
+                self.hits += 1
+                return postings
+            self.misses += 1
+            self._file.seek(stored[0])
+            data = self._file.read(stored[1])
+        postings = _decode(data)
+        size = _list_size(postings)
+        if size > self.memory_budget:
+            # Too large to cache: serve it without evicting everything else.
+            return postings
+        with self._lock:
+            if term not in self._cache:
+                self._cache[term] = postings
+                self.cached_bytes += size
+            while self.cached_bytes > self.memory_budget:
+                _, evicted = self._cache.popitem(last=False)
+                self.cached_bytes -= _list_size(evicted)
+                self.evictions += 1
+        return postings
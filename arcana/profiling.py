@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+# Query stages timed by FiberDBMS, in execution order.
+STAGES = ("tokenize", "candidates", "score", "sort", "snippet", "tags")
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class QueryStats:
+    """Where the time of one query went: seconds per stage, the number of
+    candidate entries scored and the posting-list size of each term."""
+    query: str
+    timings: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(STAGES, 0.0))
+    candidates: int = 0
+    results: int = 0
+    posting_sizes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def add(self, stage: str, started: float) -> float:
+        """Adds the time since ``started`` to ``stage`` and returns the current time."""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - started
+        return now
+
+
+class QueryProfiler:
+    """
+    Rolling window of the last ``window`` QueryStats, summarised as
+    p50/p95/p99 latencies per stage.
+    """
+    def __init__(self, window: int = 1000):
+        self._samples: Deque[QueryStats] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, stats: QueryStats) -> None:
+        with self._lock:
+            self._samples.append(stats)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def percentiles(self, stage: Optional[str] = None) -> Dict[str, float]:
+        """p50/p95/p99 in milliseconds of one stage, or of whole queries by default."""
+        with self._lock:
+            samples = list(self._samples)
+        values = sorted(s.total if stage is None else s.timings.get(stage, 0.0) for s in samples)
+        if not values:
+            return {}
+        # Nearest-rank percentiles.
+        return {f"p{p}": 1000 * values[min(len(values) - 1, -(-p * len(values) // 100) - 1)] for p in PERCENTILES}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles for every stage plus a "total" row."""
+        rows = {stage: self.percentiles(stage) for stage in STAGES}
+        rows["total"] = self.percentiles()
+        return rows
+
+    def slowest(self, n: int = 5) -> List[QueryStats]:
+        with self._lock:
+            samples = list(self._samples)
+        return sorted(samples, key=lambda s: s.total, reverse=True)[:n]
@@ -0,0 +1,138 @@
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+# Phases of an indexing run, in order; a run ends in "done", "cancelled" or "failed".
+PHASES = ("scanning", "extracting", "saving", "done", "cancelled", "failed")
+
+
+class IndexingCancelled(Exception):
+    """Raised inside an indexing run once its CancellationToken is cancelled."""
+
+
+class CancellationToken:
+    """Cooperative cancellation: indexing checks it between files and pages."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise IndexingCancelled()
+
+
+@dataclass
+class IndexingProgress:
+    """
+    Live counters of an indexing run. ``callback`` (if any) is called with
+    the progress after every update, e.g. to stream it to a log or UI.
+    """
+    phase: str = "scanning"
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    files_unchanged: int = 0
+    bytes_total: int = 0
+    bytes_done: int = 0
+    entries: int = 0
+    current_file: str = ""
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    callback: Optional[Callable[["IndexingProgress"], Any]] = field(default=None, repr=False)
+
+    def update(self, **changes) -> None:
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if self.phase in ("done", "cancelled", "failed") and self.finished is None:
+            self.finished = time.monotonic()
+        if self.callback is not None:
+            self.callback(self)
+
+    def discover(self, files: int, size: int) -> None:
+        self.update(files_total=self.files_total + files, bytes_total=self.bytes_total + size)
+
+    def file_done(self, size: int, entries: int, failed: bool = False) -> None:
+        self.update(files_done=self.files_done + 1, files_failed=self.files_failed + failed,
+                    bytes_done=self.bytes_done + size, entries=self.entries + entries)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self) -> float:
+        """Share of the work done, by bytes (by files if sizes are unknown)."""
+        if self.phase in ("done", "saving"):
+            return 1.0
+        if self.bytes_total:
+            return min(1.0, self.bytes_done / self.bytes_total)
+        return self.files_done / self.files_total if self.files_total else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds left, or None before anything finished."""
+        if self.finished is not None:
+            return 0.0
+        done = self.fraction
+        if done <= 0:
+            return None
+        return self.elapsed * (1 - done) / done
+
+    def summary(self) -> str:
+        text = (f"{self.phase}: {self.files_done}/{self.files_total} files "
+                f"({self.files_failed} failed, {self.files_unchanged} unchanged), "
+                f"{self.bytes_done / 1e6:.1f}/{self.bytes_total / 1e6:.1f} MB, "
+                f"{self.entries} entries ({self.entries_per_second:.0f}/s)")
+        eta = self.eta
+        if eta is not None and self.finished is None:
+            text += f", ETA {eta:.0f}s"
+        return text
+
+
+class IndexingJob:
+    """
+    Runs an indexing function (indexing, indexing_partitioned, ...) in a
+    background thread with ``progress=`` and ``cancel=`` arguments, so a UI
+    can poll :attr:`progress` and call :meth:`cancel` while it runs.
+    """
+    def __init__(self, target: Callable[..., Any], *args, **kwargs):
+        self.progress = IndexingProgress()
+        self.cancel_token = CancellationToken()
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._call = (target, args, kwargs)
+        self._thread = threading.Thread(target=self._run, name="arcana-indexing-job", daemon=True)
+
+    def start(self) -> "IndexingJob":
+        self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def cancel(self) -> None:
+        self.cancel_token.cancel()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        target, args, kwargs = self._call
+        try:
+            self.result = target(*args, progress=self.progress, cancel=self.cancel_token, **kwargs)
+        except Exception as exc:
+            self.error = str(exc)
+            self.progress.update(phase="failed")
+            print(f"[!] Indexing failed: {exc}")
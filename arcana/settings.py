@@ -96,6 +96,23 @@ def settings_page():
         else:
             st.info("No changelog available yet.")
 
+    # --- Search Diagnostics ---
+    with st.expander("Search Diagnostics"):
+        dbms = st.session_state.get("dbms")
+        profiler = getattr(dbms, "profiler", None)
+        if profiler is None:
+            st.info("Set INDEX_PROFILE_QUERIES = True in scripts/config.py to record search timings.")
+        elif not len(profiler):
+            st.info("No searches recorded yet.")
+        else:
+            st.write(f"Latency of the last {len(profiler)} searches (ms):")
+            st.table({stage: {p: round(ms, 2) for p, ms in row.items()} for stage, row in profiler.summary().items()})
+            st.write("Slowest searches:")
+            st.table([
+                {"query": s.query, "total ms": round(s.total * 1000, 2), "candidates": s.candidates, "results": s.results}
+                for s in profiler.slowest()
+            ])
+
     # The call to apply_theme() has been removed as it was causing a NameError.
     # To change the theme, please use the built-in Streamlit settings menu
     # (click the three dots in the top-right corner).
@@ -0,0 +1,66 @@
+import re
+from collections import Counter
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+
+# Lines whose fingerprints differ in at most this many bits are treated as
+# near-duplicates (e.g. repeated headers that only differ in case or
+# punctuation). Numbers are kept as they are: lines that differ in a
+# number state different facts.
+DEFAULT_MAX_DISTANCE = 3
+
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fff]+|\w+')
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+
+def _features(text: str) -> Counter:
+    """Word tokens (character bigrams for Chinese), numbers included as written."""
+    features: Counter = Counter()
+    for token in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(token):
+            features.update(token[i:i + 2] for i in range(max(1, len(token) - 1)))
+        else:
+            features[token] += 1
+    return features
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of a line: similar lines get fingerprints a few bits apart."""
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in _features(text).items():
+        h = int.from_bytes(blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+class NearDuplicateIndex:
+    """
+    Finds earlier lines whose SimHash is within ``max_distance`` bits of a new
+    one. Fingerprints are split into ``max_distance + 1`` bands; two
+    fingerprints that close must agree on at least one whole band, so only
+    lines sharing a band bucket are compared.
+    """
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self._bands: List[Tuple[int, int]] = [
+            (i * width, (1 << (width if i < bands - 1 else FINGERPRINT_BITS - i * width)) - 1)
+            for i in range(bands)
+        ]
+        self._buckets: List[Dict[int, List[Tuple[int, int]]]] = [{} for _ in self._bands]
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Returns the key of a near-duplicate added earlier, if any."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for other, key in buckets.get(fingerprint >> shift & mask, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, fingerprint: int, key: int) -> None:
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault(fingerprint >> shift & mask, []).append((fingerprint, key))
@@ -0,0 +1,136 @@
+import os
+import gzip
+import json
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Cached extractions are gzipped JSON lines, one [unit, text] pair per line,
+# stored as <directory>/<key[:2]>/<key>.jsonl.gz. A file's mtime doubles as
+# its last-use time for LRU eviction.
+CACHE_SUFFIX = ".jsonl.gz"
+
+
+def cache_key(digest: str, file_extension: str, version: int) -> str:
+    """Key of a file's extraction: content hash, format and extractor version."""
+    return f"{digest}-{file_extension.lstrip('.').lower()}-v{version}"
+
+
+class TextCache:
+    """
+    On-disk cache of extracted (unit, text) pairs keyed by :func:`cache_key`,
+    so a document is parsed once no matter how often it is indexed or
+    uploaded. Entries are written while the extraction streams through
+    :meth:`units` and only kept if it completes; the least recently used
+    entries are evicted once the cache exceeds ``max_bytes``.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: Optional[Dict[str, Tuple[float, int]]] = None  # path -> (mtime, size)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def units(self, key: str, extract: Iterable[Tuple[Optional[str], str]]) -> Iterator[Tuple[Optional[str], str]]:
+        """
+        Yields the cached units of ``key``, or those of ``extract`` (an
+        iterable that is only started on a miss) while storing them.
+        """
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # Mark as recently used.
+                self._touch(path)
+                yield from self._read(path)
+                return
+            except FileNotFoundError:
+                pass  # Evicted by another process in the meantime.
+        yield from self._store(path, extract)
+
+    def _read(self, path: str) -> Iterator[Tuple[Optional[str], str]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    unit, text = json.loads(line)
+                    yield unit, text
+        except FileNotFoundError:
+            raise
+        except (OSError, EOFError, ValueError) as exc:
+            print(f"[!] Removing corrupt text cache entry {path}: {exc}")
+            with self._lock:
+                self._remove(path)
+            raise
+
+    def _store(self, path: str, extract: Iterable[Tuple[Optional[str], str]]) -> Iterator[Tuple[Optional[str], str]]:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        complete = False
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as out:
+                for unit, text in extract:
+                    out.write(json.dumps([unit, text], ensure_ascii=False) + "\n")
+                    yield unit, text
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp_path, path)
+                self._added(path)
+            else:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def size(self) -> int:
+        """Bytes used by the cache."""
+        with self._lock:
+            return sum(size for _, size in self._scan().values())
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in list(self._scan()):
+                self._remove(path)
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.isdir(self.directory):
+                for shard in os.scandir(self.directory):
+                    if not shard.is_dir():
+                        continue
+                    for item in os.scandir(shard.path):
+                        if item.name.endswith(CACHE_SUFFIX):
+                            stat = item.stat()
+                            self._entries[item.path] = (stat.st_mtime, stat.st_size)
+        return self._entries
+
+    def _touch(self, path: str) -> None:
+        with self._lock:
+            entries = self._scan()
+            if path in entries:
+                entries[path] = (os.path.getmtime(path), entries[path][1])
+
+    def _added(self, path: str) -> None:
+        with self._lock:
+            entries = self._scan()
+            stat = os.stat(path)
+            entries[path] = (stat.st_mtime, stat.st_size)
+            total = sum(size for _, size in entries.values())
+            for old in sorted(entries, key=lambda p: entries[p][0]):
+                if total <= self.max_bytes:
+                    break
+                if old != path:
+                    total -= entries[old][1]
+                    self._remove(old)
+
+    def _remove(self, path: str) -> None:
+        if self._entries is not None:
+            self._entries.pop(path, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Optional: fall back to polling with os.scandir
+    Observer = None
+    FileSystemEventHandler = object
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+_watcher: Optional["IndexWatcher"] = None
+_watcher_lock = threading.Lock()
+
+
+def snapshot(root: str) -> Dict[str, Tuple[int, int]]:
+    """Size and mtime (ns) of every file under ``root``."""
+    files = {}
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as items:
+                for item in items:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            stack.append(item.path)
+                        elif item.is_file():
+                            stat = item.stat()
+                            files[item.path] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue  # Removed while scanning.
+        except OSError:
+            continue
+    return files
+
+
+def changed_paths(before: Dict[str, Tuple[int, int]], after: Dict[str, Tuple[int, int]]) -> Set[str]:
+    """Paths added, removed or modified between two snapshots."""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "IndexWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return  # Reads do not change the index.
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        self.watcher.notify(*(p for p in paths if p))
+
+
+class IndexWatcher:
+    """
+    Watches a folder in a background thread and calls ``update`` with the
+    changed paths once no change has been seen for ``debounce`` seconds,
+    so a burst of uploads, moves or renames results in one incremental
+    update. Uses watchdog (inotify, FSEvents, ...) when it is installed and
+    otherwise compares ``os.scandir`` snapshots every ``poll_interval``
+    seconds. ``generation`` counts the updates that changed the index.
+    """
+    def __init__(self, root: str, update: Callable[[Set[str]], bool], debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_watchdog: bool = True):
+        self.root = root
+        self.update = update
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = "watchdog" if use_watchdog and Observer is not None else "polling"
+        self.generation = 0
+        self.last_error: Optional[str] = None
+        self._pending: Set[str] = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+
+    def start(self) -> "IndexWatcher":
+        if self._thread is not None:
+            return self
+        os.makedirs(self.root, exist_ok=True)
+        if self.backend == "watchdog":
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._snapshot = snapshot(self.root)
+        self._thread = threading.Thread(target=self._run, name="arcana-index-watcher", daemon=True)
+        self._thread.start()
+        print(f"[X] Watching {self.root} for changes ({self.backend}).")
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def notify(self, *paths: str) -> None:
+        """Records changed paths; the update runs after the debounce delay."""
+        with self._lock:
+            self._pending.update(paths)
+            self._last_event = time.monotonic()
+        self._wake.set()
+
+    def _run(self) -> None:
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            if self.backend == "polling" and now >= next_poll:
+                current = snapshot(self.root)
+                changed = changed_paths(self._snapshot, current)
+                self._snapshot = current
+                if changed:
+                    self.notify(*changed)
+                next_poll = now + self.poll_interval
+            with self._lock:
+                quiet_for = now - self._last_event
+                due = bool(self._pending) and quiet_for >= self.debounce
+                if due:
+                    paths, self._pending = self._pending, set()
+            if due:
+                self._apply(paths)
+                continue
+            timeout = self.debounce - quiet_for if self._pending else self.poll_interval
+            if self.backend == "polling":
+                timeout = min(timeout, max(0.0, next_poll - time.monotonic()))
+            self._wake.wait(max(0.05, timeout))
+            self._wake.clear()
+
+    def _apply(self, paths: Set[str]) -> None:
+        try:
+            if self.update(paths):
+                self.generation += 1
+            self.last_error = None
+        except Exception as exc:
+            self.last_error = str(exc)
+            print(f"[!] Incremental index update failed: {exc}")
+
+
+def start_index_watcher(root: str, update: Callable[[Set[str]], bool], **options) -> IndexWatcher:
+    """Starts the process-wide watcher of ``root`` once and returns it."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = IndexWatcher(root, update, **options).start()
+        return _watcher
+
+
+def get_index_watcher() -> Optional[IndexWatcher]:
+    return _watcher
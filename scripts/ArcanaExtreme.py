@@ -7,15 +7,16 @@ import os
 import time
 from dotenv import load_dotenv
 
-from arcana.finder import files_page
+from arcana.finder import files_page, watch_index
 from scripts.chatbot import chatbot_page
 from arcana.settings import settings_page
 from arcana.mixup import mixup_page
 from arcana.longresponse import longresponse_page
 from arcana.editor import editor_page
 from arcana.speech_to_text import speech_to_text_page
-from scripts.config import APP_TITLE, CACHE_DIR, INDEX_FILE
-from arcana.fiber import FiberDBMS
+from scripts.config import APP_TITLE, CACHE_DIR, INDEX_FILE, INDEX_MEMORY_BUDGET, INDEX_BACKEND
+from scripts.config import INDEX_PROFILE_QUERIES
+from arcana.fiber import FiberDBMS, create_dbms
 from arcana.theme import apply_theme
 
 # --- Application Setup ---
@@ -53,7 +54,9 @@ def initialize_app():
 
     # 5. Initialize or load the database into session state
     if 'dbms' not in st.session_state:
-        dbms = FiberDBMS()
+        dbms = create_dbms(INDEX_BACKEND, memory_budget=INDEX_MEMORY_BUDGET)
+        if INDEX_PROFILE_QUERIES:
+            dbms.enable_profiling()
         if os.path.exists(INDEX_FILE):
             print(f"Loading existing database from {INDEX_FILE}...")
             dbms.load_from_file(INDEX_FILE)
@@ -76,6 +79,9 @@ def main():
         initialize_app()
         st.session_state.initialized = True
 
+    # Keep the index in sync with CACHE_DIR in the background
+    watch_index()
+
     # Sidebar for navigation
     st.sidebar.title(APP_TITLE)
     page = st.sidebar.radio("Go to", (
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark FiberDBMS on deterministic synthetic corpora.
+
+For every language (English, Chinese, mixed) and corpus size it measures
+add_entry throughput, save and load time, peak RSS and query latency
+(p50/p99) for short, long and high-document-frequency queries. Each run
+happens in its own process so peak RSS is not shared between runs.
+Results are printed (or written) as JSON to compare versions:
+
+    python scripts/bench_fiber.py --sizes 10000,100000 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arcana.fiber import create_dbms  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LANGUAGES = ("en", "zh", "mixed")
+DEFAULT_SIZES = "10000,100000,1000000"
+VOCABULARY_SIZE = 5000
+WORDS_PER_ENTRY = (6, 20)
+ENTRIES_PER_FILE = 200
+COMMON_EN = ["the", "and", "of", "to", "in"]
+COMMON_ZH = ["的", "是", "在", "和", "了"]
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "zen", "bar", "cel", "dor", "fin", "gal", "hex", "jun"]
+
+
+def _vocabulary(language: str, rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        if language == "zh":
+            words.add("".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(2)))
+        else:
+            words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Corpus:
+    """Zipf-distributed synthetic text; the same seed always gives the same corpus."""
+    def __init__(self, language: str, seed: int = 42):
+        self.language = language
+        rng = random.Random(f"{language}-{seed}")
+        if language == "mixed":
+            self.vocabulary = _vocabulary("en", rng)[::2] + _vocabulary("zh", rng)[::2]
+            rng.shuffle(self.vocabulary)
+            self.common = COMMON_EN[:3] + COMMON_ZH[:2]
+        else:
+            self.vocabulary = _vocabulary(language, rng)
+            self.common = COMMON_ZH if language == "zh" else COMMON_EN
+        self._weights = list(accumulate(1 / rank for rank in range(1, len(self.vocabulary) + 1)))
+        self.seed = seed
+
+    def _words(self, rng: random.Random, count: int) -> List[str]:
+        words = rng.choices(self.vocabulary, cum_weights=self._weights, k=count)
+        for i in range(0, count, 4):
+            words[i] = rng.choice(self.common)  # High-df words appear in nearly every entry.
+        return words
+
+    def _join(self, words: List[str]) -> str:
+        if self.language == "zh":
+            return "".join(words) + "。"
+        return " ".join(words) + "."
+
+    def entries(self, size: int) -> Iterator[Tuple[str, str, List[str]]]:
+        rng = random.Random(self.seed)
+        for i in range(size):
+            words = self._words(rng, rng.randint(*WORDS_PER_ENTRY))
+            yield f"doc{i // ENTRIES_PER_FILE:05d}.pdf", self._join(words), words[1:3]
+
+    def queries(self, kind: str, count: int) -> List[str]:
+        rng = random.Random(f"{kind}-{self.seed}")
+        queries = []
+        for _ in range(count):
+            if kind == "short":
+                words = [rng.choice(self.vocabulary[50:])]
+            elif kind == "long":
+                words = rng.choices(self.vocabulary, cum_weights=self._weights, k=8)
+            else:  # "high_df"
+                words = rng.sample(self.common, 2) + [rng.choice(self.vocabulary[:20])]
+            queries.append(" ".join(words))
+        return queries
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        f"p{p}_ms": round(1000 * ordered[min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1)], 3)
+        for p in (50, 99)
+    }
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return -1.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(language: str, size: int, queries: int, options: Dict) -> Dict:
+    """Benchmarks one corpus in the current process."""
+    corpus = Corpus(language)
+    backend = options.pop("backend")
+    dbms = create_dbms(backend, **options)
+    result = {"language": language, "entries": size, "backend": backend}
+
+    started = time.perf_counter()
+    for name, content, tags in corpus.entries(size):
+        dbms.add_entry(name=name, content=content, tags=tags)
+    if hasattr(dbms, "flush"):
+        dbms.flush()
+    elapsed = time.perf_counter() - started
+    result["add_entries_per_s"] = round(size / elapsed, 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite" if backend == "sqlite" else "bench.csv")
+        started = time.perf_counter()
+        dbms.save(path)
+        result["save_s"] = round(time.perf_counter() - started, 3)
+        result["index_bytes"] = sum(
+            os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)
+        )
+        del dbms
+
+        dbms = create_dbms(backend, **options)
+        started = time.perf_counter()
+        dbms.load_from_file(path)
+        result["load_s"] = round(time.perf_counter() - started, 3)
+
+        for kind in ("short", "long", "high_df"):
+            samples = []
+            for query in corpus.queries(kind, queries):
+                started = time.perf_counter()
+                dbms.query(query, top_n=10)
+                samples.append(time.perf_counter() - started)
+            result[f"query_{kind}"] = _percentiles(samples)
+        if hasattr(dbms, "close"):
+            dbms.close()
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FiberDBMS on synthetic corpora.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated corpus sizes.")
+    parser.add_argument("--languages", default=",".join(LANGUAGES), help="Comma-separated: en, zh, mixed.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per query kind.")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    parser.add_argument("--compression", default=None, choices=["zlib", "lzma"])
+    parser.add_argument("--memory-budget", type=int, default=None, help="Posting cache budget in bytes.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--single", nargs=2, metavar=("LANGUAGE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    options = {"backend": args.backend, "compression": args.compression, "memory_budget": args.memory_budget}
+    if args.single:
+        language, size = args.single
+        print(json.dumps(run_single(language, int(size), args.queries, dict(options))))
+        return
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        for language in args.languages.split(","):
+            print(f"Benchmarking {language} corpus with {size} entries...", file=sys.stderr)
+            command = [sys.executable, os.path.abspath(__file__), "--single", language, str(size),
+                       "--queries", str(args.queries), "--backend", args.backend]
+            if args.compression:
+                command += ["--compression", args.compression]
+            if args.memory_budget is not None:
+                command += ["--memory-budget", str(args.memory_budget)]
+            # jieba and the indexes print progress; the JSON result is the last line.
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            report["results"].append(json.loads(output.strip().splitlines()[-1]))
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Benchmark arcana.indexing.indexing on deterministic synthetic document trees.
+
+For every tree size (lines per file) it generates the same number of .txt,
+.csv, .docx, .pptx and .pdf files from the synthetic corpus of
+bench_fiber.py, indexes them from scratch serially and with a pool of
+extraction workers, and measures files/s, lines/s, entries/s and peak RSS
+of the indexing process and of its workers. Each run also times
+extraction per file type: file by file in serial mode, and from the first
+file submitted to the last result on an already started pool of workers in
+parallel mode. Each run happens in its own process so peak
+RSS is not shared between runs. Results are printed (or written) as JSON;
+with --baseline a previous report is compared and the exit status is 1 if
+a run got slower than --tolerance allows:
+
+    python scripts/bench_indexing.py --lines 200,2000 --output bench.json
+    python scripts/bench_indexing.py --lines 200,2000 --baseline bench.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bench_fiber import Corpus, _peak_rss_mb  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATS = (".txt", ".csv", ".docx", ".pptx", ".pdf")
+DEFAULT_LINES = "200,2000"
+MODES = ("serial", "parallel")
+LINES_PER_SLIDE = 10
+LINES_PER_PDF_PAGE = 40
+TREE_INFO = "bench_tree.json"
+
+
+def _write_txt(path: str, lines: List[str]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _write_csv(path: str, lines: List[str]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "body"])
+        for i, line in enumerate(lines):
+            writer.writerow([i, " ".join(line.split()[:3]), line])
+
+
+def _write_docx(path: str, lines: List[str]) -> None:
+    from docx import Document
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def _write_pptx(path: str, lines: List[str]) -> None:
+    from pptx import Presentation
+    from pptx.util import Inches
+    presentation = Presentation()
+    for start in range(0, len(lines), LINES_PER_SLIDE):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])  # Title only
+        slide.shapes.title.text = f"Slide {start // LINES_PER_SLIDE + 1}"
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5))
+        box.text_frame.text = "\n".join(lines[start:start + LINES_PER_SLIDE])
+    presentation.save(path)
+
+
+def _pdf_text(line: str) -> bytes:
+    text = line.encode("latin-1", "replace")  # Standard PDF fonts only cover Latin-1.
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _write_pdf(path: str, lines: List[str]) -> None:
+    """A minimal PDF with one Helvetica text stream per page, written by hand."""
+    pages = [lines[i:i + LINES_PER_PDF_PAGE] for i in range(0, len(lines), LINES_PER_PDF_PAGE)] or [[]]
+    first_page = 4  # Objects 1-3: catalog, page tree, font; then page + content per page.
+    kids = " ".join(f"{first_page + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, page in enumerate(pages):
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td " + b" ".join(b"(" + _pdf_text(line) + b") '" for line in page) + b" ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {first_page + 2 * i + 1} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+WRITERS = {".txt": _write_txt, ".csv": _write_csv, ".docx": _write_docx, ".pptx": _write_pptx, ".pdf": _write_pdf}
+
+
+def generate_tree(root: str, files: int, lines: int, language: str, formats=FORMATS) -> Dict:
+    """
+    Writes ``files`` files of ``lines`` corpus lines per format under
+    ``root``, spread over a few folders, and returns their counts and sizes.
+    """
+    corpus = Corpus(language)
+    text = [content for _, content, _ in corpus.entries(files * lines)]
+    info = {"files": 0, "lines": 0, "bytes": 0, "formats": {}}
+    for ext in formats:
+        for i in range(files):
+            folder = os.path.join(root, f"folder{i % 4}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"doc{i:04d}{ext}")
+            # Distinct text per file: identical files would only be indexed once.
+            WRITERS[ext](path, text[i * lines:(i + 1) * lines])
+            size = os.path.getsize(path)
+            info["files"] += 1
+            info["lines"] += lines
+            info["bytes"] += size
+            info["formats"][ext] = info["formats"].get(ext, 0) + size
+    return info
+
+
+def _peak_children_rss_mb() -> float:
+    if resource is None:
+        return -1.0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(tree: str, mode: str, workers: int, backend: str) -> Dict:
+    """Indexes one generated tree from scratch in the current process."""
+    import arcana.extraction as extraction
+    import arcana.indexing as indexing
+    from arcana.progress import IndexingProgress
+
+    with open(os.path.join(tree, os.pardir, TREE_INFO), encoding="utf-8") as f:
+        info = json.load(f)
+    workers = 1 if mode == "serial" else workers
+    result = {"mode": mode, "workers": workers, "backend": backend, "files": info["files"],
+              "lines": info["lines"], "bytes": info["bytes"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        indexing.INDEX_FILE = os.path.join(tmp, "bench.sqlite" if backend == "sqlite" else "bench.csv")
+        indexing.INDEX_BACKEND = backend
+        indexing.INDEX_EXTRACT_WORKERS = workers
+        # Without the text cache every run really extracts its files.
+        indexing.INDEX_TEXT_CACHE_MB = 0
+        indexing.INDEX_TEXT_CACHE_DIR = os.path.join(tmp, "text_cache")
+        indexing._text_cache = indexing._encoding_cache = None
+        # Spawned workers are children of this process, so RUSAGE_CHILDREN
+        # covers them; forkserver workers are children of the fork server.
+        extraction.START_METHOD = "spawn"
+        progress = IndexingProgress()
+        started = time.perf_counter()
+        entries = indexing.indexing(tree, full=True, progress=progress)
+        elapsed = time.perf_counter() - started
+    result.update({
+        "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(info["files"] / elapsed, 2),
+        "lines_per_s": round(info["lines"] / elapsed, 1),
+        "mb_per_s": round(info["bytes"] / 1e6 / elapsed, 3),
+        "entries": entries,
+        "entries_per_s": round(entries / elapsed, 1),
+        "failed": progress.files_failed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_worker_rss_mb": _peak_children_rss_mb(),
+    })
+
+    paths = {ext: [] for ext in info["formats"]}
+    for folder, _, files in os.walk(tree):
+        for file in files:
+            paths.setdefault(os.path.splitext(file)[1], []).append(os.path.join(folder, file))
+    result["extract_s"] = _extract_times(paths, workers, indexing, extraction)
+    return result
+
+
+def _extract_times(paths: Dict[str, List[str]], workers: int, indexing, extraction) -> Dict[str, float]:
+    """Seconds spent extracting the files of each type, serially or on a pool of ``workers``."""
+    timings = {}
+    if workers <= 1:
+        for ext, files in paths.items():
+            started = time.perf_counter()
+            for path in files:
+                for _ in indexing.extract_units(path):
+                    pass
+            timings[ext] = time.perf_counter() - started
+        return {ext: round(seconds, 3) for ext, seconds in timings.items()}
+    memory_limit = indexing.INDEX_EXTRACT_MEMORY_MB * 1024 * 1024 if indexing.INDEX_EXTRACT_MEMORY_MB else None
+    with extraction.ExtractionPool(indexing._extract_file, workers, indexing.INDEX_EXTRACT_TIMEOUT,
+                                   memory_limit) as pool:
+        # One file per worker starts them all, so worker start-up is not timed below.
+        warm_up = [path for files in paths.values() for path in files][:workers]
+        for _, units in pool.map((path, None) for path in warm_up):
+            for _ in units:
+                pass
+        for ext, files in paths.items():
+            started = time.perf_counter()
+            for _, units in pool.map((path, None) for path in files):
+                for _ in units:
+                    pass
+            timings[ext] = time.perf_counter() - started
+    return {ext: round(seconds, 3) for ext, seconds in timings.items()}
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Runs whose files/s fell more than ``tolerance`` below the matching baseline run."""
+    def key(run):
+        return run["lines"] // max(1, run["files"]), run["mode"], run["backend"]
+    previous = {key(run): run for run in baseline.get("results", [])}
+    regressions = []
+    for run in report["results"]:
+        before = previous.get(key(run))
+        if before and run["files_per_s"] < before["files_per_s"] * (1 - tolerance):
+            regressions.append(f"{run['mode']} run with {key(run)[0]} lines per file: "
+                               f"{run['files_per_s']} files/s, was {before['files_per_s']}")
+        run["baseline_files_per_s"] = before["files_per_s"] if before else None
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexing on synthetic document trees.")
+    parser.add_argument("--lines", default=DEFAULT_LINES, help="Comma-separated lines per file, one tree each.")
+    parser.add_argument("--files", type=int, default=20, help="Files per format in each tree.")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated file extensions.")
+    parser.add_argument("--language", default="en", choices=["en", "zh", "mixed"])
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: serial, parallel.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Workers in parallel mode.")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", help="A previous JSON report to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed files/s drop against the baseline (0.2 = 20%%).")
+    parser.add_argument("--single", nargs=2, metavar=("TREE", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        tree, mode = args.single
+        print(json.dumps(run_single(tree, mode, args.workers, args.backend)))
+        return
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": {"files": args.files, "formats": args.formats, "language": args.language,
+                    "workers": args.workers, "backend": args.backend},
+        "results": [],
+    }
+    for lines in (int(n) for n in args.lines.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            tree = os.path.join(tmp, "tree")
+            print(f"Generating {args.files} files per format with {lines} lines each...", file=sys.stderr)
+            info = generate_tree(tree, args.files, lines, args.language, args.formats.split(","))
+            with open(os.path.join(tmp, TREE_INFO), "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            for mode in args.modes.split(","):
+                print(f"Indexing {lines}-line tree ({mode})...", file=sys.stderr)
+                command = [sys.executable, os.path.abspath(__file__), "--single", tree, mode,
+                           "--workers", str(args.workers), "--backend", args.backend]
+                # Indexing prints progress; the JSON result is the last line.
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                report["results"].append(json.loads(output.strip().splitlines()[-1]))
+        runs = {run["mode"]: run for run in report["results"][-len(args.modes.split(",")):]}
+        if "serial" in runs and "parallel" in runs:
+            runs["parallel"]["speedup"] = round(runs["serial"]["elapsed_s"] / runs["parallel"]["elapsed_s"], 2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    for regression in regressions:
+        print(f"[!] Regression: {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
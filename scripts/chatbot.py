@@ -7,17 +7,16 @@ import nltk
 import arcana.nltk_setup
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
-from arcana.fiber import FiberDBMS
-from scripts.config import INDEX_FILE
+from arcana.fiber import FiberDBMS, create_dbms
+from arcana.chunking import describe_location
+from scripts.config import INDEX_FILE, INDEX_PARTITIONED, INDEX_MEMORY_BUDGET, INDEX_BACKEND
+from scripts.config import INDEX_PROFILE_QUERIES
 import os
 import json
 import datetime
-from docx import Document
-from pptx import Presentation
-import chardet
-from PyPDF2 import PdfReader
-import pandas as pd
-from arcana.indexing import extract_keywords, detect_language
+from itertools import islice
+from arcana.indexing import extract_keywords, detect_language, cached_units, SUPPORTED_EXTENSIONS
+from arcana.manifest import data_digest
 
 # NLTK data is now handled centrally in Arcanalte.py
 
@@ -224,49 +223,47 @@ def delete_chat_history(file_path):
         st.error(f"Failed to delete chat history: {e}")
         return False
 
+def extract_units_from_file(uploaded_file):
+    """
+    Yields (unit, text) pairs of an uploaded file object page by page (or
+    slide/sheet by sheet), using the same extractors and text cache as
+    indexing(), so a file indexed before is not parsed again.
+    """
+    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        st.warning(f"Unsupported file format: {file_extension}. Cannot interpret this file.")
+        return
+    yield from cached_units(uploaded_file, data_digest(uploaded_file.getvalue()), file_extension)
+
 def extract_content_from_file(uploaded_file):
     """Extracts text content from an uploaded file object."""
-    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-    content = ""
     try:
-        if file_extension == ".txt":
-            # Use chardet to detect encoding for robust text file reading
-            raw_data = uploaded_file.getvalue()
-            encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
-            content = raw_data.decode(encoding, errors='replace')
-        elif file_extension == ".docx":
-            doc = Document(uploaded_file)
-            content = "\n".join([para.text for para in doc.paragraphs])
-        elif file_extension == ".pptx":
-            presentation = Presentation(uploaded_file)
-            all_texts = []
-            for slide in presentation.slides:
-                slide_texts = []
-                if slide.shapes.title:
-                    slide_texts.append(slide.shapes.title.text)
-                for shape in slide.shapes:
-                    if shape.has_text_frame:
-                        slide_texts.append(shape.text_frame.text)  # type: ignore
-                all_texts.append("\n".join(slide_texts))
-            content = "\n".join(all_texts)
-        elif file_extension == ".pdf":
-            reader = PdfReader(uploaded_file)
-            content = "\n".join([page.extract_text() or '' for page in reader.pages])
-        elif file_extension in [".xls", ".xlsx", ".csv"]:
-            # For simplicity, we'll read CSV from the buffer; Excel might need saving to disk
-            if "xls" in file_extension:
-                # To handle xls/xlsx from stream, pandas may need the 'openpyxl' or 'xlrd' engine
-                df = pd.read_excel(uploaded_file, engine='openpyxl' if file_extension == ".xlsx" else 'xlrd')
-            else:
-                df = pd.read_csv(uploaded_file)
-            content = df.to_string()
-        else:
-            st.warning(f"Unsupported file format: {file_extension}. Cannot interpret this file.")
-            return None
+        texts = [text for _, text in extract_units_from_file(uploaded_file)]
+    except Exception as e:
+        st.error(f"Failed to process and interpret file {uploaded_file.name}: {e}")
+        return None
+    return "\n".join(texts) if texts else None
+
+def index_uploaded_file(uploaded_file, dbms):
+    """
+    Indexes an uploaded file into ``dbms`` one line at a time as each page is
+    extracted, and returns its full text for the chat context (None if the
+    file could not be read).
+    """
+    texts = []
+    try:
+        for _, text in extract_units_from_file(uploaded_file):
+            texts.append(text)
+            for line in text.split('\n'):
+                line = line.strip()
+                if line:
+                    lang = detect_language(line)
+                    keywords = extract_keywords(line, lang)
+                    dbms.add_entry(name=uploaded_file.name, content=line, tags=keywords)
     except Exception as e:
         st.error(f"Failed to process and interpret file {uploaded_file.name}: {e}")
         return None
-    return content
+    return "\n".join(texts) if texts else None
 
 def chatbot_page():
     st.title("Chat With Arcana")
@@ -318,7 +315,9 @@ def chatbot_page():
 
     # Initialize or load the database automatically
     if 'dbms' not in st.session_state or not isinstance(st.session_state.dbms, FiberDBMS):
-        dbms = FiberDBMS()
+        dbms = create_dbms(INDEX_BACKEND, memory_budget=INDEX_MEMORY_BUDGET)
+        if INDEX_PROFILE_QUERIES:
+            dbms.enable_profiling()
         if os.path.exists(INDEX_FILE):
             with st.spinner("Loading existing database..."):
                 try:
@@ -428,8 +427,11 @@ def chatbot_page():
             # Check if this file has been processed already to avoid reprocessing on every rerun
             if st.session_state.get('processed_file_name') != uploaded_file.name:
                 with st.spinner(f"🔍 Processing {uploaded_file.name}..."):
-                    file_content = extract_content_from_file(uploaded_file)
+                    # Index the file page by page while it is extracted
+                    file_content = index_uploaded_file(uploaded_file, dbms)
                     if file_content:
+                        dbms.save(INDEX_FILE) # Save the updated index
+
                         # Save the uploaded file to IDXDB/Uploads directory
                         uploads_dir = os.path.join(os.path.dirname(__file__), "IDXDB", "Uploads")
                         os.makedirs(uploads_dir, exist_ok=True)
@@ -450,17 +452,6 @@ def chatbot_page():
                         except Exception as e:
                             st.warning(f"Could not save file to IDXDB/Uploads: {e}")
                             # Continue with processing even if file saving fails
-                        
-                        # Index the new file content into the database
-                        with st.spinner(f"📚 Indexing content..."):
-                            lines = file_content.split('\n')
-                            for line in lines:
-                                line = line.strip()
-                                if line:
-                                    lang = detect_language(line)
-                                    keywords = extract_keywords(line, lang)
-                                    dbms.add_entry(name=uploaded_file.name, content=line, tags=keywords)
-                            dbms.save(INDEX_FILE) # Save the updated index
 
                         # Add the file content as a system message for context, with priority instructions
                         context_message = (
@@ -521,17 +512,26 @@ def chatbot_page():
                 keywords = [word for word in words if word.lower() not in stop_words and word.isalpha()]
                 
                 # Use the dbms instance from session state
-                results = dbms.query(" ".join(keywords), top_n=min(20, max(1, len(keywords))))
-                results = results[:5]
+                if INDEX_PARTITIONED:
+                    # Fan out across the per-folder partitions and merge the global top five.
+                    from arcana.finder import get_partitions
+                    results = get_partitions().query(" ".join(keywords), top_n=5)
+                else:
+                    # Only the first five hits are shown, so stop before building further snippets.
+                    results = list(islice(dbms.iter_query(" ".join(keywords), top_n=min(20, max(1, len(keywords)))), 5))
 
                 assistant_reply = ""
                 if results:
                     assistant_reply += "Here are the top results from your documents:\n\n"
                     for idx, result in enumerate(results, 1):
-                        assistant_reply += f"**Result {idx} from `{result['name']}`:**\n"
+                        assistant_reply += f"**Result {idx} from `{result['name']}`{describe_location(result)}:**\n"
                         assistant_reply += f"_{result['content']}_\n\n"
                 else:
                     assistant_reply = "I couldn't find any specific information related to your query in the indexed documents."
+                if INDEX_PROFILE_QUERIES and not INDEX_PARTITIONED and dbms.last_stats is not None:
+                    stats = dbms.last_stats
+                    stages = ", ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in stats.timings.items())
+                    assistant_reply += f"\n\n`Search: {stats.total * 1000:.1f} ms ({stages}); {stats.candidates} candidates`"
 
                 st.session_state.messages.append({"role": "system", "content": assistant_reply})
 
@@ -12,10 +12,77 @@ GENERATED_FILES_DIR = "generated"
 
 
 # --- File Settings ---
+# Storage backend for the search index: "memory" (FiberDBMS with a CSV file)
+# or "sqlite" (SQLite FTS5, durable and low-memory). With "sqlite", point
+# INDEX_FILE at a .sqlite file; an existing CSV index is imported on first load.
+INDEX_BACKEND = "memory"
+
 # The name of the CSV file that stores the search index created by FiberDBMS.
 # This file is crucial for the chatbot and search functionalities.
 INDEX_FILE = "arcana_index.csv"
 
+# Compression for entry content in the index: None keeps plain text in the
+# CSV, "zlib" or "lzma" store it in compressed ~64 KB blocks (INDEX_FILE.blk).
+# A compressed index is detected automatically when it is loaded.
+INDEX_COMPRESSION = None
+
+# When True, every top-level folder of CACHE_DIR gets its own index partition
+# (one CSV per folder in INDEX_PARTITION_DIR). Queries fan out across the
+# partitions and a single folder can be re-indexed on its own.
+INDEX_PARTITIONED = False
+INDEX_PARTITION_DIR = "arcana_partitions"
+
+# Memory budget in bytes for cached posting lists. None keeps the whole
+# inverted index in RAM; a number stores postings on disk (INDEX_FILE.post)
+# and keeps only the hottest terms in memory, e.g. 64 * 1024 * 1024 on small VMs.
+INDEX_MEMORY_BUDGET = None
+
+# Near-duplicate lines (repeated headers, footers, slide template text that
+# differ only in case or punctuation) can be collapsed into one entry with an
+# occurrence "count" while indexing: "document" compares lines within each
+# file, "corpus" across all files indexed together, None keeps every line.
+# Lines with different numbers (figures, dates, phone numbers) are never merged.
+INDEX_NEAR_DUPLICATES = None
+
+# Passage size in tokens. None indexes one entry per line; a number such as
+# 200 groups lines into overlapping passages that stay within one page or
+# slide and prefer to end at paragraph breaks. Each passage cites its line
+# range ("lines") and page/slide ("unit").
+INDEX_CHUNK_TOKENS = None
+INDEX_CHUNK_OVERLAP = 40
+
+# When True, every search records per-stage timings (tokenize, candidates,
+# score, sort, snippet, tags). The chatbot shows them under each search and
+# Settings > Search Diagnostics lists p50/p95/p99 latencies and slow queries.
+INDEX_PROFILE_QUERIES = False
+
+# When True, indexing also stores token positions (INDEX_FILE.pos) so that
+# searches can use exact phrases ("cell membrane") and proximity windows
+# ("cell energy"~5, both words within five tokens).
+INDEX_POSITIONS = False
+
+# Text extraction during indexing runs in this many worker processes (None
+# uses every CPU, 1 extracts in the app process). A file is skipped if one of
+# its units (a page, slide or block of text) takes longer than
+# INDEX_EXTRACT_TIMEOUT seconds to extract, or if it needs more than
+# INDEX_EXTRACT_MEMORY_MB of extra memory (Linux/macOS).
+INDEX_EXTRACT_WORKERS = None
+INDEX_EXTRACT_TIMEOUT = 120
+INDEX_EXTRACT_MEMORY_MB = 2048
+
+# Extracted text is cached on disk by file content hash, so unchanged or
+# re-uploaded documents are never parsed twice. The least recently used
+# extractions are evicted beyond INDEX_TEXT_CACHE_MB (None disables the cache).
+INDEX_TEXT_CACHE_DIR = "arcana_text_cache"
+INDEX_TEXT_CACHE_MB = 512
+
+# When True, a background watcher (watchdog if installed, otherwise polling
+# every INDEX_WATCH_POLL_INTERVAL seconds) indexes new, changed and removed
+# files in CACHE_DIR once INDEX_WATCH_DEBOUNCE seconds pass without changes.
+INDEX_WATCH = True
+INDEX_WATCH_DEBOUNCE = 2.0
+INDEX_WATCH_POLL_INTERVAL = 5.0
+
 
 # --- Application Settings ---
 # The title of the Streamlit application.
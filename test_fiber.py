@@ -0,0 +1,886 @@
+#!/usr/bin/env python3
+"""
+Tests for the FiberDBMS search engine (arcana/fiber.py).
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from arcana.fiber import FiberDBMS, BLOCK_SUFFIX, HASH_SUFFIX, POSITIONS_SUFFIX, POSTINGS_SUFFIX, create_dbms
+
+SAMPLE_LINES = [
+    ("biology.pdf", "The cell membrane controls what enters and leaves the cell.", ["cell", "membrane"]),
+    ("biology.pdf", "Mitochondria produce energy for the cell.", ["mitochondria", "energy"]),
+    ("history.docx", "The French Revolution began in 1789.", ["french", "revolution"]),
+    ("notes.txt", "细胞膜控制物质进出细胞。", ["细胞膜"]),
+]
+
+
+def build_dbms(**kwargs):
+    dbms = FiberDBMS(**kwargs)
+    for name, content, tags in SAMPLE_LINES:
+        dbms.add_entry(name=name, content=content, tags=tags)
+    return dbms
+
+
+def test_query_ranks_matching_entries():
+    """The best matching entry comes first."""
+    dbms = build_dbms()
+    results = dbms.query("cell membrane", top_n=2)
+    assert results[0]['name'] == "biology.pdf"
+    assert results[0]['index'] == 0
+
+
+def test_query_plan_dedupes_and_prunes_common_terms():
+    """Duplicate terms collapse and very common terms only affect scoring."""
+    dbms = FiberDBMS(max_df_ratio=0.5)
+    for i in range(10):
+        dbms.add_entry(name=f"doc{i}.txt", content=f"the study notes part {i}", tags=[])
+    dbms.add_entry(name="rare.txt", content="the photosynthesis notes", tags=[])
+    results = dbms.query("the the photosynthesis notes", top_n=5)
+    plan = dbms.last_plan
+    assert plan.terms == ["photosynthesis", "the", "notes"]
+    assert plan.selective == ["photosynthesis"]
+    assert plan.pruned == ["the", "notes"]
+    assert [r['name'] for r in results] == ["rare.txt"]
+
+
+def test_query_many_matches_single_queries():
+    """Batched queries rank exactly like individual ones."""
+    dbms = build_dbms()
+    queries = ["cell membrane", "revolution", "cell membrane", "energy cell"]
+    batched = dbms.query_many(queries, top_n=3)
+    assert len(batched) == len(queries)
+    for query, results in zip(queries, batched):
+        assert [r['index'] for r in results] == [r['index'] for r in dbms.query(query, top_n=3)]
+    # "history" only occurs in a file name, so it is a missing term that still scores there.
+    single = dbms.query("history revolution", top_n=3)
+    assert [(r['index'], r['score']) for r in dbms.query_many(["history revolution"], top_n=3)[0]] == [
+        (r['index'], r['score']) for r in single]
+
+
+def test_query_many_breaks_ties_like_query():
+    """Entries tied at the top_n cutoff come back in the same order from both paths."""
+    dbms = FiberDBMS(positions=True)
+    texts = ["w1 w2 w3 filler", "w2 w1 w3 filler", "细胞膜 控制 能量", "能量 细胞膜 控制"]
+    for i in range(600):
+        # Sparse ids past the candidate set's hash table size, so set order is not index order.
+        content = texts[i // 7 % 4] if i % 7 == 0 else f"unrelated text {i}"
+        dbms.add_entry(name=f"doc{i:03d}.txt", content=content, tags=[])
+    queries = ['"w1 w2"~4 w3', "w3", "细胞膜 能量", "w1 w2"]
+    assert dbms.query_many(queries, top_n=5) == [dbms.query(q, top_n=5) for q in queries]
+    assert all(isinstance(r['score'], float) for r in dbms.query("w3", top_n=5))
+
+
+def test_iter_query_is_lazy_and_ordered():
+    """iter_query yields in rank order and can skip snippet work."""
+    dbms = build_dbms()
+    lazy = dbms.iter_query("cell energy")
+    first = next(lazy)
+    assert first == dbms.query("cell energy", top_n=1)[0]
+    names_only = list(dbms.iter_query("cell energy", with_snippets=False))
+    assert [r['index'] for r in names_only] == [r['index'] for r in dbms.query("cell energy", top_n=10)]
+    assert set(names_only[0]) == {'name', 'index', 'score'}
+
+
+def test_partitioned_queries_merge_top_k():
+    """Fan-out queries merge partition hits into one global top-k; scoped ones stay in their partitions."""
+    from arcana.partitions import ROOT_PARTITION, PartitionedFiberDBMS
+    with tempfile.TemporaryDirectory() as tmp:
+        partitions = PartitionedFiberDBMS(tmp, workers=4)
+        for name, lines in [("biology", SAMPLE_LINES[:2]), ("history", SAMPLE_LINES[2:]),
+                            (ROOT_PARTITION, [("cells.txt", "Every cell has a cell membrane.", ["cell"])])]:
+            dbms = partitions.new_partition()
+            for file, content, tags in lines:
+                dbms.add_entry(name=file, content=content, tags=tags)
+            partitions.replace(name, dbms)
+        assert partitions.names() == ["", "biology", "history"]
+
+        merged = sorted(((p, hit["index"], hit["score"]) for p in partitions.names()
+                         for hit in partitions.partitions[p].query("cell revolution", 10)),
+                        key=lambda hit: -hit[2])
+        hits = partitions.query("cell revolution", top_n=2)
+        assert [(h["partition"], h["index"], h["score"]) for h in hits] == merged[:2]
+        assert {h["partition"] for h in partitions.query("cell revolution", top_n=10)} == {"", "biology", "history"}
+        serial = PartitionedFiberDBMS(tmp, workers=1)
+        serial.partitions = partitions.partitions
+        assert serial.query("cell revolution", top_n=2) == hits
+
+        scoped = partitions.query("cell revolution", top_n=10, partitions=["history", "unknown"])
+        assert [(h["partition"], h["name"]) for h in scoped] == [("history", "history.docx")]
+        assert partitions.query("cell", top_n=10, partitions=[]) == []
+
+        partitions.drop("history")
+        assert not os.path.exists(partitions.partition_file("history"))
+        reloaded = PartitionedFiberDBMS(tmp)
+        reloaded.load()
+        assert reloaded.names() == ["", "biology"]
+        hits = reloaded.query("revolution cell", top_n=10)
+        assert sorted(h["name"] for h in hits) == ["biology.pdf", "biology.pdf", "cells.txt"]
+        assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+
+
+def test_compressed_store_round_trip():
+    """Compressed content survives save/load and is served per block."""
+    dbms = build_dbms(compression="zlib", block_size=64)
+    for i, (_, content, _) in enumerate(SAMPLE_LINES):
+        assert dbms.get_content(i) == content
+    assert dbms.content_store.block_count > 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        dbms.save(path)
+        assert os.path.exists(path + BLOCK_SUFFIX)
+
+        # A plain instance picks up the compression from the block file.
+        loaded = FiberDBMS()
+        loaded.load_from_file(path)
+        assert loaded.compression == "zlib"
+        assert [loaded.get_content(i) for i in range(len(SAMPLE_LINES))] == [c for _, c, _ in SAMPLE_LINES]
+        assert loaded.query("revolution", top_n=1)[0]['name'] == "history.docx"
+        loaded.content_store.close()
+
+        # Saving uncompressed removes the stale block file.
+        plain = build_dbms()
+        plain.save(path)
+        assert not os.path.exists(path + BLOCK_SUFFIX)
+
+
+
+def test_memory_budget_serves_postings_from_disk():
+    """A memory-budgeted index answers like the in-memory one and counts cache traffic."""
+    expected = build_dbms().query("cell membrane", top_n=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        build_dbms().save(path)
+
+        dbms = FiberDBMS(memory_budget=1024)
+        dbms.load_from_file(path)
+        assert os.path.exists(path + POSTINGS_SUFFIX)
+        assert dbms.query("cell membrane", top_n=3) == expected
+        dbms.query("cell membrane", top_n=3)
+        stats = dbms.cache_stats()
+        assert stats['misses'] > 0 and stats['hits'] > 0
+
+        # Entries added after loading are searchable before the next save.
+        dbms.add_entry(name="new.txt", content="Plasma membrane proteins", tags=[])
+        assert "new.txt" in [r['name'] for r in dbms.query("plasma", top_n=1)]
+        dbms.save(path)
+        reloaded = FiberDBMS(memory_budget=0)
+        reloaded.load_from_file(path)
+        assert reloaded.query("plasma", top_n=1)[0]['name'] == "new.txt"
+        assert reloaded.cache_stats()['cached_bytes'] == 0
+
+
+
+def test_sqlite_backend_search_update_delete():
+    """The SQLite FTS5 backend answers through the same interface."""
+    dbms = create_dbms("sqlite", compression="zlib")
+    for name, content, tags in SAMPLE_LINES:
+        dbms.add_entry(name=name, content=content, tags=tags)
+    assert isinstance(dbms, FiberDBMS)
+    assert dbms.query("cell membrane", top_n=1)[0]['name'] == "biology.pdf"
+    assert dbms.query("细胞膜", top_n=1)[0]['name'] == "notes.txt"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.sqlite")
+        dbms.save(path)
+        dbms.delete_entry(2)
+        dbms.update_entry(1, content="Chloroplasts capture light.")
+        dbms.close()
+
+        reloaded = create_dbms("sqlite")
+        reloaded.load_from_file(path)
+        assert len(reloaded.database) == len(SAMPLE_LINES) - 1
+        assert reloaded.query("revolution", top_n=1) == []
+        assert reloaded.query("chloroplasts", top_n=1)[0]['index'] == 1
+        reloaded.close()
+
+
+def test_parquet_round_trip():
+    """Parquet and Arrow exports load back with typed columns."""
+    import pyarrow.parquet as pq
+    dbms = build_dbms(compression="zlib")
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_name in ("index.parquet", "index.arrow"):
+            path = os.path.join(tmp, file_name)
+            dbms.save(path)
+            for budget in (None, 1 << 20):
+                loaded = FiberDBMS(memory_budget=budget)
+                tokenized = []
+                tokenize = loaded._tokenize
+                loaded._tokenize = lambda text: tokenized.append(text) or tokenize(text)
+                loaded.load_from_file(path)
+                # Postings come from the .post file saved next to the table.
+                assert tokenized == []
+                del loaded._tokenize
+                assert [e for _, e in loaded.iter_entries()] == [e for _, e in dbms.iter_entries()]
+                assert loaded.query("revolution", top_n=1)[0]['name'] == "history.docx"
+            os.remove(path + POSTINGS_SUFFIX)
+            loaded = FiberDBMS()
+            loaded.load_from_file(path)
+            assert loaded.query("revolution", top_n=1)[0]['name'] == "history.docx"
+        schema = pq.read_schema(os.path.join(tmp, "index.parquet"))
+        assert str(schema.field("timestamp").type) == "int64"
+        assert str(schema.field("tags").type) == "list<element: string>"
+        assert str(schema.field("name").type).startswith("dictionary")
+
+
+def test_content_hashes_track_entries():
+    """Duplicate checks work on in-memory digests; no digest file is saved."""
+    dbms = build_dbms()
+    name, content, _ = SAMPLE_LINES[0]
+    assert dbms.has_entry(name, content)
+    assert not dbms.has_entry("other.pdf", content)
+    dbms.add_entry(name="new.txt", content="Ribosomes build proteins.", tags=[])
+    assert dbms.has_entry("new.txt", "Ribosomes build proteins.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        with open(path + HASH_SUFFIX, "wb") as f:
+            f.write(b"stale digests of an earlier version")
+        dbms.save(path)
+        assert not os.path.exists(path + HASH_SUFFIX)
+        loaded = FiberDBMS()
+        loaded.load_from_file(path)
+        assert len(loaded.content_hashes()) == len(SAMPLE_LINES) + 1
+        assert loaded.has_entry("new.txt", "Ribosomes build proteins.")
+
+        # Entries added before the digests are first used are still covered.
+        loaded.load_from_file(path)
+        loaded.add_entry(name="late.txt", content="Added after loading.", tags=[])
+        assert loaded.has_entry("late.txt", "Added after loading.")
+
+
+def test_metadata_columns_and_near_duplicates():
+    """Optional metadata such as a near-duplicate count round-trips through the CSV."""
+    from arcana.simhash import NearDuplicateIndex, simhash
+    from arcana.indexing import collapse_near_duplicates
+    detector = NearDuplicateIndex()
+    detector.add(simhash("Cell Biology - Chapter 3 - Confidential"), 0)
+    assert detector.find(simhash("CELL BIOLOGY: Chapter 3 (confidential)")) == 0
+    assert detector.find(simhash("Mitochondria produce energy for the cell.")) is None
+
+    # Lines that differ only in numbers are distinct facts and are all kept.
+    lines = ["Revenue 2019: 1,200 USD", "Revenue 2020: 3,450 USD", "Call 555-0134 for help", "Call 555-0199 for help"]
+    kept = collapse_near_duplicates([["report.pdf", line, ""] for line in lines])
+    assert [entry[1] for entry in kept] == lines
+    long_line = "Quarterly revenue for the northern region grew steadily across all product lines to {} USD"
+    kept = collapse_near_duplicates([["report.pdf", long_line.format(n), ""] for n in (1200, 3450)])
+    assert len(kept) == 2
+
+    dbms = build_dbms()
+    dbms.add_entry(name="biology.pdf", content="Cell Biology - Chapter 3 - Page 12", tags=[], count=14)
+    assert dbms.query("chapter", top_n=1)[0]['count'] == "14"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        dbms.save(path)
+        loaded = FiberDBMS()
+        loaded.load_from_file(path)
+        assert loaded.metadata_fields() == ["count"]
+        assert loaded.database[-1]['count'] == "14"
+        assert 'count' not in loaded.database[0]
+
+
+def test_chunk_units_respect_pages_and_overlap():
+    """Passages stay within a page, overlap, and cite their line range."""
+    from arcana.chunking import chunk_units, describe_location
+    page_one = "\n".join(f"Line {i} about the cell cycle" for i in range(1, 13))
+    passages = list(chunk_units([("page 1", page_one), ("page 2", "Summary\n\nDone.")], max_tokens=20, overlap=6))
+    assert {p.unit for p in passages} == {"page 1", "page 2"}
+    first, second = passages[0], passages[1]
+    assert (first.first_line, first.last_line) == (1, 3)
+    assert second.first_line == first.last_line  # One line of overlap.
+    assert passages[-1].metadata() == {"unit": "page 2", "lines": "13-15"}
+    assert describe_location(passages[-1].metadata()) == " (page 2, lines 13-15)"
+
+
+def test_query_stats_and_profiler():
+    """Queries report stage timings and feed the rolling latency histogram."""
+    dbms = build_dbms()
+    profiler = dbms.enable_profiling(window=3)
+    results, stats = dbms.query_with_stats("cell membrane", top_n=2)
+    assert stats.results == len(results) == 2
+    assert stats.candidates == 2 and stats.posting_sizes["cell"] == 2
+    assert set(stats.timings) == {"tokenize", "candidates", "score", "sort", "snippet", "tags"}
+    for _ in range(5):
+        dbms.query("revolution", top_n=1)
+    assert len(profiler) == 3
+    summary = profiler.summary()
+    assert summary["total"]["p50"] <= summary["total"]["p99"]
+    assert profiler.slowest(1)[0].query == "revolution"
+
+
+def test_explain_matches_ranking_score():
+    """explain() breaks the score into components that add up to the ranked score."""
+    dbms = build_dbms()
+    top = dbms.query("cell membrane", top_n=1)[0]
+    explanation = dbms.explain("cell membrane", top['index'])
+    assert explanation['score'] == top['score']
+    assert explanation['term_counts'] == {"cell": 2, "membrane": 1}
+    assert explanation['phrase_score'] == 5 and explanation['candidate']
+    assert not dbms.explain("cell membrane", 2)['candidate']
+
+
+def test_phrase_and_proximity_queries():
+    """Quoted phrases match verbatim and ~N windows bound the distance, on both backends."""
+    docs = [
+        ("a.txt", "The cell membrane controls the cell."),
+        ("b.txt", "The membrane of the cell wall."),
+        ("c.txt", "Cell energy comes from mitochondria in the membrane."),
+    ]
+    for backend in ("memory", "sqlite"):
+        dbms = create_dbms(backend, positions=True)
+        for name, content in docs:
+            dbms.add_entry(name=name, content=content, tags=[])
+        assert [r['name'] for r in dbms.query('"cell membrane"', 5)] == ["a.txt"]
+        assert sorted(r['name'] for r in dbms.query('"cell membrane"~4', 5)) == ["a.txt", "b.txt"]
+        assert len(dbms.query("cell membrane", 5)) == 3
+
+    dbms = FiberDBMS(positions=True)
+    for name, content in docs:
+        dbms.add_entry(name=name, content=content, tags=[])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        dbms.save(path)
+        assert os.path.exists(path + POSITIONS_SUFFIX)
+        loaded = FiberDBMS()
+        loaded.load_from_file(path)
+        loaded.add_entry(name="d.txt", content="Another cell membrane.", tags=[])
+        assert sorted(r['name'] for r in loaded.query('"cell membrane"', 5)) == ["a.txt", "d.txt"]
+
+
+def test_phrase_matches_raise_the_score():
+    """Tighter spans and repeated phrases outrank entries with the same words further apart."""
+    dbms = FiberDBMS(positions=True)
+    # Same words and lengths, so only the word positions tell the entries apart.
+    for name, content in [("loose.txt", "membrane and the cell or cell"),
+                          ("tight.txt", "cell membrane and the or cell"),
+                          ("once.txt", "cell membrane x membrane cell"),
+                          ("twice.txt", "cell membrane x cell membrane")]:
+        dbms.add_entry(name=name, content=content, tags=[])
+    near = dbms.query('"cell membrane"~6', 2)
+    assert [r['name'] for r in near] == ["tight.txt", "loose.txt"]
+    assert dbms.explain('"cell membrane"~6', 1)['phrase_score'] > dbms.explain('"cell membrane"~6', 0)['phrase_score']
+    exact = dbms.query('"cell membrane"', 4)
+    names = [r['name'] for r in exact]
+    assert names.index("twice.txt") < names.index("once.txt") and "loose.txt" not in names
+    assert [r['score'] for r in exact] == [dbms.explain('"cell membrane"', r['index'])['score'] for r in exact]
+    assert dbms.query_many(['"cell membrane"~6', '"cell membrane"'], 4) == [dbms.query('"cell membrane"~6', 4), exact]
+
+
+def test_sidecars_follow_index_edits():
+    """An edit that keeps the CSV size still invalidates its .post and .pos files."""
+    dbms = FiberDBMS(memory_budget=1024, positions=True)
+    dbms.add_entry(name="a.txt", content="The cell membrane controls the cell.", tags=[])
+    dbms.add_entry(name="b.txt", content="Mitochondria produce energy.", tags=[])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        dbms.save(path)
+        with open(path, "rb") as f:
+            text = f.read()
+        edited = text.replace(b"cell membrane controls", b"membrane cell protects")
+        assert edited != text and len(edited) == len(text)
+        stat = os.stat(path)
+        with open(path, "wb") as f:
+            f.write(edited)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        loaded = FiberDBMS(memory_budget=1024, positions=True)
+        loaded.load_from_file(path)
+        assert [r['name'] for r in loaded.query("protects", 5)] == ["a.txt"]
+        assert loaded.query('"cell membrane"', 5) == []
+
+        # Sidecars in an older or damaged format are rebuilt, not trusted.
+        with open(path + POSTINGS_SUFFIX, "wb") as f:
+            f.write(b"FPS1")
+        loaded.load_from_file(path)
+        assert [r['name'] for r in loaded.query("protects", 5)] == ["a.txt"]
+
+
+def test_loaded_index_survives_a_save_by_another_instance():
+    """An index already loaded keeps reading its own files after another instance saves over them."""
+    words = ["cell", "membrane", "energy", "protein", "revolution", "history", "enzyme", "nucleus"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.csv")
+        writer = FiberDBMS(compression="zlib", block_size=256, memory_budget=1024, positions=True)
+        for i in range(200):
+            writer.add_entry(name=f"doc{i}.txt", tags=[],
+                             content=f"{words[i % 8]} {words[(i * 3) % 8]} line {i} about {words[(i * 5) % 8]}.")
+        writer.save(path)
+
+        queries = ("cell energy", '"cell membrane"', "nucleus")
+        snapshot = FiberDBMS(memory_budget=0)
+        snapshot.load_from_file(path)
+        expected = [snapshot.query(q, 5) for q in queries]
+        content = snapshot.get_content(150)
+        # Loaded, but no posting, position or uncached block read yet.
+        reader = FiberDBMS(block_cache=1, memory_budget=0)
+        reader.load_from_file(path)
+
+        writer.remove_entries(range(0, 200, 3))  # Shifts every offset in the rewritten files.
+        writer.add_entry(name="late.txt", content="A late nucleus entry.", tags=[])
+        writer.save(path)
+        assert [reader.query(q, 5) for q in queries] == expected
+        assert reader.get_content(150) == content
+
+
+def test_manifest_diff_and_entry_removal():
+    """The manifest finds new, changed and vanished files; their entries can be dropped."""
+    from arcana.manifest import FileManifest
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = os.path.join(tmp, "docs")
+        os.makedirs(os.path.join(docs, "sub"))
+        for rel, text in [("a.txt", "alpha"), ("b.txt", "beta"), ("sub/c.txt", "gamma"), ("sub/clip.MP4", "video")]:
+            with open(os.path.join(docs, rel), "w") as f:
+                f.write(text)
+        assert FileManifest().scan(docs).new == ["a.txt", "b.txt", "sub/c.txt", "sub/clip.MP4"]
+        manifest = FileManifest()
+        diff = manifest.scan(docs, extensions=[".txt"])
+        assert diff.new == ["a.txt", "b.txt", "sub/c.txt"] and "sub/clip.MP4" not in diff.states
+        for source in diff.new:
+            manifest.record(source, diff.states[source])
+        manifest.save(os.path.join(tmp, "index.manifest.json"))
+
+        manifest = FileManifest.load(os.path.join(tmp, "index.manifest.json"))
+        with open(os.path.join(docs, "a.txt"), "w") as f:
+            f.write("alpha, revised")
+        os.remove(os.path.join(docs, "b.txt"))
+        diff = manifest.scan(docs, extensions=[".txt"])
+        assert (diff.new, diff.changed, diff.vanished, diff.unchanged) == ([], ["a.txt"], ["b.txt"], 1)
+
+    dbms = FiberDBMS(compression="zlib", positions=True)
+    for name, content, tags in SAMPLE_LINES:
+        dbms.add_entry(name=name, content=content, tags=tags, source=name)
+    stale = dbms.entries_with("source", ["biology.pdf"])
+    assert stale == [0, 1]
+    assert dbms.remove_entries(stale) == 2
+    assert [e['name'] for e in dbms.database] == ["history.docx", "notes.txt"]
+    assert dbms.query("cell", top_n=5) == []
+    assert [r['name'] for r in dbms.query('"French Revolution"', top_n=5)] == ["history.docx"]
+    assert dbms.has_entry("notes.txt", SAMPLE_LINES[3][1])
+
+
+def _extract_or_misbehave(item):
+    if item == "hang":
+        time.sleep(60)
+    if item == "crash":
+        os._exit(3)
+    yield item.upper()
+    if item == "fail":
+        raise ValueError("unreadable")
+    yield item.lower()
+
+
+def test_extraction_pool_isolates_bad_files():
+    """Hanging, crashing and failing items are reported without affecting the others or their order."""
+    from arcana.extraction import ExtractionError, ExtractionPool
+    items = ["a", "hang", "b", "crash", "fail", "c", "d"]
+    results, errors = [], {}
+    with ExtractionPool(_extract_or_misbehave, workers=2, timeout=1) as pool:
+        for item, values in pool.map(items):
+            try:
+                results.append((item, list(values)))
+            except ExtractionError as exc:
+                errors[item] = str(exc)
+    assert results == [("a", ["A", "a"]), ("b", ["B", "b"]), ("c", ["C", "c"]), ("d", ["D", "d"])]
+    assert errors["hang"].startswith("timed out")
+    assert errors["crash"] == "worker exited with code 3"
+    assert errors["fail"] == "ValueError: unreadable"
+
+
+def _pages_with_progress(item):
+    progress_dir, name, pages = item
+    for page in range(pages):
+        with open(os.path.join(progress_dir, name), "w") as f:
+            f.write(str(page + 1))
+        yield name * 32 * 1024
+
+
+def test_extraction_pool_holds_back_workers_ahead():
+    """Workers on later items pause once max_buffered pages wait, without timing out."""
+    from arcana.extraction import ExtractionPool
+    with tempfile.TemporaryDirectory() as tmp:
+        items = [(tmp, name, 40) for name in "abc"]
+        sent_before = {}
+        with ExtractionPool(_pages_with_progress, workers=3, timeout=0.5, max_buffered=2) as pool:
+            for (_, name, _), values in pool.map(items):
+                if name != "a":
+                    with open(os.path.join(tmp, name)) as f:
+                        sent_before[name] = int(f.read() or 0)
+                pages = []
+                for page in values:
+                    pages.append(page[0])
+                    if name == "a":
+                        time.sleep(0.03)  # A slow consumer; the other workers wait.
+                assert pages == [name] * 40
+    # Only a few pages fit in the buffer and the pipe; the rest are produced on demand.
+    assert sent_before["b"] < 20 and sent_before["c"] < 20
+
+
+def test_extract_units_streams_blocks():
+    """Text files are read in bounded blocks, from a path or a file object."""
+    import io
+    import arcana.indexing as indexing
+    lines = [f"line {i} of a long text file" for i in range(2000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        original = indexing.TEXT_UNIT_CHARS
+        indexing.TEXT_UNIT_CHARS = 4096
+        try:
+            units = list(indexing.extract_units(path))
+            upload = io.BytesIO("\n".join(lines).encode("utf-8"))
+            upload.name = "long.txt"
+            uploaded = list(indexing.extract_units(upload))
+        finally:
+            indexing.TEXT_UNIT_CHARS = original
+    assert len(units) > 10 and max(len(text) for _, text in units) < 4096 + 100
+    assert "\n".join(text for _, text in units).split("\n") == lines
+    assert uploaded == units and not upload.closed
+
+
+def test_spreadsheet_rows_become_entries():
+    """Spreadsheets stream one "header: value" entry per row, numbered across units."""
+    import arcana.indexing as indexing
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "people.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('Name,Age,Notes\nAlice,30,"likes\ncats"\n\nBob,,tea\nCarol,41,\n')
+        original = indexing.SHEET_UNIT_ROWS
+        indexing.SHEET_UNIT_ROWS = 2
+        try:
+            units = list(indexing.extract_units(path))
+            entries = list(indexing.file_entries("people.csv", iter(units)))
+        finally:
+            indexing.SHEET_UNIT_ROWS = original
+    assert len(units) == 2
+    assert [(e[1], e[3]["row"], e[3]["columns"]) for e in entries] == [
+        ("Name: Alice | Age: 30 | Notes: likes cats", "2", "Name,Age,Notes"),
+        ("Name: Bob | Notes: tea", "4", "Name,Notes"),
+        ("Name: Carol | Age: 41", "5", "Name,Age"),
+    ]
+    assert indexing.format_row(["Item", ""], ["Pie", 4.0, None]) == "Item: Pie | column 2: 4"
+
+
+def test_file_entries_stream_into_the_index():
+    """Pages are added as they are extracted; a file failing halfway leaves no entries."""
+    import arcana.indexing as indexing
+    dbms = FiberDBMS()
+    dbms.add_entry(name="notes.txt", content="Kept from another file.", tags=[])
+    added_before_page_2 = []
+
+    def units():
+        yield "page 1", "Mitochondria produce ATP.\nRibosomes build proteins."
+        added_before_page_2.append(len(dbms.database))
+        raise ValueError("corrupt page 2")
+
+    try:
+        indexing._add_file_entries(dbms, "broken.pdf", units(), indexing.source_metadata("d1", ["broken.pdf"]), [])
+    except ValueError:
+        pass
+    assert added_before_page_2 == [3]
+    assert [e["name"] for e in dbms.database] == ["notes.txt"]
+
+    count = indexing._add_file_entries(dbms, "fine.pdf", iter([("page 1", "One line.\nOne line.")]),
+                                       indexing.source_metadata("d2", ["fine.pdf"]), [])
+    assert count == 1 and dbms.database[-1]["digest"] == "d2"
+
+
+def test_identical_files_are_indexed_once():
+    """Copies of a file share one set of entries listing every copy."""
+    import arcana.indexing as indexing
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = os.path.join(tmp, "docs")
+        for folder in ("a", "b"):
+            os.makedirs(os.path.join(docs, folder))
+        for rel, text in [("a/handout.txt", "shared line\n"), ("b/handout.txt", "shared line\nown line\n"),
+                          ("b/copy.txt", "shared line\n")]:
+            with open(os.path.join(docs, rel), "w") as f:
+                f.write(text)
+        settings = {"INDEX_FILE": os.path.join(tmp, "index.csv"), "INDEX_BACKEND": "memory",
+                    "INDEX_EXTRACT_WORKERS": 1, "INDEX_TEXT_CACHE_MB": 0,
+                    "INDEX_TEXT_CACHE_DIR": os.path.join(tmp, "cache"), "_text_cache": None}
+        original = {name: getattr(indexing, name) for name in settings}
+        for name, value in settings.items():
+            setattr(indexing, name, value)
+        try:
+            assert indexing.indexing(docs) == 3
+            dbms = indexing._load_index()
+            shared = [e for e in dbms.database if e["source"] == "a/handout.txt"]
+            assert [e.get("sources") for e in shared] == ["a/handout.txt|b/copy.txt"]
+            # Same-named files in other folders keep their own lines.
+            assert sorted(e["content"] for e in dbms.database if e["source"] == "b/handout.txt") == [
+                "own line", "shared line"]
+
+            os.remove(os.path.join(docs, "a", "handout.txt"))
+            indexing.indexing(docs)  # The first copy is gone: re-indexed under the next one.
+            dbms = indexing._load_index()
+            assert [(e["name"], e["source"]) for e in dbms.database if e["content"] == "shared line"] == [
+                ("handout.txt", "b/handout.txt"), ("copy.txt", "b/copy.txt")]
+
+            # A full re-index drops the entries of files renamed (and edited) meanwhile.
+            os.rename(os.path.join(docs, "b", "handout.txt"), os.path.join(docs, "b", "renamed.txt"))
+            with open(os.path.join(docs, "b", "renamed.txt"), "a") as f:
+                f.write("added line\n")
+            indexing.indexing(docs, full=True)
+            dbms = indexing._load_index()
+            assert sorted((e["source"], e["content"]) for e in dbms.database) == [
+                ("b/copy.txt", "shared line"), ("b/renamed.txt", "added line"),
+                ("b/renamed.txt", "own line"), ("b/renamed.txt", "shared line")]
+        finally:
+            for name, value in original.items():
+                setattr(indexing, name, value)
+
+
+def test_failed_files_wait_for_a_change():
+    """A file that fails to extract is not extracted again until its content changes."""
+    import arcana.indexing as indexing
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = os.path.join(tmp, "docs")
+        os.makedirs(docs)
+        for name, data in [("good.txt", b"good line\n"), ("bad.docx", b"not a zip")]:
+            with open(os.path.join(docs, name), "wb") as f:
+                f.write(data)
+        extracted = []
+
+        def extract_units(source, *args, **kwargs):
+            extracted.append(os.path.basename(source))
+            return original["extract_units"](source, *args, **kwargs)
+
+        settings = {"INDEX_FILE": os.path.join(tmp, "index.csv"), "INDEX_BACKEND": "memory",
+                    "INDEX_EXTRACT_WORKERS": 1, "INDEX_TEXT_CACHE_MB": 0,
+                    "INDEX_TEXT_CACHE_DIR": os.path.join(tmp, "cache"), "_text_cache": None,
+                    "extract_units": extract_units}
+        original = {name: getattr(indexing, name) for name in settings}
+        for name, value in settings.items():
+            setattr(indexing, name, value)
+        try:
+            assert indexing.indexing(docs) == 1
+            assert sorted(extracted) == ["bad.docx", "good.txt"]
+            del extracted[:]
+            stat = os.stat(os.path.join(docs, "bad.docx"))
+            os.utime(os.path.join(docs, "bad.docx"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            assert indexing.indexing(docs) == 0
+            assert extracted == []  # Touched, but the same bytes: still skipped.
+
+            with open(os.path.join(docs, "bad.docx"), "wb") as f:
+                f.write(b"still not a zip")
+            indexing.indexing(docs)
+            assert extracted == ["bad.docx"]
+        finally:
+            for name, value in original.items():
+                setattr(indexing, name, value)
+
+
+def test_partitions_follow_folders():
+    """Each top-level folder gets a partition that is rebuilt, or dropped, on its own."""
+    import shutil
+    import arcana.indexing as indexing
+    from arcana.partitions import PartitionedFiberDBMS
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = os.path.join(tmp, "docs")
+        for rel, text in [("intro.txt", "welcome line\n"), ("bio/cells.txt", "cell membrane\n"),
+                          ("bio/deep/organs.txt", "heart muscle\n"), ("hist/france.txt", "french revolution\n"),
+                          ("bio/lecture.mp4", "not a document\n")]:
+            os.makedirs(os.path.dirname(os.path.join(docs, rel)), exist_ok=True)
+            with open(os.path.join(docs, rel), "w") as f:
+                f.write(text)
+        hashed = []
+        settings = {"INDEX_EXTRACT_WORKERS": 1, "INDEX_TEXT_CACHE_MB": 0,
+                    "INDEX_TEXT_CACHE_DIR": os.path.join(tmp, "cache"), "_text_cache": None,
+                    "file_digest": lambda path: hashed.append(path) or original["file_digest"](path)}
+        original = {name: getattr(indexing, name) for name in settings}
+        for name, value in settings.items():
+            setattr(indexing, name, value)
+        try:
+            partitions = PartitionedFiberDBMS(os.path.join(tmp, "parts"))
+            partitions.replace("gone", partitions.new_partition())
+            assert indexing.indexing_partitioned(docs, partitions) == 4
+            assert partitions.names() == ["", "bio", "hist"]
+            assert not os.path.exists(partitions.partition_file("gone"))
+            assert sorted(e["source"] for e in partitions.partitions["bio"].database) == [
+                "bio/cells.txt", "bio/deep/organs.txt"]
+            assert len(hashed) == 4 and not any(path.endswith(".mp4") for path in hashed)
+
+            history = partitions.partitions["hist"]
+            with open(os.path.join(docs, "bio", "cells.txt"), "w") as f:
+                f.write("cell membrane\ncell wall\n")
+            assert indexing.index_folder(docs, "bio", partitions) == 3
+            assert partitions.partitions["hist"] is history
+            hits = partitions.query("wall", top_n=5, partitions=["bio"])
+            assert [partitions.partitions["bio"].get_content(h["index"]) for h in hits] == ["cell wall"]
+
+            update = indexing.partition_updater(docs, partitions)
+            shutil.rmtree(os.path.join(docs, "hist"))
+            with open(os.path.join(docs, "news.txt"), "w") as f:
+                f.write("fresh news\n")
+            assert update([os.path.join(docs, "hist", "france.txt"), os.path.join(docs, "news.txt")])
+            assert partitions.names() == ["", "bio"]
+            assert not os.path.exists(partitions.partition_file("hist"))
+            assert sorted(e["content"] for e in partitions.partitions[""].database) == ["fresh news", "welcome line"]
+            assert not update([os.path.join(tmp, "elsewhere.txt")])
+        finally:
+            for name, value in original.items():
+                setattr(indexing, name, value)
+
+
+def test_text_cache_hits_and_evicts():
+    """Extractions are reused by key, failed ones are not kept, and old ones are evicted."""
+    from arcana.textcache import TextCache, cache_key
+    calls = []
+
+    def extract(name, noise=0):
+        calls.append(name)
+        yield "page 1", name * 10 + os.urandom(noise).hex()  # Noise keeps gzip from shrinking it.
+        yield "page 2", "end"
+
+    def failing():
+        yield "page 1", "partial"
+        raise ValueError("bad page")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TextCache(tmp, max_bytes=10_000)
+        key = cache_key("abc123", ".PDF", 1)
+        assert key == "abc123-pdf-v1"
+        first = list(cache.units(key, extract("a")))
+        assert list(cache.units(key, extract("a"))) == first == [("page 1", "a" * 10), ("page 2", "end")]
+        assert calls == ["a"]
+        try:
+            list(cache.units("bad", failing()))
+        except ValueError:
+            pass
+        assert "bad" not in cache and key in cache
+
+        os.utime(cache._path(key), (1, 1))  # Least recently used.
+        cache._entries = None
+        for name in "bcdef":
+            list(cache.units(name, extract(name, noise=2000)))
+        assert key not in cache and "f" in cache
+        assert cache.size() <= 10_000
+
+
+def test_polling_watcher_debounces_changes():
+    """A burst of changes reaches the update callback once, after the debounce delay."""
+    from arcana.watcher import IndexWatcher
+    batches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        watcher = IndexWatcher(tmp, lambda paths: batches.append(sorted(paths)) or True,
+                               debounce=0.5, poll_interval=0.05, use_watchdog=False).start()
+        try:
+            for name in ("a.txt", "b.txt"):
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(name)
+                time.sleep(0.1)
+            deadline = time.time() + 5
+            while not batches and time.time() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.6)  # No second batch follows.
+        finally:
+            watcher.stop()
+    assert batches == [[os.path.join(tmp, "a.txt"), os.path.join(tmp, "b.txt")]]
+    assert watcher.generation == 1
+
+
+def test_indexing_job_reports_progress_and_cancels():
+    """A job streams progress updates and stops cooperatively once cancelled."""
+    from arcana.progress import IndexingCancelled, IndexingJob
+
+    def fake_indexing(files, progress=None, cancel=None):
+        progress.discover(len(files), 100 * len(files))
+        progress.update(phase="extracting")
+        for file in files:
+            if file == "stop":
+                job.cancel()
+            try:
+                cancel.raise_if_cancelled()
+            except IndexingCancelled:
+                progress.update(phase="cancelled")
+                return progress.files_done
+            progress.file_done(100, entries=3, failed=file == "bad")
+        progress.update(phase="done")
+        return progress.files_done
+
+    phases = []
+    job = IndexingJob(fake_indexing, ["a", "bad", "c", "stop", "d"])
+    job.progress.callback = lambda p: phases.append(p.phase)
+    job.start().join(5)
+    progress = job.progress
+    assert not job.running and job.error is None and job.result == 3
+    assert (progress.files_total, progress.files_done, progress.files_failed) == (5, 3, 1)
+    assert progress.bytes_done == 300 and progress.entries == 9
+    assert progress.fraction == 0.6 and progress.eta == 0.0
+    assert phases[-1] == "cancelled" and progress.finished is not None
+    assert "3/5 files (1 failed" in progress.summary()
+
+    job = IndexingJob(lambda progress=None, cancel=None: 1 / 0).start()
+    job.join(5)
+    assert job.progress.phase == "failed" and "division by zero" in job.error
+
+
+def test_decode_lines_falls_back_to_detected_encoding():
+    """UTF-8 is decoded directly; other encodings are detected once and cached."""
+    import io
+    from arcana.encoding import EncodingCache, decode_lines
+    assert list(decode_lines(io.BytesIO(b"\xef\xbb\xbfone\r\ntwo\rthree\n"))) == ["one", "two", "three"]
+    detected = []
+    utf8 = "na\u00efve caf\u00e9\n".encode("utf-8")
+    assert list(decode_lines(io.BytesIO(utf8), on_detect=detected.append)) == ["na\u00efve caf\u00e9"]
+    assert detected == []
+
+    data = ("ascii prelude\n" * 1000 + "caf\u00e9 cr\u00e8me br\u00fbl\u00e9e \u00e0 la fran\u00e7aise\n" * 50).encode("cp1252")
+    lines = list(decode_lines(io.BytesIO(data), on_detect=detected.append))
+    assert len(detected) == 1 and lines == data.decode(detected[0]).splitlines()
+    assert lines[0] == "ascii prelude" and len(lines) == 1050
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EncodingCache(tmp)
+        assert cache.get("ab12") is None
+        cache.set("ab12", detected[0])
+        assert cache.get("ab12") == detected[0]
+        assert list(decode_lines(io.BytesIO(data), cache.get("ab12"))) == lines
+
+    # A stray invalid byte after non-ASCII UTF-8 resumes at the right byte, as UTF-8.
+    data = "caf\u00e9 line\n".encode("utf-8") * 3000 + b"bad \xe9 byte"
+    lines = list(decode_lines(io.BytesIO(data)))
+    assert lines == ["caf\u00e9 line"] * 3000 + ["bad \ufffd byte"]
+
+
+if __name__ == "__main__":
+    print("🚀 Testing FiberDBMS")
+    test_query_ranks_matching_entries()
+    test_query_plan_dedupes_and_prunes_common_terms()
+    test_query_many_matches_single_queries()
+    test_query_many_breaks_ties_like_query()
+    test_iter_query_is_lazy_and_ordered()
+    test_partitioned_queries_merge_top_k()
+    test_compressed_store_round_trip()
+    test_memory_budget_serves_postings_from_disk()
+    test_sqlite_backend_search_update_delete()
+    test_parquet_round_trip()
+    test_content_hashes_track_entries()
+    test_metadata_columns_and_near_duplicates()
+    test_chunk_units_respect_pages_and_overlap()
+    test_query_stats_and_profiler()
+    test_explain_matches_ranking_score()
+    test_phrase_and_proximity_queries()
+    test_phrase_matches_raise_the_score()
+    test_sidecars_follow_index_edits()
+    test_loaded_index_survives_a_save_by_another_instance()
+    test_manifest_diff_and_entry_removal()
+    test_extraction_pool_isolates_bad_files()
+    test_extraction_pool_holds_back_workers_ahead()
+    test_extract_units_streams_blocks()
+    test_spreadsheet_rows_become_entries()
+    test_file_entries_stream_into_the_index()
+    test_identical_files_are_indexed_once()
+    test_failed_files_wait_for_a_change()
+    test_partitions_follow_folders()
+    test_text_cache_hits_and_evicts()
+    test_polling_watcher_debounces_changes()
+    test_indexing_job_reports_progress_and_cancels()
+    test_decode_lines_falls_back_to_detected_encoding()
+    print("✅ All FiberDBMS tests passed")